@@ -1,8 +1,21 @@
 # app/controllers/chat_controller.py
 
+import os
+import re
+import time
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
+import numpy as np
 from app.services.translation_service import translate_text
-from app.services.llm_service import generate_response
-from app.services.knowledge_service import retrieve
+from app.services.llm_service import generate_response, stream_response, FALLBACK_REPLY
+from app.services.knowledge_service import retrieve_passages, knowledge_base_version
+from app.services.rag_service import build_prompt, RAG_TOP_K, PROMPT_HISTORY_TURNS
+from app.db.queries import conversation_history, log_chat_turn
+from app.services.embedding_scheduler import embed_query_async
+from app.services.answer_cache import answer_cache, SEMANTIC_CACHE_ENABLED
+from app.services.faq_index import faq_index, FAQ_DIRECT_ANSWERS
+from app.services.metrics import span, record, record_prompt, set_outcome
+from app.services.admission import admission, FAST, FULL
 
 # -----------------------------------------------------------
 # ✅ Supported Languages
@@ -15,62 +28,259 @@ SUPPORTED_LANGUAGES = {
     "ta": "Tamil"
 }
 
+# End of an English sentence in the streamed LLM output
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Prints messages, prompts and replies per request (off by default: the
+# full prompt on every request is itself a hot-path cost)
+CHAT_DEBUG_LOG = os.getenv("CHAT_DEBUG_LOG", "0") == "1"
+
+
+def _debug(message: str):
+    if CHAT_DEBUG_LOG:
+        print(message)
+
 
 # -----------------------------------------------------------
 # ✅ Main Chat Handling Function (with RAG)
 # -----------------------------------------------------------
-async def handle_user_message(user_message: str, language: str):
+async def handle_user_message(user_message: str, language: str, session_id: Optional[str] = None):
     """
     Main function to process user messages:
     1. Detects user language
     2. Translates to English (if needed)
-    3. Retrieves relevant context from knowledge base
-    4. Generates AI response (LLM)
+    3. Answers a verbatim FAQ question directly, returns a cached answer for
+       a near-identical earlier question, or retrieves relevant context from knowledge base
+    4. Generates AI response (LLM), with the session's recent turns in the prompt
     5. Translates back to user language
+    Answered turns are saved to the session's conversation history.
+    Each stage is timed into chat_stage_seconds (see app/services/metrics.py).
+    Steps 3–4 with the LLM need a generation slot (raises Overloaded when shed).
     """
 
+    # 1️⃣–2️⃣ Validate, translate to English
+    translated_input = await _translate_in(user_message, language)
+
+    # 3️⃣ Exact FAQ match, else semantic answer cache, else retrieve context
+    faq_answer = _faq_answer(translated_input)
+    if faq_answer is not None:
+        ai_response_en = faq_answer
+        set_outcome("faq")
+        _debug(f"📖 FAQ hit: {ai_response_en}")
+    else:
+        history = await _history(session_id)
+        query_embedding, kb_version, cached = await _check_answer_cache(translated_input, history)
+        if cached is not None:
+            ai_response_en = cached
+            set_outcome("cached")
+            _debug(f"⚡ Answer cache hit: {ai_response_en}")
+        else:
+            async with admission.generation():
+                final_prompt = await _build_prompt(translated_input, query_embedding, history)
+
+                # 4️⃣ Generate Response using AI Model
+                with span("generation"):
+                    ai_response_en = await generate_response(final_prompt)
+            set_outcome("generated")
+            _debug(f"🤖 AI Response (English): {ai_response_en}")
+            _remember_answer(query_embedding, translated_input, ai_response_en, kb_version, history)
+
+    # 5️⃣ Translate Response back to user language
+    if language != "en":
+        with span("translate_out"):
+            final_response = await translate_text(ai_response_en, src_lang="en", dest_lang=language)
+        _debug(f"🌐 Translated Response: {final_response}")
+    else:
+        final_response = ai_response_en
+
+    if session_id:
+        log_chat_turn(session_id, language, user_message, final_response, translated_input, ai_response_en)
+    return final_response
+
+
+# -----------------------------------------------------------
+# ✅ Shared steps: validate + translate in, answer cache, retrieve + prompt
+# -----------------------------------------------------------
+async def _translate_in(user_message: str, language: str) -> str:
     # 1️⃣ Validate Language
     if language not in SUPPORTED_LANGUAGES:
         raise ValueError(f"Unsupported language code: {language}")
 
-    print(f"🌍 Received message: '{user_message}' in {SUPPORTED_LANGUAGES[language]}")
+    _debug(f"🌍 Received message: '{user_message}' in {SUPPORTED_LANGUAGES[language]}")
 
     # 2️⃣ Translate to English (if not already English)
     if language != "en":
-        translated_input = await translate_text(user_message, src_lang=language, dest_lang="en")
-        print(f"🔁 Translated to English: {translated_input}")
+        with span("translate_in"):
+            translated_input = await translate_text(user_message, src_lang=language, dest_lang="en")
+        _debug(f"🔁 Translated to English: {translated_input}")
     else:
         translated_input = user_message
+    return translated_input
 
-    # 3️⃣ Retrieve relevant knowledge chunks
-    context_chunks = retrieve(translated_input, top_k=5)
-    context_text = "\n".join([c[0] for c in context_chunks])
-    final_prompt = f"Context: {context_text}\nQuestion: {translated_input}"
-    print(f"📚 Contextual Prompt Sent to LLM:\n{final_prompt}")
 
-    # 4️⃣ Generate Response using AI Model
-    ai_response_en = await generate_response(final_prompt)
-    print(f"🤖 AI Response (English): {ai_response_en}")
+def admission_priority(user_message: str, language: str) -> int:
+    """
+    FAST for a question answered straight from the FAQ index (checked before
+    admission, so English only: other languages need translating first).
+    """
+    if FAQ_DIRECT_ANSWERS and language == "en" and faq_index.lookup(user_message) is not None:
+        return FAST
+    return FULL
 
-    # 5️⃣ Translate Response back to user language
-    if language != "en":
-        final_response = await translate_text(ai_response_en, src_lang="en", dest_lang=language)
-        print(f"🌐 Translated Response: {final_response}")
-    else:
-        final_response = ai_response_en
 
-    return final_response
+def _faq_answer(translated_input: str) -> Optional[str]:
+    # Normalized-question hash lookup: no embedding, no LLM
+    if not FAQ_DIRECT_ANSWERS:
+        return None
+    with span("faq_lookup"):
+        return faq_index.lookup(translated_input)
+
+
+async def _history(session_id: Optional[str]) -> List[Tuple[str, str]]:
+    return await conversation_history(session_id, PROMPT_HISTORY_TURNS) if session_id else []
 
 
-    # 3️⃣ Generate Response using AI Model
-    #ai_response_en = await generate_response(translated_input)
-    #print(f"🤖 AI Response (English): {ai_response_en}")
+async def _check_answer_cache(
+    translated_input: str, history: List[Tuple[str, str]]
+) -> Tuple[np.ndarray, int, Optional[str]]:
+    """
+    Embeds the English query once (reused for retrieval) and looks it up
+    in the semantic answer cache. Returns (embedding, kb_version, cached answer or None).
+    Follow-ups (the session has history) are answered in context, so the
+    cache — shared by all sessions and keyed on the query alone — is skipped.
+    """
+    # (micro-batched with other in-flight requests, encoded off the event loop)
+    with span("embedding"):
+        query_embedding = await embed_query_async(translated_input)
+    kb_version = knowledge_base_version()
+    cached = None
+    if SEMANTIC_CACHE_ENABLED and not history:
+        with span("cache_lookup"):
+            cached = answer_cache.lookup(query_embedding, kb_version)
+    return query_embedding, kb_version, cached
+
+
+def _remember_answer(
+    query_embedding: np.ndarray, translated_input: str, answer_en: str, kb_version: int, history: List[Tuple[str, str]]
+):
+    # Never cache the "having trouble" fallback, nor an answer that depends on the session's history
+    if SEMANTIC_CACHE_ENABLED and not history and answer_en.strip() and answer_en != FALLBACK_REPLY:
+        answer_cache.store(query_embedding, translated_input, answer_en, kb_version)
+
+
+async def _build_prompt(translated_input: str, query_embedding: np.ndarray, history: List[Tuple[str, str]]) -> str:
+    final_prompt, stats = await asyncio.to_thread(_retrieve_and_pack, translated_input, query_embedding, history)
+    record_prompt(stats)
+    _debug(f"📚 Contextual Prompt Sent to LLM ({stats}):\n{final_prompt}")
+    return final_prompt
+
+
+def _retrieve_and_pack(translated_input: str, query_embedding: np.ndarray, history: List[Tuple[str, str]]):
+    # 3️⃣ Retrieve relevant knowledge chunks, then fit them into the prompt's token budget
+    with span("retrieval"):
+        chunks, vectors = retrieve_passages(translated_input, RAG_TOP_K, query_embedding)
+    with span("prompt_build"):
+        return build_prompt(translated_input, chunks, history, vectors)
+
+
+async def _timed_tokens(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Passes tokens through, recording time to first token and the total time
+    spent waiting on the LLM ("generation"); time the caller spends between
+    tokens (per-sentence translation, the client reading) is excluded.
+    """
+    waited = 0.0
+    first = True
+    started = time.perf_counter()
+    try:
+        async for token in tokens:
+            waited += time.perf_counter() - started
+            if first:
+                record("first_token", waited)
+                first = False
+            yield token
+            started = time.perf_counter()
+        waited += time.perf_counter() - started
+    finally:
+        record("generation", waited)
+
+
+def _split_sentences(buffer: str) -> Tuple[List[str], str]:
+    """
+    Splits off every complete sentence; returns (sentences, unfinished rest).
+    """
+    parts = SENTENCE_END.split(buffer)
+    return [p for p in parts[:-1] if p.strip()], parts[-1]
+
+
+# -----------------------------------------------------------
+# ✅ Streaming Chat Handling (stages + text as it is generated)
+# -----------------------------------------------------------
+async def stream_user_message(user_message: str, language: str, session_id: Optional[str] = None) -> AsyncIterator[dict]:
+    """
+    Same pipeline as handle_user_message, but yields events as it goes:
+      {"type": "stage", "stage": "translating" | "retrieving" | "faq" | "cached" | "generating"}
+      {"type": "text", "text": "..."}   (in the user's language)
+      {"type": "done", "reply": "..."}
+    Non-English replies are translated back one sentence at a time.
+    """
+    yield {"type": "stage", "stage": "translating" if language != "en" else "retrieving"}
+    translated_input = await _translate_in(user_message, language)
+
+    reply_parts: List[str] = []
+    english_parts: List[str] = []
+    buffer = ""
+
+    async def emit(text_en: str):
+        text = text_en
+        if language != "en":
+            with span("translate_out"):
+                text = await translate_text(text_en, src_lang="en", dest_lang=language) + " "
+        reply_parts.append(text)
+        return {"type": "text", "text": text}
+
+    faq_answer = _faq_answer(translated_input)
+    query_embedding = kb_version = cached = None
+    history: List[Tuple[str, str]] = []
+    if faq_answer is None:
+        history = await _history(session_id)
+        query_embedding, kb_version, cached = await _check_answer_cache(translated_input, history)
+
+    if faq_answer is not None:
+        set_outcome("faq")
+        _debug(f"📖 FAQ hit: {faq_answer}")
+        yield {"type": "stage", "stage": "faq"}
+        yield await emit(faq_answer)
+    elif cached is not None:
+        set_outcome("cached")
+        _debug(f"⚡ Answer cache hit: {cached}")
+        yield {"type": "stage", "stage": "cached"}
+        yield await emit(cached)
+    else:
+        async with admission.generation():
+            final_prompt = await _build_prompt(translated_input, query_embedding, history)
+            yield {"type": "stage", "stage": "generating"}
+            try:
+                async for token in _timed_tokens(stream_response(final_prompt)):
+                    english_parts.append(token)
+                    if language == "en":
+                        yield await emit(token)
+                        continue
+                    buffer += token
+                    sentences, buffer = _split_sentences(buffer)
+                    for sentence in sentences:
+                        yield await emit(sentence)
+                if buffer.strip():
+                    yield await emit(buffer)
+                set_outcome("generated")
+                _remember_answer(query_embedding, translated_input, "".join(english_parts).strip(), kb_version, history)
+            except Exception as e:
+                print(f"❌ Streaming generation failed: {e}")
+                yield await emit(FALLBACK_REPLY)
 
-    # 4️⃣ Translate Response back to user language
-    #if language != "en":
-    #    final_response = await translate_text(ai_response_en, src_lang="en", dest_lang=language)
-    #    print(f"🌐 Translated Response: {final_response}")
-    #else:
-    #    final_response = ai_response_en
-#
-#    return final_response 
+    final_response = "".join(reply_parts).strip()
+    _debug(f"🌐 Streamed Response: {final_response}")
+    if session_id:
+        answer_en = faq_answer if faq_answer is not None else cached if cached is not None else "".join(english_parts).strip()
+        log_chat_turn(session_id, language, user_message, final_response, translated_input, answer_en or final_response)
+    yield {"type": "done", "reply": final_response}
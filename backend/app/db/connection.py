@@ -1,8 +1,16 @@
 # app/db/connection.py
 
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
 import os
+import inspect
+from pymongo.errors import ConnectionFailure
+
+# -----------------------------------------------------------
+# ✅ Connection pool tuning
+# -----------------------------------------------------------
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))     # connections per worker process
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))      # kept warm
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "60000"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))         # server selection / connect
 
 # -----------------------------------------------------------
 # ✅ Global variable to hold the MongoDB client
@@ -12,11 +20,13 @@ db = None
 
 
 # -----------------------------------------------------------
-# ✅ MongoDB Connection
+# ✅ MongoDB Connection (async)
 # -----------------------------------------------------------
-def connect_to_mongo():
+async def connect_to_mongo():
     """
     Connect to MongoDB (local or Atlas) and initialize global db instance.
+    MONGO_URI=mongomock:// uses an in-memory stand-in (mongomock-motor, from
+    requirements-dev.txt), for tests and benchmarks without a mongod.
     """
     global mongo_client, db
 
@@ -25,9 +35,21 @@ def connect_to_mongo():
     DB_NAME = os.getenv("MONGO_DB_NAME", "langchatbot_db")
 
     try:
-        mongo_client = MongoClient(MONGO_URI)
+        if MONGO_URI.startswith("mongomock://"):
+            from mongomock_motor import AsyncMongoMockClient
+            mongo_client = AsyncMongoMockClient()
+        else:
+            from pymongo import AsyncMongoClient
+            mongo_client = AsyncMongoClient(
+                MONGO_URI,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+                serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+                connectTimeoutMS=MONGO_TIMEOUT_MS,
+            )
         # Ping the server
-        mongo_client.admin.command("ping")
+        await mongo_client.admin.command("ping")
         db = mongo_client[DB_NAME]
         print(f"✅ Connected to MongoDB → {DB_NAME}")
 
@@ -36,12 +58,22 @@ def connect_to_mongo():
         raise e
 
 
+async def close_mongo():
+    global mongo_client, db
+    if mongo_client is not None:
+        closed = mongo_client.close()
+        if inspect.isawaitable(closed):  # AsyncMongoClient; the in-memory client closes synchronously
+            await closed
+    mongo_client = None
+    db = None
+
+
 # -----------------------------------------------------------
 # ✅ Helper to get collection
 # -----------------------------------------------------------
 def get_collection(collection_name: str):
     """
-    Return a MongoDB collection by name.
+    Return a MongoDB collection by name (async API: await its methods).
     Example: users = get_collection("users")
     """
     if db is None:
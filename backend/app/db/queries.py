@@ -0,0 +1,172 @@
+# app/db/queries.py
+
+import os
+import uuid
+import inspect
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Deque, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+from app.db.connection import get_collection
+from app.models.message_model import MESSAGES_COLLECTION, QUERY_LOG_COLLECTION, chat_turn, query_log
+from app.services.write_buffer import write_buffer
+
+QUERY_LOG_TTL_DAYS = int(os.getenv("QUERY_LOG_TTL_DAYS", "90"))  # 0 = keep forever
+CONVERSATION_CACHE_SESSIONS = int(os.getenv("CONVERSATION_CACHE_SESSIONS", "10000"))  # sessions kept in memory
+CONVERSATION_CACHE_TURNS = 10  # English (question, answer) pairs kept per session
+
+# -----------------------------------------------------------
+# ✅ Indexes (created at startup; no-ops when they already exist)
+# -----------------------------------------------------------
+INDEXES = {
+    MESSAGES_COLLECTION: [
+        # conversation history of one session, newest first
+        ([("session_id", ASCENDING), ("created_at", DESCENDING)], {}),
+        ([("created_at", DESCENDING)], {}),
+    ],
+    QUERY_LOG_COLLECTION: [
+        # dashboard: volume / latency over a time window, split by outcome or language
+        ([("created_at", DESCENDING)],
+         {"expireAfterSeconds": QUERY_LOG_TTL_DAYS * 86400} if QUERY_LOG_TTL_DAYS else {}),
+        ([("outcome", ASCENDING), ("created_at", DESCENDING)], {}),
+        ([("language", ASCENDING), ("created_at", DESCENDING)], {}),
+    ],
+}
+
+
+async def ensure_indexes():
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            await get_collection(collection).create_index(keys, **options)
+
+
+# -----------------------------------------------------------
+# ✅ Writes (buffered; microseconds on the request path)
+# -----------------------------------------------------------
+def log_chat_turn(session_id: str, language: str, user_message: str, reply: str,
+                  user_message_en: str, reply_en: str):
+    """Conversation history: one answered turn (also kept in memory for the next prompt)."""
+    _remember_turn(session_id, user_message_en, reply_en)
+    write_buffer.add(MESSAGES_COLLECTION, chat_turn(session_id, language, user_message, reply, user_message_en, reply_en))
+
+
+def log_query(session_id: str, endpoint: str, language: str, question: str, outcome: str,
+              latency_ms: float, stages_ms: dict, prompt_tokens: Optional[int] = None):
+    """Analytics: one chat request, answered or not."""
+    write_buffer.add(QUERY_LOG_COLLECTION, query_log(
+        session_id, endpoint, language, question, outcome, latency_ms, stages_ms, prompt_tokens
+    ))
+
+
+# -----------------------------------------------------------
+# ✅ Recent conversation turns (in memory, MongoDB behind it)
+# -----------------------------------------------------------
+# session id → last English (question, answer) pairs, least recently used first
+_recent: "OrderedDict[str, Deque[Tuple[str, str]]]" = OrderedDict()
+
+
+def _session_turns(session_id: str) -> Deque[Tuple[str, str]]:
+    turns = _recent.get(session_id)
+    if turns is None:
+        turns = _recent[session_id] = deque(maxlen=CONVERSATION_CACHE_TURNS)
+        while len(_recent) > CONVERSATION_CACHE_SESSIONS:
+            _recent.popitem(last=False)
+    else:
+        _recent.move_to_end(session_id)
+    return turns
+
+
+def _remember_turn(session_id: str, question_en: str, answer_en: str):
+    _session_turns(session_id).append((question_en, answer_en))
+
+
+def start_session() -> str:
+    """New session id, known to have no history (saves a lookup on its first turn)."""
+    session_id = uuid.uuid4().hex
+    _session_turns(session_id)
+    return session_id
+
+
+async def conversation_history(session_id: str, limit: int) -> List[Tuple[str, str]]:
+    """
+    The session's last `limit` (question, answer) pairs in English, oldest
+    first. Sessions this worker has not seen are read from MongoDB; turns
+    another worker answered less than a flush interval ago may be missing.
+    """
+    if limit <= 0:
+        return []
+    turns = _recent.get(session_id)
+    if turns is None:
+        try:
+            docs = await recent_turns(session_id, min(limit, CONVERSATION_CACHE_TURNS))
+        except Exception as e:
+            print(f"❌ Could not load conversation {session_id}: {e}")
+            docs = []
+        turns = _session_turns(session_id)
+        turns.extend(
+            (d.get("user_message_en") or d["user_message"], d.get("reply_en") or d["reply"]) for d in docs
+        )
+    else:
+        _recent.move_to_end(session_id)
+    return list(turns)[-limit:]
+
+
+# -----------------------------------------------------------
+# ✅ Reads
+# -----------------------------------------------------------
+async def recent_turns(session_id: str, limit: int = 10) -> List[dict]:
+    """The session's last `limit` turns, oldest first."""
+    cursor = (
+        get_collection(MESSAGES_COLLECTION)
+        .find({"session_id": session_id}, {"_id": 0, "user_message": 1, "reply": 1, "user_message_en": 1, "reply_en": 1,
+                                    "language": 1, "created_at": 1})
+        .sort("created_at", DESCENDING)
+        .limit(limit)
+    )
+    turns = [doc async for doc in cursor]
+    return turns[::-1]
+
+
+async def query_summary(days: int = 7, top: int = 10, since: Optional[datetime] = None) -> dict:
+    """
+    Dashboard numbers for the last `days`: requests per day, per outcome
+    and per language, average latency, and the most asked questions.
+    """
+    since = since or datetime.now(timezone.utc) - timedelta(days=days)
+    logs = get_collection(QUERY_LOG_COLLECTION)
+    match = {"$match": {"created_at": {"$gte": since}}}
+
+    async def grouped(key, extra=None, limit=None):
+        group = {"_id": key, "count": {"$sum": 1}, **(extra or {})}
+        pipeline = [match, {"$group": group}, {"$sort": {"count": -1}}]
+        if limit:
+            pipeline.append({"$limit": limit})
+        cursor = await _aggregate(logs, pipeline)
+        return [doc async for doc in cursor]
+
+    latency = {"avg_latency_ms": {"$avg": "$latency_ms"}}
+    per_day = await grouped(
+        {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+        {**latency, "avg_prompt_tokens": {"$avg": "$prompt_tokens"}},
+    )
+    return {
+        "since": since.isoformat(),
+        "per_day": sorted(per_day, key=lambda d: d["_id"]),
+        "outcomes": {
+            d["_id"]: {"count": d["count"], "avg_latency_ms": d["avg_latency_ms"]}
+            for d in await grouped("$outcome", latency)
+        },
+        "languages": {d["_id"]: d["count"] for d in await grouped("$language")},
+        "top_questions": [
+            {"question": d["_id"], "count": d["count"]}
+            for d in await grouped({"$toLower": "$question"}, limit=top)
+        ],
+    }
+
+
+async def _aggregate(collection, pipeline: list):
+    # AsyncMongoClient's aggregate() is a coroutine; the in-memory stand-in returns the cursor
+    cursor = collection.aggregate(pipeline)
+    return await cursor if inspect.isawaitable(cursor) else cursor
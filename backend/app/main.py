@@ -1,14 +1,29 @@
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.middleware.language_middleware import language_middleware
 
 from app.routes.chat_routes import router as chat_router
 from app.routes.health_routes import router as health_router
 from app.routes.admin_routes import router as admin_router
 
-from app.db.connection import connect_to_mongo
+from app.db.connection import connect_to_mongo, close_mongo
+from app.db.queries import ensure_indexes
+from app.utils.startup import STARTUP_TIMINGS, timed, warm_up
+from app.services.llm_service import close_client as close_llm_client
+from app.services.translation_service import TRANSLATION_CACHE_MONGO, ensure_cache_indexes
+from app.services.embedding_scheduler import embedding_scheduler
+from app.services.ingest_jobs import ingest_jobs
+from app.services.write_buffer import write_buffer
+from app.services.snapshots import INDEX_RELOAD_INTERVAL
+from app.services.knowledge_service import refresh_knowledge_base
 
 import uvicorn
+import asyncio
+
+# Heavy models are NOT imported here — they load in the warm-up task below
+STARTUP_TIMINGS["imports"] = round(time.perf_counter() - _import_started, 3)
 
 
 # -----------------------------------------------------------
@@ -33,16 +48,52 @@ app.add_middleware(
     allow_headers=["*"],        # allows all headers like Content-Type or Authorization
 )
 
-app.middleware("http")(language_middleware)
-
 # -----------------------------------------------------------
-# ✅ DB Startup Event
+# ✅ DB Startup Event + model warm-up
 # -----------------------------------------------------------
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     print("🚀 Connecting to MongoDB...")
-    connect_to_mongo()
+    with timed("mongo_connect"):
+        await connect_to_mongo()
     print("✅ MongoDB connected.")
+    with timed("mongo_indexes"):
+        await ensure_indexes()
+        if TRANSLATION_CACHE_MONGO:
+            await ensure_cache_indexes()
+    # Chat turns + query logs are buffered and bulk-inserted in the background
+    write_buffer.start()
+
+    # Load embedding model + FAISS index in the background;
+    # /api/health reports readiness meanwhile
+    app.state.warm_up_task = asyncio.create_task(warm_up())
+    if INDEX_RELOAD_INTERVAL > 0:
+        app.state.reload_task = asyncio.create_task(watch_index_snapshots())
+
+
+async def watch_index_snapshots():
+    """
+    Hot-reloads index snapshots published by other uvicorn workers
+    (or the offline scripts) without a restart.
+    """
+    while True:
+        await asyncio.sleep(INDEX_RELOAD_INTERVAL)
+        try:
+            await asyncio.to_thread(refresh_knowledge_base)
+        except Exception as e:
+            print(f"❌ Index reload failed: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    reload_task = getattr(app.state, "reload_task", None)
+    if reload_task is not None:
+        reload_task.cancel()
+    await close_llm_client()
+    await embedding_scheduler.close()
+    ingest_jobs.shutdown()
+    await write_buffer.close()  # flush what is still buffered
+    await close_mongo()
 
 
 # -----------------------------------------------------------
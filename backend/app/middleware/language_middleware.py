@@ -1,11 +1,7 @@
 # app/middleware/language_middleware.py
 
-from fastapi import Request
-from langdetect import detect, DetectorFactory
-from typing import Tuple
-
-# Ensures consistent language detection
-DetectorFactory.seed = 0
+import re
+from typing import Optional
 
 # Supported languages for your chatbot
 SUPPORTED_LANGUAGES = {
@@ -24,24 +20,70 @@ ROMANIZED_MAPPING = {
     "ta": ["tamil", "tamil-roman", "tamil-telugu"]
 }
 
+# -----------------------------------------------------------
+# Unicode script → language (our Indic languages each have their own block)
+# -----------------------------------------------------------
+SCRIPT_PATTERNS = {
+    "hi": re.compile(r"[\u0900-\u097F]"),  # Devanagari
+    "bn": re.compile(r"[\u0980-\u09FF]"),  # Bengali
+    "ta": re.compile(r"[\u0B80-\u0BFF]"),  # Tamil
+    "te": re.compile(r"[\u0C00-\u0C7F]"),  # Telugu
+}
+LATIN_PATTERN = re.compile(r"[A-Za-z]")
+MIN_WORDS_FOR_STATISTICAL = 3  # langdetect is noise on 1-2 word messages
+
+_langdetect = None
+
+
+def detect_script(text: str) -> Optional[str]:
+    """
+    Returns the language whose script dominates the text, "latin" for
+    Latin-script text, or None if there are no letters at all.
+    """
+    counts = {lang: len(p.findall(text)) for lang, p in SCRIPT_PATTERNS.items()}
+    lang, count = max(counts.items(), key=lambda kv: kv[1])
+    latin = len(LATIN_PATTERN.findall(text))
+    if count and count >= latin:
+        return lang
+    return "latin" if latin else None
+
+
+def _statistical_detect(text: str) -> str:
+    # Imported on first use; only Latin / Romanized text ever gets here
+    global _langdetect
+    try:
+        if _langdetect is None:
+            import langdetect
+            langdetect.DetectorFactory.seed = 0  # Ensures consistent language detection
+            _langdetect = langdetect
+        return _langdetect.detect(text).lower()  # returns ISO 639-1 code
+    except Exception:
+        return "en"
+
 
 # -----------------------------------------------------------
 # Detect language from user text
 # -----------------------------------------------------------
-def detect_language(text: str) -> str:
+def detect_language(text: str, hint: Optional[str] = None) -> str:
     """
     Detects language of the input text and normalizes to supported language codes.
+    1. Indic script present → that language (exact, no model needed)
+    2. Latin / Romanized text → client's language hint if given,
+       else langdetect for longer messages
     Defaults to English if detection fails or unsupported.
     """
-    try:
-        detected = detect(text).lower()  # returns ISO 639-1 code
-    except:
-        detected = "en"
+    script = detect_script(text)
+    if script in SUPPORTED_LANGUAGES:
+        return script
+
+    if hint:
+        return hint  # validated by the controller
 
-    if detected in SUPPORTED_LANGUAGES:
-        return detected
-    else:
-        return "en"  # fallback
+    if script == "latin" and len(text.split()) >= MIN_WORDS_FOR_STATISTICAL:
+        detected = _statistical_detect(text)
+        if detected in SUPPORTED_LANGUAGES:
+            return detected
+    return "en"  # fallback
 
 
 # -----------------------------------------------------------
@@ -60,27 +102,3 @@ def normalize_text(text: str, lang_code: str) -> str:
 
     return text
 
-
-# -----------------------------------------------------------
-# Middleware for FastAPI
-# -----------------------------------------------------------
-async def language_middleware(request: Request, call_next):
-    """
-    FastAPI middleware to detect and normalize language for incoming requests.
-    Attaches 'lang_code' and 'normalized_text' to request.state for controllers.
-    """
-    try:
-        body = await request.json()
-        text = body.get("message") or ""
-    except:
-        text = ""
-
-    lang_code = detect_language(text)
-    normalized_text = normalize_text(text, lang_code)
-
-    # Attach to request.state for downstream usage
-    request.state.lang_code = lang_code
-    request.state.normalized_text = normalized_text
-
-    response = await call_next(request)
-    return response
@@ -0,0 +1,71 @@
+# app/models/message_model.py
+
+from datetime import datetime, timezone
+from typing import Dict, Optional, TypedDict
+
+# -----------------------------------------------------------
+# ✅ Collections
+# -----------------------------------------------------------
+MESSAGES_COLLECTION = "messages"      # one document per chat turn (conversation history)
+QUERY_LOG_COLLECTION = "query_logs"   # one document per chat request (analytics)
+
+
+# -----------------------------------------------------------
+# ✅ Conversation turn
+# -----------------------------------------------------------
+class ChatTurn(TypedDict):
+    session_id: str
+    language: str
+    user_message: str
+    reply: str
+    user_message_en: Optional[str]  # English as the pipeline saw it (None when language is "en")
+    reply_en: Optional[str]
+    created_at: datetime
+
+
+# -----------------------------------------------------------
+# ✅ Query log entry (what the admin dashboard aggregates)
+# -----------------------------------------------------------
+class QueryLog(TypedDict):
+    session_id: str
+    endpoint: str                  # "chat" | "stream"
+    language: str
+    question: str
+    outcome: str                   # "faq" | "cached" | "generated" | "error"
+    latency_ms: float
+    stages_ms: Dict[str, float]
+    prompt_tokens: Optional[int]   # None when no LLM prompt was built
+    created_at: datetime
+
+
+# Plain dicts rather than pydantic models: these are built on every chat
+# request, where validation would cost more than the rest of the logging.
+def chat_turn(session_id: str, language: str, user_message: str, reply: str,
+              user_message_en: Optional[str] = None, reply_en: Optional[str] = None,
+              created_at: Optional[datetime] = None) -> ChatTurn:
+    english = language == "en"
+    return {
+        "session_id": session_id,
+        "language": language,
+        "user_message": user_message,
+        "reply": reply,
+        "user_message_en": None if english else user_message_en,
+        "reply_en": None if english else reply_en,
+        "created_at": created_at or datetime.now(timezone.utc),
+    }
+
+
+def query_log(session_id: str, endpoint: str, language: str, question: str, outcome: str,
+              latency_ms: float, stages_ms: Dict[str, float], prompt_tokens: Optional[int] = None,
+              created_at: Optional[datetime] = None) -> QueryLog:
+    return {
+        "session_id": session_id,
+        "endpoint": endpoint,
+        "language": language,
+        "question": question,
+        "outcome": outcome,
+        "latency_ms": latency_ms,
+        "stages_ms": stages_ms,
+        "prompt_tokens": prompt_tokens,
+        "created_at": created_at or datetime.now(timezone.utc),
+    }
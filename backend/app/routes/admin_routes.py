@@ -1,25 +1,132 @@
 # app/routes/admin_routes.py
 
-from fastapi import APIRouter, UploadFile, File
-from app.services.knowledge_service import ingest_documents
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse
+from app.services.ingest_jobs import ingest_jobs, IngestQueueFull
+from app.services.vector_service import get_vector_store
+from app.db.queries import query_summary, recent_turns
+from typing import Optional
 import os
+import asyncio
 
 router = APIRouter()
 
 UPLOAD_FOLDER = "college_data"
+STAGING_FOLDER = os.path.join(UPLOAD_FOLDER, ".uploads")  # partial uploads, invisible to ingestion
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "200"))
 
-@router.post("/upload")
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def _save_upload(file: UploadFile, dest_path: str):
+    """
+    Copies the upload to disk 1 MiB at a time (never the whole file in memory).
+    Writes to the staging folder first and moves it in place when complete,
+    so a running ingestion job never picks up a half-written file.
+    """
+    os.makedirs(STAGING_FOLDER, exist_ok=True)
+    part_path = os.path.join(STAGING_FOLDER, os.path.basename(dest_path) + ".part")
+    written = 0
+    try:
+        with open(part_path, "wb") as out:
+            while True:
+                chunk = file.file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > MAX_UPLOAD_MB * 1024 * 1024:
+                    raise UploadTooLarge(f"{file.filename} is larger than {MAX_UPLOAD_MB} MB")
+                out.write(chunk)
+        os.replace(part_path, dest_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+
+@router.post("/upload", status_code=202)
 async def upload_files(files: list[UploadFile] = File(...)):
     saved_files = []
 
     for file in files:
-        file_location = os.path.join(UPLOAD_FOLDER, file.filename)
-        with open(file_location, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # basename: never let a client-supplied name escape the upload folder
+        file_location = os.path.join(UPLOAD_FOLDER, os.path.basename(file.filename or ""))
+        if file_location == UPLOAD_FOLDER + os.sep:
+            raise HTTPException(status_code=400, detail="Uploaded file has no name")
+        try:
+            await asyncio.to_thread(_save_upload, file, file_location)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        finally:
+            await file.close()
         saved_files.append(file_location)
 
-    # Trigger ingestion for FAISS / RAG
-    ingest_documents(UPLOAD_FOLDER)
+    # Queue ingestion for FAISS / RAG; poll /jobs/{job_id} for progress
+    try:
+        job = ingest_jobs.submit(saved_files, UPLOAD_FOLDER)
+    except IngestQueueFull as e:
+        # Files are saved; the next ingestion run will pick them up
+        return JSONResponse(
+            status_code=429,
+            headers={"Retry-After": "30"},
+            content={"detail": str(e), "files": saved_files},
+        )
+
+    return {
+        "message": f"{len(saved_files)} files uploaded, ingestion queued.",
+        "job_id": job["id"],
+        "status": job["status"],
+    }
+
+
+@router.get("/jobs")
+async def list_jobs():
+    return ingest_jobs.list()
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job: {job_id}")
+    return job
+
+
+# -----------------------------------------------------------
+# ✅ Dashboard analytics (query logs + conversation history)
+# -----------------------------------------------------------
+@router.get("/analytics")
+async def analytics(days: int = 7, top: int = 10):
+    return await query_summary(days=days, top=top)
+
+
+@router.get("/conversations/{session_id}")
+async def conversation(session_id: str, limit: int = 50):
+    return await recent_turns(session_id, limit)
+
 
-    return {"message": f"{len(saved_files)} files uploaded and ingested successfully!"}
+# -----------------------------------------------------------
+# ✅ Filtered knowledge-base search (only matching partitions are scanned)
+# -----------------------------------------------------------
+@router.get("/search")
+async def search(
+    q: str,
+    k: int = 5,
+    category: Optional[str] = None,
+    department: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    """
+    e.g. /search?q=exam+schedule&category=circulars&since=2024-06-01
+    category / department take comma-separated names; since / until are YYYY-MM-DD.
+    """
+    filters = {"category": category, "department": department, "since": since, "until": until}
+    try:
+        # Loading the store (first call / warm-up) happens on the worker thread too
+        return await asyncio.to_thread(lambda: get_vector_store().search(q, k, filters=filters))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
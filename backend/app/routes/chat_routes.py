@@ -1,8 +1,16 @@
 # app/routes/chat_routes.py
-from fastapi import APIRouter, HTTPException
-from app.controllers.chat_controller import handle_user_message
+import json
+import weakref
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.controllers.chat_controller import handle_user_message, stream_user_message, admission_priority, SUPPORTED_LANGUAGES
+from app.middleware.language_middleware import detect_language, normalize_text
 from pydantic import BaseModel
-from app.db.connection import db
+from typing import Optional
+from app.db.queries import log_query, start_session
+from app.utils.startup import READINESS, is_ready
+from app.services.metrics import Trace, begin_trace, use_trace, span
+from app.services.admission import admission, client_id, Overloaded
 
 # -----------------------------------------------------------
 # ✅ Initialize Router
@@ -14,20 +22,129 @@ router = APIRouter(tags=["Chatbot"])
 # -----------------------------------------------------------
 class ChatRequest(BaseModel):
     user_message: str
-    language: str  # e.g., "en", "hi", "te", "bn", "ta"
+    language: Optional[str] = None  # e.g., "en", "hi", "te", "bn", "ta"; omit to auto-detect
+    session_id: Optional[str] = None  # groups turns into a conversation; one is issued if omitted
+
+    def resolved(self):
+        """
+        (language, text) to hand to the controller. Indic script in the
+        message wins over the client's language; Latin text uses it as a hint.
+        400 for a language the controller cannot answer in, before any
+        admission slot is taken.
+        """
+        lang_code = detect_language(self.user_message, hint=self.language)
+        if lang_code not in SUPPORTED_LANGUAGES:
+            raise HTTPException(status_code=400, detail=f"Unsupported language code: {lang_code}")
+        return lang_code, normalize_text(self.user_message, lang_code)
+
+
+def _log_query(trace: Trace, session_id: str, language: str, user_message: str):
+    # Buffered: just builds a dict; MongoDB is written in the background
+    log_query(
+        session_id, trace.endpoint, language, user_message, trace.outcome,
+        round(trace.total * 1000, 2), {k: round(v * 1000, 2) for k, v in trace.stages.items()},
+        trace.prompt_tokens,
+    )
+
+
+def _ensure_ready():
+    if not is_ready() and READINESS["status"] != "failed":
+        # Fail fast while models warm up instead of queueing behind the load
+        raise HTTPException(
+            status_code=503,
+            detail="Chatbot is starting up, please retry shortly.",
+            headers={"Retry-After": "5"},
+        )
+
+
+def _shed(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=e.status, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+
+async def _admit(http_request: Request, language: str, user_message: str):
+    """
+    Per-client rate limit + admission slot (exact FAQ questions queue first).
+    Sheds with 429 / 503 + Retry-After; returns the function that frees the slot.
+    """
+    try:
+        return await admission.enter(client_id(http_request), admission_priority(user_message, language))
+    except Overloaded as e:
+        raise _shed(e)
 
 
 # -----------------------------------------------------------
 # ✅ POST Endpoint — Handles Chat Messages
 # -----------------------------------------------------------
 @router.post("/")
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_request: Request):
     """
     Handles chat messages from frontend, detects language, 
     translates, processes through model, and returns multilingual response.
+    429 / 503 with Retry-After when the request is shed under load.
     """
+    _ensure_ready()
+    trace = begin_trace("chat")
+    with span("detect"):
+        language, user_message = request.resolved()
+    leave = await _admit(http_request, language, user_message)
+    session_id = request.session_id or start_session()
+
     try:
-        response = await handle_user_message(request.user_message, request.language)
-        return {"reply": response}
+        response = await handle_user_message(user_message, language, session_id)
+        return {"reply": response, "session_id": session_id}
+    except Overloaded as e:
+        trace.outcome = "shed"
+        raise _shed(e)
     except Exception as e:
+        trace.outcome = "error"
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        leave()
+        trace.finish()
+        _log_query(trace, session_id, language, user_message)
+
+
+# -----------------------------------------------------------
+# ✅ POST Endpoint — Streaming replies (Server-Sent Events)
+# -----------------------------------------------------------
+@router.post("/stream")
+async def chat_stream_endpoint(request: ChatRequest, http_request: Request):
+    """
+    Same as POST /api/chat/ but streams the reply as SSE:
+    `stage` events while the pipeline runs, `text` events as the answer
+    is generated, then a final `done` event with the full reply.
+    429 / 503 with Retry-After when shed before the stream starts; an
+    `error` event with `retry_after` when no LLM slot frees up in time.
+    """
+    _ensure_ready()
+    trace = begin_trace("stream")
+    with span("detect"):
+        language, user_message = request.resolved()
+    leave = await _admit(http_request, language, user_message)
+    session_id = request.session_id or start_session()
+
+    async def events():
+        use_trace(trace)  # the body is streamed from another task
+        try:
+            async for event in stream_user_message(user_message, language, session_id):
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except Overloaded as e:
+            trace.outcome = "shed"
+            error = {"type": "error", "detail": e.detail, "retry_after": e.retry_after}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+        except Exception as e:
+            trace.outcome = "error"
+            yield f"event: error\ndata: {json.dumps({'type': 'error', 'detail': str(e)})}\n\n"
+        finally:
+            leave()
+            trace.finish()
+            _log_query(trace, session_id, language, user_message)
+
+    body = events()
+    # A client gone before the body starts never runs its finally: free the slot when it is dropped
+    weakref.finalize(body, leave)
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-Id": session_id},
+    )
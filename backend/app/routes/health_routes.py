@@ -0,0 +1,100 @@
+# app/routes/health_routes.py
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.utils.startup import READINESS, STARTUP_TIMINGS, is_ready
+from app.services.answer_cache import answer_cache
+from app.services.translation_service import translation_cache_stats
+from app.services.embedding_scheduler import embedding_scheduler
+from app.services.faq_index import faq_index
+from app.services.ingest_jobs import ingest_jobs
+from app.services.llm_service import llm_stats
+from app.services.metrics import CONTENT_TYPE, render_metrics
+from app.services.write_buffer import write_buffer
+from app.services.vector_service import loaded_vector_store
+from app.services.admission import admission
+
+# -----------------------------------------------------------
+# ✅ Initialize Router
+# -----------------------------------------------------------
+router = APIRouter()
+
+
+# -----------------------------------------------------------
+# ✅ Liveness + readiness state (never waits on models)
+# -----------------------------------------------------------
+@router.get("/")
+def health():
+    """
+    Always answers immediately. 'ready' turns true once the embedding
+    model and FAISS index are loaded.
+    """
+    return {
+        "status": "ok",
+        "ready": is_ready(),
+        "stage": READINESS["status"],
+        "error": READINESS["error"],
+        "startup_timings": STARTUP_TIMINGS,
+        "caches": {
+            "answers": answer_cache.stats(),
+            "translations": translation_cache_stats(),
+        },
+        "embedding_batches": embedding_scheduler.stats(),
+        "admission": admission.stats(),
+        "db_write_buffer": write_buffer.stats(),
+        "vector_index": _vector_index_stats(),
+    }
+
+
+def _vector_index_stats() -> dict:
+    # Only once warm-up (or a first request) has loaded the store
+    store = loaded_vector_store()
+    return store.stats() if store is not None else {}
+
+
+# -----------------------------------------------------------
+# ✅ Readiness probe (503 until warm-up finishes)
+# -----------------------------------------------------------
+@router.get("/ready")
+def ready():
+    if is_ready():
+        return {"ready": True}
+    return JSONResponse(status_code=503, content={"ready": False, "stage": READINESS["status"]})
+
+
+# -----------------------------------------------------------
+# ✅ Prometheus metrics (stage latencies, cache hit rates, queue depths)
+# -----------------------------------------------------------
+# Stats keys that only ever grow → exported as <group>_<key>_total counters
+COUNTERS = {
+    "answer_cache": ("hits", "misses", "evictions", "stale"),
+    "translation_cache": ("hits", "misses"),
+    "embedding_scheduler": ("queries", "batches"),
+    "chat_admission": (
+        "requests_admitted", "requests_rejected_queue_full", "requests_rejected_timeout",
+        "generations_admitted", "generations_rejected_queue_full", "generations_rejected_timeout",
+        "rejected_rate_limited",
+    ),
+    "db_write_buffer": ("written", "flushes", "errors", "dropped"),
+}
+
+
+@router.get("/metrics")
+def metrics():
+    """
+    chat_stage_seconds / chat_request_seconds histograms plus counters and
+    gauges, in the Prometheus text exposition format. Per worker process.
+    """
+    stats = {
+        "answer_cache": answer_cache.stats(),
+        "translation_cache": translation_cache_stats(),
+        "faq_index": {"size": len(faq_index)},
+        "embedding_scheduler": embedding_scheduler.stats(),
+        "llm": llm_stats(),
+        "chat_admission": admission.stats(),
+        "ingest_jobs": ingest_jobs.stats(),
+        "db_write_buffer": write_buffer.stats(),
+        "vector_index": _vector_index_stats(),
+        "ready": {"status": int(is_ready())},
+    }
+    return PlainTextResponse(render_metrics(stats, COUNTERS), media_type=CONTENT_TYPE)
@@ -0,0 +1,230 @@
+# app/services/admission.py
+
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.llm_service import LLM_MAX_CONCURRENCY
+from app.services.metrics import record
+
+# -----------------------------
+# Settings (per uvicorn worker)
+# -----------------------------
+# Every chat request holds an admission slot; only those that need the LLM also
+# take a generation slot, so FAQ / cached answers never wait behind generations.
+# Keep CHAT_MAX_IN_FLIGHT above CHAT_MAX_GENERATIONS + CHAT_GENERATION_QUEUE.
+CHAT_MAX_IN_FLIGHT = int(os.getenv("CHAT_MAX_IN_FLIGHT", "128"))         # chat requests being worked on
+CHAT_QUEUE_SIZE = int(os.getenv("CHAT_QUEUE_SIZE", "256"))               # waiting for a slot; beyond → 503
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "5"))         # seconds waited before → 503
+CHAT_MAX_GENERATIONS = int(os.getenv("CHAT_MAX_GENERATIONS", str(LLM_MAX_CONCURRENCY)))  # retrieval + LLM at once
+CHAT_GENERATION_QUEUE = int(os.getenv("CHAT_GENERATION_QUEUE", "64"))
+CHAT_GENERATION_TIMEOUT = float(os.getenv("CHAT_GENERATION_TIMEOUT", "15"))
+CHAT_RATE_LIMIT = float(os.getenv("CHAT_RATE_LIMIT", "30"))              # requests / minute per client; 0 = off
+CHAT_RATE_BURST = int(os.getenv("CHAT_RATE_BURST", "10"))
+CHAT_RATE_CLIENTS = 10000                                                # buckets kept, least recently seen dropped
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "0") == "1"      # client = first X-Forwarded-For hop
+MAX_RETRY_AFTER = 60
+
+# Waiter priorities (lower is served first)
+FAST = 0  # answerable without the LLM (exact FAQ match)
+FULL = 1
+
+
+class Overloaded(Exception):
+    """A request shed by admission control: HTTP `status` (429 / 503) with Retry-After."""
+
+    def __init__(self, status: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+def client_id(request) -> str:
+    """Rate-limit key of a Starlette request: the peer address (or proxy-reported client)."""
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+# -----------------------------
+# ✅ Bounded, prioritised concurrency gate
+# -----------------------------
+class Gate:
+    """
+    At most `limit` holders; up to `queue_size` more wait (FAST before FULL,
+    then first come first served) for at most `timeout` seconds. Anything
+    beyond is rejected at once: shedding early keeps admitted requests at
+    full speed instead of slowing every request down together.
+    Used from the event loop only, so no locking.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, timeout: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self.avg_hold = 1.0  # seconds a slot is held (moving average), for Retry-After
+        self.admitted = self.rejected_full = self.rejected_timeout = self.max_queued = 0
+
+    def retry_after(self) -> int:
+        # Time for the requests ahead to drain at the observed hold time
+        wait = (len(self._waiters) + 1) * self.avg_hold / self.limit
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(wait)))
+
+    async def acquire(self, priority: int = FULL) -> float:
+        """Takes a slot; returns the seconds spent queued. Raises Overloaded (503)."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return 0.0
+        if len(self._waiters) >= self.queue_size:
+            self.rejected_full += 1
+            raise Overloaded(503, self.retry_after(), f"Server busy ({self.name} queue full), please retry shortly.")
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._seq), future)
+        heapq.heappush(self._waiters, entry)
+        self.max_queued = max(self.max_queued, len(self._waiters))
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                self.release()  # handed a slot just as we gave up
+            elif entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected_timeout += 1
+                raise Overloaded(503, self.retry_after(), f"Server busy ({self.name} queue wait), please retry shortly.")
+            raise
+        self.admitted += 1
+        return time.perf_counter() - started
+
+    def release(self, held: Optional[float] = None):
+        if held is not None:
+            self.avg_hold += 0.1 * (held - self.avg_hold)
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)  # the slot passes straight to the next waiter
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def hold(self, priority: int = FULL):
+        record(f"{self.name}_queue", await self.acquire(priority))
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "limit": self.limit,
+            "queued": len(self._waiters),
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_hold_s": round(self.avg_hold, 3),
+        }
+
+
+# -----------------------------
+# ✅ Per-client token bucket
+# -----------------------------
+class RateLimiter:
+    """`burst` requests at once per client, refilled at `per_minute`; beyond → 429."""
+
+    def __init__(self, per_minute: float = CHAT_RATE_LIMIT, burst: int = CHAT_RATE_BURST, max_clients: int = CHAT_RATE_CLIENTS):
+        self.rate = per_minute / 60
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # client → [tokens, last refill]
+        self.rejected = 0
+
+    def check(self, client: str):
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        bucket = self._buckets.pop(client, None) or [float(self.burst), now]
+        self._buckets[client] = bucket
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        if tokens < 1:
+            bucket[:] = [tokens, now]
+            self.rejected += 1
+            retry_after = min(MAX_RETRY_AFTER, math.ceil((1 - tokens) / self.rate))
+            raise Overloaded(429, retry_after, "Too many requests, please slow down.")
+        bucket[:] = [tokens - 1, now]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+# -----------------------------
+# ✅ Admission control for /api/chat
+# -----------------------------
+class AdmissionController:
+    """
+    Rate limit per client, then an admission slot for the whole request;
+    the retrieval + LLM part additionally needs a generation slot.
+    """
+
+    def __init__(self):
+        self.requests = Gate("admission", CHAT_MAX_IN_FLIGHT, CHAT_QUEUE_SIZE, CHAT_QUEUE_TIMEOUT)
+        self.generations = Gate("generation", CHAT_MAX_GENERATIONS, CHAT_GENERATION_QUEUE, CHAT_GENERATION_TIMEOUT)
+        self.rate = RateLimiter()
+
+    async def enter(self, client: str, priority: int = FULL) -> Callable[[], None]:
+        """
+        Admits one chat request (raises Overloaded: 429 rate limit, 503 queue
+        full / waited too long). Returns the function that frees its slot;
+        calling it more than once is harmless.
+        """
+        self.rate.check(client)
+        record("admission_queue", await self.requests.acquire(priority))
+        started = time.perf_counter()
+        left = False
+
+        def leave():
+            nonlocal left
+            if not left:
+                left = True
+                self.requests.release(time.perf_counter() - started)
+
+        return leave
+
+    def generation(self):
+        """async with admission.generation(): … — one retrieval + LLM call."""
+        return self.generations.hold()
+
+    def stats(self) -> Dict[str, float]:
+        requests, generations = self.requests.stats(), self.generations.stats()
+        return {
+            "in_flight": requests["active"],
+            "queued": requests["queued"],
+            **{f"requests_{k}": v for k, v in requests.items() if k not in ("active", "queued")},
+            **{f"generations_{k}": v for k, v in generations.items()},
+            "rejected_rate_limited": self.rate.rejected,
+            "clients_tracked": len(self.rate),
+        }
+
+
+admission = AdmissionController()
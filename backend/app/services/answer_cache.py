@@ -0,0 +1,109 @@
+# app/services/answer_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+# -----------------------------
+# Settings
+# -----------------------------
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "5000"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))  # cosine similarity
+
+
+# -----------------------------
+# ✅ Semantic answer cache
+# -----------------------------
+class SemanticAnswerCache:
+    """
+    Caches English answers keyed by the English query embedding.
+    A lookup hits when a cached query is within `threshold` cosine similarity
+    AND was answered against the same knowledge-base version.
+    Vectors live in a fixed (max_size x dim) matrix, so a lookup is one
+    matrix-vector product; eviction is LRU.
+    """
+
+    def __init__(self, max_size: int = SEMANTIC_CACHE_SIZE, threshold: float = SEMANTIC_CACHE_THRESHOLD):
+        self.max_size = max_size
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None   # allocated on first use (dim unknown until then)
+        self._valid = np.zeros(max_size, dtype=bool)
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()  # slot → entry, LRU order
+        self._free = list(range(max_size - 1, -1, -1))
+        self.hits = self.misses = self.evictions = self.stale = 0
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        v = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _drop(self, slot: int):
+        self._entries.pop(slot, None)
+        self._valid[slot] = False
+        self._free.append(slot)
+
+    def lookup(self, embedding: np.ndarray, kb_version: int) -> Optional[str]:
+        with self.lock:
+            if self._vectors is None or not self._entries:
+                self.misses += 1
+                return None
+            q = self._normalize(embedding)
+            sims = self._vectors @ q
+            sims[~self._valid] = -1.0
+            slot = int(np.argmax(sims))
+            if sims[slot] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry = self._entries[slot]
+            if entry["kb_version"] != kb_version:
+                # Answered against an older knowledge base → never serve it
+                self._drop(slot)
+                self.stale += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return entry["answer"]
+
+    def store(self, embedding: np.ndarray, query: str, answer: str, kb_version: int):
+        with self.lock:
+            q = self._normalize(embedding)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, q.shape[0]), dtype=np.float32)
+            if not self._free:
+                oldest, _ = self._entries.popitem(last=False)
+                self._valid[oldest] = False
+                self._free.append(oldest)
+                self.evictions += 1
+            slot = self._free.pop()
+            self._vectors[slot] = q
+            self._valid[slot] = True
+            self._entries[slot] = {"query": query, "answer": answer, "kb_version": kb_version}
+
+    def invalidate(self):
+        """Drops every entry (called after ingestion changes the knowledge base)."""
+        with self.lock:
+            for slot in list(self._entries):
+                self._drop(slot)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "stale": self.stale,
+        }
+
+
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,261 @@
+# app/services/chunk_store.py
+
+import os
+import json
+import mmap
+import threading
+import numpy as np
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# -----------------------------
+# On-disk layout
+# -----------------------------
+#   chunks.dat  append-only JSON records ({"text": ..., "source": ...}), back to back
+#   chunks.idx  fixed-width (offset, length) int64 pairs; row i = chunk id i,
+#               offset -1 = no chunk / deleted
+# Both are memory-mapped, so lookups read only the pages they touch and
+# several uvicorn workers share the same page cache.
+CHUNK_DATA_PATH = "chunks.dat"
+CHUNK_INDEX_PATH = "chunks.idx"
+COMPACT_GARBAGE_RATIO = 0.5  # rewrite chunks.dat once half of it is deleted records
+
+_ENTRY = np.dtype([("offset", "<i8"), ("length", "<i8")])
+
+
+class ChunkStore:
+    """
+    Maps FAISS chunk ids → {"text", "source"} without loading the corpus.
+    Read-side behaves like a read-only dict (get, [], in, len, iter over ids).
+    """
+
+    def __init__(self, data_path: str = CHUNK_DATA_PATH, index_path: str = CHUNK_INDEX_PATH):
+        self.data_path = data_path
+        self.index_path = index_path
+        self.lock = threading.RLock()
+        for path in (data_path, index_path):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+
+        self._data_file = open(data_path, "r+b")
+        self._index_file = open(index_path, "r+b")
+        self._data_map: Optional[mmap.mmap] = None
+        self._entries = np.empty(0, dtype=_ENTRY)
+        self._remap()
+        self._count_live()
+
+    def _count_live(self):
+        live = self._entries["offset"] >= 0
+        self._live = int(np.count_nonzero(live))
+        self._live_bytes = int(self._entries["length"][live].sum())
+        self._max_id = int(np.flatnonzero(live)[-1]) if self._live else -1
+
+    # -----------------------------
+    # mmap management
+    # -----------------------------
+    def _remap(self):
+        """(Re)maps both files; called after they grow."""
+        self._data_file.flush()
+        if isinstance(self._entries, np.memmap):
+            self._entries.flush()
+        data_size = os.fstat(self._data_file.fileno()).st_size
+        index_size = os.fstat(self._index_file.fileno()).st_size
+
+        if self._data_map is not None:
+            self._data_map.close()
+        self._data_map = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ) if data_size else None
+        rows = index_size // _ENTRY.itemsize
+        # Mapped through the open handles (not the paths), so both maps always
+        # come from the same pair of files even if another process compacts
+        self._entries = np.memmap(self._index_file, dtype=_ENTRY, mode="r+", shape=(rows,)) if rows else np.empty(0, dtype=_ENTRY)
+
+    def reload(self):
+        """
+        Reopens both files by path: picks up a compaction (os.replace) done by
+        another process, plus its appends and deletes.
+        """
+        with self.lock:
+            if isinstance(self._entries, np.memmap):
+                self._entries.flush()
+            if self._data_map is not None:
+                self._data_map.close()
+                self._data_map = None
+            self._entries = np.empty(0, dtype=_ENTRY)
+            self._data_file.close()
+            self._index_file.close()
+            self._data_file = open(self.data_path, "r+b")
+            self._index_file = open(self.index_path, "r+b")
+            self._remap()
+            self._count_live()
+
+    def _ensure_mapped(self, chunk_id: int, end: int = 0):
+        # Another process may have appended since we mapped the files
+        stale_index = chunk_id >= len(self._entries)
+        stale_data = end > (len(self._data_map) if self._data_map is not None else 0)
+        if stale_index or stale_data:
+            self._remap()
+
+    def _grow(self, rows: int):
+        """Extends the id → offset array to `rows` entries, marking new rows empty."""
+        current = os.fstat(self._index_file.fileno()).st_size // _ENTRY.itemsize
+        if rows <= current:
+            return
+        gap = np.zeros(rows - current, dtype=_ENTRY)
+        gap["offset"] = -1
+        self._index_file.seek(0, os.SEEK_END)
+        self._index_file.write(gap.tobytes())
+        self._index_file.flush()
+        self._remap()
+
+    # -----------------------------
+    # Read API (dict-like)
+    # -----------------------------
+    def get(self, chunk_id: int, default=None) -> Optional[dict]:
+        chunk_id = int(chunk_id)
+        if chunk_id < 0:
+            return default
+        with self.lock:
+            self._ensure_mapped(chunk_id)
+            if chunk_id >= len(self._entries):
+                return default
+            offset, length = (int(v) for v in self._entries[chunk_id])
+            if offset < 0:
+                return default
+            self._ensure_mapped(chunk_id, offset + length)
+            return json.loads(self._data_map[offset:offset + length])
+
+    def __getitem__(self, chunk_id: int) -> dict:
+        chunk = self.get(chunk_id)
+        if chunk is None:
+            raise KeyError(chunk_id)
+        return chunk
+
+    def __contains__(self, chunk_id) -> bool:
+        chunk_id = int(chunk_id)
+        return 0 <= chunk_id < len(self._entries) and self._entries[chunk_id]["offset"] >= 0
+
+    def __len__(self) -> int:
+        return self._live
+
+    def __bool__(self) -> bool:
+        return self._live > 0
+
+    def ids(self) -> np.ndarray:
+        """Live chunk ids, ascending."""
+        return np.flatnonzero(self._entries["offset"] >= 0).astype(np.int64)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids().tolist())
+
+    def max_id(self) -> int:
+        return self._max_id
+
+    def next_id(self) -> int:
+        """
+        Ids ever allocated (rows of chunks.idx, read from the file so appends by
+        another process count). Deleted rows stay, so this only ever grows.
+        """
+        with self.lock:
+            return os.fstat(self._index_file.fileno()).st_size // _ENTRY.itemsize
+
+    # -----------------------------
+    # Write API
+    # -----------------------------
+    def add_many(self, records: Iterable[Tuple[int, str, str]]):
+        """
+        Appends (chunk_id, text, source) records. Re-adding an id overwrites it,
+        but new chunks take ids from next_id(), so deleted ids are not handed out again.
+        """
+        with self.lock:
+            self._data_file.seek(0, os.SEEK_END)
+            offset = self._data_file.tell()
+            rows: List[Tuple[int, int, int]] = []
+            buf = bytearray()
+            for chunk_id, text, source in records:
+                payload = json.dumps({"text": text, "source": source}, ensure_ascii=False).encode("utf-8")
+                rows.append((int(chunk_id), offset + len(buf), len(payload)))
+                buf += payload
+            if not rows:
+                return
+            self._data_file.write(buf)
+            self._data_file.flush()
+            self._grow(max(chunk_id for chunk_id, _, _ in rows) + 1)
+
+            for chunk_id, rec_offset, length in rows:
+                if self._entries[chunk_id]["offset"] >= 0:
+                    self._live -= 1
+                    self._live_bytes -= int(self._entries[chunk_id]["length"])
+                self._entries[chunk_id] = (rec_offset, length)
+                self._live += 1
+                self._live_bytes += length
+                self._max_id = max(self._max_id, chunk_id)
+            self._remap()
+
+    def delete(self, chunk_ids: Iterable[int]):
+        with self.lock:
+            for chunk_id in chunk_ids:
+                chunk_id = int(chunk_id)
+                if chunk_id in self:
+                    self._live -= 1
+                    self._live_bytes -= int(self._entries[chunk_id]["length"])
+                    self._entries[chunk_id] = (-1, 0)
+            if self._max_id >= 0 and self._max_id not in self:
+                ids = self.ids()
+                self._max_id = int(ids[-1]) if len(ids) else -1
+
+    def flush(self):
+        """
+        fsyncs both files, compacting chunks.dat first if it is mostly garbage.
+        The fsync runs outside the lock, so lookups don't wait on the disk.
+        """
+        with self.lock:
+            data_size = os.fstat(self._data_file.fileno()).st_size
+            if data_size and (data_size - self._live_bytes) > COMPACT_GARBAGE_RATIO * data_size:
+                self.compact()
+            if isinstance(self._entries, np.memmap):
+                self._entries.flush()
+            files = (self._data_file, self._index_file)
+            for f in files:
+                f.flush()
+        for f in files:
+            os.fsync(f.fileno())
+
+    def compact(self):
+        """
+        Rewrites chunks.dat with live records only (ids are unchanged).
+        Files are swapped with os.replace, so readers never see a partial file.
+        """
+        with self.lock:
+            entries = np.array(self._entries)  # copy: the mapping goes away below
+            if isinstance(self._entries, np.memmap):
+                self._entries.flush()
+            data_tmp, index_tmp = self.data_path + ".tmp", self.index_path + ".tmp"
+            with open(data_tmp, "wb") as out:
+                offset = 0
+                for chunk_id in np.flatnonzero(entries["offset"] >= 0):
+                    start, length = entries[chunk_id]
+                    out.write(self._data_map[start:start + length])
+                    entries[chunk_id] = (offset, length)
+                    offset += int(length)
+            entries.tofile(index_tmp)
+
+            if self._data_map is not None:
+                self._data_map.close()
+                self._data_map = None
+            self._entries = np.empty(0, dtype=_ENTRY)
+            self._data_file.close()
+            self._index_file.close()
+            os.replace(data_tmp, self.data_path)
+            os.replace(index_tmp, self.index_path)
+            self._data_file = open(self.data_path, "r+b")
+            self._index_file = open(self.index_path, "r+b")
+            self._remap()
+            print(f"🧹 Compacted chunk store → {offset} bytes")
+
+    def close(self):
+        with self.lock:
+            if self._data_map is not None:
+                self._data_map.close()
+                self._data_map = None
+            self._entries = np.empty(0, dtype=_ENTRY)
+            self._data_file.close()
+            self._index_file.close()
@@ -0,0 +1,198 @@
+# app/services/embedding_cache.py
+
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# -----------------------------
+# Settings
+# -----------------------------
+#   embedding_cache.bin   fixed-width rows (key, last used, float32 vector), filled front to back
+#   embedding_cache.json  {"model", "dim"} the rows were encoded with; a different model empties the cache
+EMBEDDING_CACHE_PATH = "embedding_cache.bin"
+EMBEDDING_CACHE_META_PATH = "embedding_cache.json"
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "256"))  # 0 disables the cache
+EMPTY_KEY = 0
+
+
+def _row_dtype(dim: int) -> np.dtype:
+    return np.dtype([("key", "<u8"), ("used", "<u8"), ("vector", "<f4", (dim,))])
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of a chunk: re-wrapped or re-indented text hits the same entry."""
+    return " ".join(text.split())
+
+
+def cache_key(model_name: str, text: str) -> int:
+    """64-bit hash of (model name, normalized text); never EMPTY_KEY."""
+    digest = hashlib.blake2b(f"{model_name}\0{normalize_text(text)}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+# -----------------------------
+# ✅ Disk-backed chunk embedding cache (memory-mapped)
+# -----------------------------
+class EmbeddingCache:
+    """
+    Embeddings of previously encoded chunk texts, so re-issued circulars and
+    the boilerplate repeated across files are not sent to the model again.
+
+    Rows live in one memory-mapped file; the key → row hash index is built
+    from the key column when the cache is opened. Once `max_mb` is reached
+    the least recently used rows are overwritten in place. Opened per
+    ingestion run, under the ingest lock, so only one process writes it.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        dim: int,
+        path: str = EMBEDDING_CACHE_PATH,
+        meta_path: str = EMBEDDING_CACHE_META_PATH,
+        max_mb: int = EMBEDDING_CACHE_MAX_MB,
+    ):
+        self.model_name = model_name
+        self.dim = dim
+        self.path = path
+        self.meta_path = meta_path
+        self.row = _row_dtype(dim)
+        self.capacity = max(1, max_mb * (1 << 20) // self.row.itemsize)
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+        if self._read_meta() != {"model": model_name, "dim": dim}:
+            if os.path.exists(path) and os.path.getsize(path):
+                print(f"♻️ Embedding model changed to {model_name}, clearing the embedding cache")
+            open(path, "wb").close()
+            self._write_meta()
+        elif not os.path.exists(path):
+            open(path, "wb").close()
+        self._file = open(path, "r+b")
+        self._rows = np.empty(0, dtype=self.row)
+        self._remap()
+
+        self.count = int(np.count_nonzero(self._rows["key"]))
+        if self.count > self.capacity:
+            self._shrink()
+        self._slots: Dict[int, int] = dict(zip(self._rows["key"][: self.count].tolist(), range(self.count)))
+        self.tick = int(self._rows["used"][: self.count].max()) + 1 if self.count else 1
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_meta(self):
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "dim": self.dim}, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _remap(self):
+        if isinstance(self._rows, np.memmap):
+            self._rows.flush()
+        rows = os.fstat(self._file.fileno()).st_size // self.row.itemsize
+        self._rows = np.memmap(self._file, dtype=self.row, mode="r+", shape=(rows,)) if rows else np.empty(0, dtype=self.row)
+
+    def _shrink(self):
+        # EMBEDDING_CACHE_MAX_MB was lowered: keep the most recently used rows
+        keep = np.sort(np.argsort(self._rows["used"][: self.count])[-self.capacity:])
+        kept = np.array(self._rows[keep])
+        self._rows[: self.capacity] = kept
+        self._rows = None
+        self._file.truncate(self.capacity * self.row.itemsize)
+        self._remap()
+        self.evictions += self.count - self.capacity
+        self.count = self.capacity
+
+    def _grow(self, needed: int):
+        rows = min(self.capacity, max(needed, 2 * len(self._rows), 1024))
+        if isinstance(self._rows, np.memmap):
+            self._rows.flush()
+        self._file.truncate(rows * self.row.itemsize)
+        self._remap()
+
+    def __len__(self) -> int:
+        return self.count
+
+    # -----------------------------
+    # Lookup / insert
+    # -----------------------------
+    def keys(self, texts: Iterable[str]) -> np.ndarray:
+        return np.fromiter((cache_key(self.model_name, t) for t in texts), dtype=np.uint64)
+
+    def get(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(vectors, hit mask) for a batch of keys; rows of misses are zero."""
+        with self.lock:
+            rows = np.fromiter((self._slots.get(k, -1) for k in keys.tolist()), dtype=np.int64, count=len(keys))
+            hit = rows >= 0
+            vectors = np.zeros((len(keys), self.dim), dtype=np.float32)
+            if hit.any():
+                vectors[hit] = self._rows["vector"][rows[hit]]
+                self._rows["used"][rows[hit]] = self.tick
+                self.tick += 1
+            n_hits = int(np.count_nonzero(hit))
+            self.hits += n_hits
+            self.misses += len(keys) - n_hits
+            return vectors, hit
+
+    def put(self, keys: np.ndarray, vectors: np.ndarray):
+        """Stores new (key, vector) pairs, evicting least recently used rows when full."""
+        with self.lock:
+            fresh: Dict[int, int] = {}
+            for i, key in enumerate(keys.tolist()):
+                if key not in self._slots:
+                    fresh[key] = i
+            if not fresh:
+                return
+            new_keys = list(fresh)[-self.capacity:]
+            new_vectors = np.asarray(vectors, dtype=np.float32)[[fresh[k] for k in new_keys]]
+
+            n_append = min(len(new_keys), self.capacity - self.count)
+            rows: List[int] = list(range(self.count, self.count + n_append))
+            if self.count + n_append > len(self._rows):
+                self._grow(self.count + n_append)
+            n_evict = len(new_keys) - n_append
+            if n_evict:
+                victims = np.argpartition(self._rows["used"][: self.count], n_evict - 1)[:n_evict]
+                for row in victims.tolist():
+                    del self._slots[int(self._rows["key"][row])]
+                rows.extend(victims.tolist())
+                self.evictions += n_evict
+            self.count += n_append
+
+            rows_arr = np.asarray(rows, dtype=np.int64)
+            self._rows["key"][rows_arr] = np.asarray(new_keys, dtype=np.uint64)
+            self._rows["used"][rows_arr] = self.tick
+            self._rows["vector"][rows_arr] = new_vectors
+            self.tick += 1
+            self._slots.update(zip(new_keys, rows))
+
+    def flush(self):
+        with self.lock:
+            if isinstance(self._rows, np.memmap):
+                self._rows.flush()
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        self.flush()
+        self._rows = np.empty(0, dtype=self.row)
+        self._file.close()
+
+    def stats(self) -> dict:
+        looked_up = self.hits + self.misses
+        return {
+            "entries": self.count,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / looked_up, 4) if looked_up else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,145 @@
+# app/services/embedding_scheduler.py
+
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+# -----------------------------
+# Settings
+# -----------------------------
+EMBED_SCHEDULER_ENABLED = os.getenv("EMBED_SCHEDULER_ENABLED", "1") == "1"
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))  # how long the first query waits for company
+
+
+def _encode_with_store(texts: List[str]) -> np.ndarray:
+    from app.services.vector_service import get_vector_store
+
+    return get_vector_store().encode(texts, batch_size=len(texts))
+
+
+# -----------------------------
+# ✅ Cross-request micro-batcher
+# -----------------------------
+class EmbeddingScheduler:
+    """
+    Collects query embeddings requested by concurrent chat requests and runs
+    them as ONE batched encode on a dedicated worker thread.
+
+    A batch closes when it reaches `max_batch` queries or when the oldest
+    query has waited `max_wait_ms`. Queries that arrive while a batch is
+    encoding simply form the next batch, so under load batches grow on
+    their own and the event loop never blocks on the model.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray] = _encode_with_store,
+        max_batch: int = EMBED_MAX_BATCH,
+        max_wait_ms: float = EMBED_MAX_WAIT_MS,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queries = self.batches = self.max_seen = 0
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            # One thread: batches run back to back, never competing for CPU
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embedding for one query; awaits the batch it lands in."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Callers that gave up (client disconnected) don't need a row
+        return [(text, future) for text, future in batch if not future.done()]
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+
+            # Identical questions in the same batch share one row
+            unique = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                embeddings = await self._loop.run_in_executor(self._executor, self.encode_fn, unique)
+            except Exception as e:
+                print(f"❌ Batched embedding failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            rows = {text: np.asarray(embeddings[i], dtype=np.float32) for i, text in enumerate(unique)}
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(rows[text])
+
+            self.queries += len(batch)
+            self.batches += 1
+            self.max_seen = max(self.max_seen, len(batch))
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._worker = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "queries": self.queries,
+            "batches": self.batches,
+            "avg_batch": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            "max_batch_seen": self.max_seen,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+embedding_scheduler = EmbeddingScheduler()
+
+
+async def embed_query_async(text: str) -> np.ndarray:
+    """
+    Async query embedding for the chat routes: micro-batched across requests,
+    or a plain off-loop encode when EMBED_SCHEDULER_ENABLED=0.
+    """
+    if EMBED_SCHEDULER_ENABLED:
+        return await embedding_scheduler.embed(text)
+    return (await asyncio.to_thread(_encode_with_store, [text]))[0]
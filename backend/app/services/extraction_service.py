@@ -0,0 +1,341 @@
+# app/services/extraction_service.py
+
+import os
+import json
+import signal
+import zipfile
+import threading
+from functools import lru_cache
+from typing import Iterator, Optional, Tuple
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# -----------------------------
+# NOTE: keep this module light.
+# It is imported by ingestion worker processes, so no embedding model /
+# FAISS imports here — parsers are imported inside the functions.
+# -----------------------------
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+# Per-document limits (enforced inside extraction worker processes)
+EXTRACT_TIMEOUT_SECONDS = int(os.getenv("EXTRACT_TIMEOUT_SECONDS", "120"))
+EXTRACT_MEMORY_MB = int(os.getenv("EXTRACT_MEMORY_MB", "2048"))  # address-space cap per worker; 0 = off
+
+SPLIT_BUFFER_CHARS = 8 * CHUNK_SIZE  # split whenever this much text has streamed in
+TEXT_BLOCK_CHARS = 64 * 1024         # .txt read size
+EXCEL_ROWS_PER_SEGMENT = 50
+
+# Categories chunked per record instead of per 500-character window
+RECORD_EXTENSIONS = {".json", ".xlsx", ".xls"}
+FAQ_QUESTION_KEYS = ("question", "q", "query", "title")
+FAQ_ANSWER_KEYS = ("answer", "a", "response", "reply")
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+# -----------------------------
+# Helper: Stream text out of a file (page / paragraph / row at a time)
+# -----------------------------
+def iter_text(file_path: str) -> Iterator[str]:
+    """
+    Yields a document's text in pieces, so only one page (or block of rows)
+    is held as a string at a time.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+
+    if ext == ".pdf":
+        from PyPDF2 import PdfReader
+        reader = PdfReader(file_path)
+        for page in reader.pages:
+            yield (page.extract_text() or "") + "\n"  # scanned / image-only pages give None
+
+    elif ext in [".docx", ".doc"]:
+        from docx import Document
+        doc = Document(file_path)
+        for p in doc.paragraphs:
+            yield p.text + "\n"
+
+    elif ext == ".txt":
+        with open(file_path, "r", encoding="utf-8") as f:
+            for block in iter(lambda: f.read(TEXT_BLOCK_CHARS), ""):
+                yield block
+
+    elif ext == ".json":
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        yield json.dumps(data)
+
+    elif ext in [".xlsx", ".xls"]:
+        rows = []
+        for row in iter_sheet_rows(file_path):
+            rows.append(",".join("" if v is None else str(v) for v in row))
+            if len(rows) >= EXCEL_ROWS_PER_SEGMENT:
+                yield "\n".join(rows) + "\n"
+                rows = []
+        if rows:
+            yield "\n".join(rows) + "\n"
+
+    # unsupported → nothing
+
+
+def iter_sheet_rows(file_path: str) -> Iterator[tuple]:
+    """
+    Yields the first sheet's rows as tuples of cell values (header row first).
+    """
+    if file_path.lower().endswith(".xls"):
+        import pandas as pd
+        df = pd.read_excel(file_path, header=None)  # legacy format has no streaming reader
+        for row in df.itertuples(index=False):
+            yield tuple(None if pd.isna(v) else v for v in row)
+        return
+
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the zip instead of building the whole sheet
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]  # same sheet pd.read_excel used
+        yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+# -----------------------------
+# Helper: Structured records (one chunk per sheet row / FAQ entry)
+# -----------------------------
+def _cell(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # 50000.0 → "50000"
+    return str(value).strip()
+
+
+def iter_excel_records(file_path: str) -> Iterator[str]:
+    """
+    One "Header: value; Header: value" line per non-empty row.
+    """
+    header = None
+    for row in iter_sheet_rows(file_path):
+        cells = ["" if v is None else _cell(v) for v in row]
+        if not any(cells):
+            continue
+        if header is None:
+            header = [c or f"Column {i + 1}" for i, c in enumerate(cells)]
+            continue
+        names = header + [f"Column {i + 1}" for i in range(len(header), len(cells))]
+        yield "; ".join(f"{name}: {value}" for name, value in zip(names, cells) if value)
+
+
+def _pick(record: dict, keys: Tuple[str, ...]) -> str:
+    lowered = {str(k).strip().lower(): v for k, v in record.items()}
+    for key in keys:
+        value = lowered.get(key)
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return ""
+
+
+def _faq_items(data) -> list:
+    # {"faqs": [...]} / {"data": [...]} → the list inside
+    if isinstance(data, dict):
+        lists = [v for v in data.values() if isinstance(v, list)]
+        if len(lists) == 1 and not _pick(data, FAQ_QUESTION_KEYS):
+            return lists[0]
+        # {"question": "answer", ...}
+        if data and all(isinstance(v, str) for v in data.values()) and not _pick(data, FAQ_QUESTION_KEYS):
+            return [{"question": q, "answer": a} for q, a in data.items()]
+        return [data]
+    return data if isinstance(data, list) else []
+
+
+def iter_faq_records(file_path: str) -> Iterator[Tuple[str, str]]:
+    """
+    (question, answer) pairs of an FAQ JSON file. Accepts a list of
+    {"question", "answer"} objects (or q/a, query/response), a wrapper
+    object holding such a list, or a plain {question: answer} mapping.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for item in _faq_items(data):
+        if isinstance(item, dict):
+            question, answer = _pick(item, FAQ_QUESTION_KEYS), _pick(item, FAQ_ANSWER_KEYS)
+            if question and answer:
+                yield question, answer
+
+
+def iter_json_records(file_path: str) -> Iterator[str]:
+    """
+    One "Q: ...\nA: ..." record per FAQ entry; JSON that is not FAQ-shaped
+    falls back to one record per top-level item.
+    """
+    found = False
+    for question, answer in iter_faq_records(file_path):
+        found = True
+        yield f"Q: {question}\nA: {answer}"
+    if found:
+        return
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    items = data.items() if isinstance(data, dict) else enumerate(data) if isinstance(data, list) else [(None, data)]
+    for key, value in items:
+        text = json.dumps(value, ensure_ascii=False)
+        yield f"{key}: {text}" if isinstance(key, str) else text
+
+
+def extract_text(file_path: str) -> str:
+    return "".join(iter_text(file_path))
+
+
+# -----------------------------
+# Streaming splitter
+# -----------------------------
+def iter_chunks(file_path: str) -> Iterator[str]:
+    """
+    Splits text as it streams in: once the buffer holds SPLIT_BUFFER_CHARS,
+    every chunk but the last is emitted and the last (possibly cut short)
+    one is carried over into the next round.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+    buffer = ""
+    for piece in iter_text(file_path):
+        buffer += piece
+        if len(buffer) < SPLIT_BUFFER_CHARS:
+            continue
+        chunks = splitter.split_text(buffer)
+        if len(chunks) > 1:
+            yield from chunks[:-1]
+            buffer = chunks[-1]
+    if buffer.strip():
+        yield from splitter.split_text(buffer)
+
+
+def iter_record_chunks(file_path: str) -> Iterator[str]:
+    """
+    Spreadsheet rows / FAQ entries as chunks: a record is never cut in two
+    unless it alone is longer than CHUNK_SIZE.
+    """
+    records = iter_json_records(file_path) if file_path.lower().endswith(".json") else iter_excel_records(file_path)
+    splitter = None
+    for record in records:
+        if len(record) <= CHUNK_SIZE:
+            yield record
+            continue
+        if splitter is None:
+            splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        yield from splitter.split_text(record)
+
+
+# -----------------------------
+# Worker limits
+# -----------------------------
+def limit_worker_memory(memory_mb: int = EXTRACT_MEMORY_MB):
+    """
+    ProcessPoolExecutor initializer: caps the worker's address space so an
+    oversized document raises MemoryError instead of swapping the host.
+    """
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        print(f"⚠️ Could not limit extraction worker memory: {e}")
+
+
+def _on_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+
+def _can_use_alarm() -> bool:
+    return hasattr(signal, "SIGALRM") and threading.current_thread() is threading.main_thread()
+
+
+@lru_cache(maxsize=1)
+def parse_errors() -> Tuple[type, ...]:
+    """
+    What a malformed or unreadable document raises. Anything else (a missing
+    parser package, a bug) is not the document's fault and aborts the ingest.
+    """
+    errors = [OSError, ValueError, KeyError, IndexError, TypeError, EOFError, RecursionError, zipfile.BadZipFile]
+    for module, name in (
+        ("PyPDF2.errors", "PyPdfError"),
+        ("docx.opc.exceptions", "OpcError"),
+        ("openpyxl.utils.exceptions", "InvalidFileException"),
+        ("xlrd", "XLRDError"),
+    ):
+        try:
+            errors.append(getattr(__import__(module, fromlist=[name]), name))
+        except (ImportError, AttributeError):
+            pass  # parser not installed: its files fail with the ImportError instead
+    return tuple(errors)
+
+
+# -----------------------------
+# Extract + split (runs in worker processes)
+# -----------------------------
+def extract_chunks(file_path: str, spool_path: str, timeout: int = EXTRACT_TIMEOUT_SECONDS) -> Tuple[str, int, Optional[str]]:
+    """
+    Extracts text from a file, splits it into chunks and writes each chunk
+    to `spool_path` as soon as it is split (one JSON string per line), so
+    no process holds a whole document's chunks; read them with read_spool().
+    Returns (file_path, number of chunks, error). A file that fails to parse,
+    times out or hits the worker's memory cap gives 0 chunks, no spool file
+    and the reason, so one broken file does not abort a bulk ingest; a file
+    with no text gives 0 and no error. The timeout needs SIGALRM, i.e. a
+    worker process (or the main thread); elsewhere extraction runs unbounded.
+    """
+    use_alarm = timeout > 0 and _can_use_alarm()
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, _on_timeout)
+        signal.alarm(timeout)
+    count = 0
+    error = None
+    try:
+        if os.path.splitext(file_path)[1].lower() in RECORD_EXTENSIONS:
+            chunks = iter_record_chunks(file_path)
+        else:
+            chunks = iter_chunks(file_path)
+        with open(spool_path, "w", encoding="utf-8") as out:
+            for chunk in chunks:
+                out.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+                count += 1
+        if count:
+            return file_path, count, None
+    except ExtractionTimeout:
+        error = f"exceeded {timeout}s"
+    except MemoryError:
+        error = "ran out of memory (worker address-space limit)"
+    except parse_errors() as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, previous)
+    if error:
+        print(f"❌ Failed to extract {file_path} ({error}), skipping.")
+    _discard(spool_path)  # a half-split document contributes nothing
+    return file_path, 0, error
+
+
+def read_spool(spool_path: str) -> Iterator[str]:
+    """The chunks extract_chunks() spooled, in order; deletes the file once read."""
+    try:
+        with open(spool_path, "r", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+    finally:
+        _discard(spool_path)
+
+
+def _discard(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,101 @@
+# app/services/faq_index.py
+
+import os
+import re
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.services.extraction_service import iter_faq_records
+
+# -----------------------------
+# Settings
+# -----------------------------
+FAQ_INDEX_PATH = "faq_index.json"  # source file → [[question hash, question, answer], ...]
+FAQ_DIRECT_ANSWERS = os.getenv("FAQ_DIRECT_ANSWERS", "1") == "1"
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_question(question: str) -> str:
+    """
+    "What is the Hostel fee?" and "what is the hostel fee" → same key.
+    """
+    return " ".join(_NON_WORD.sub(" ", question.lower()).split())
+
+
+def question_hash(question: str) -> str:
+    return hashlib.sha1(normalize_question(question).encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# ✅ Exact (normalized) FAQ question → answer index
+# -----------------------------
+class FAQIndex:
+    """
+    Hash of every normalized FAQ question → its answer, grouped by source
+    file so a changed or deleted FAQ file replaces only its own entries.
+    A hit answers the chat directly, without retrieval or the LLM.
+    """
+
+    def __init__(self, path: str = FAQ_INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.by_source: Dict[str, List[List[str]]] = {}
+        self.answers: Dict[str, Tuple[str, str]] = {}  # hash → (answer, source)
+        self.reload()
+
+    def reload(self):
+        """Re-reads the file (another worker may have ingested)."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            by_source = json.load(f)
+        with self.lock:
+            self.by_source = by_source
+            self._reindex()
+
+    def _reindex(self):
+        # Later files win on duplicate questions, like a re-upload would
+        self.answers = {
+            digest: (answer, source)
+            for source, entries in self.by_source.items()
+            for digest, _, answer in entries
+        }
+
+    def save(self):
+        with self.lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.by_source, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+    def update_file(self, file_path: str):
+        """(Re)reads the FAQ pairs of one JSON file."""
+        try:
+            entries = [[question_hash(q), q, a] for q, a in iter_faq_records(file_path)]
+        except Exception as e:
+            print(f"❌ Could not read FAQ entries from {file_path}: {e}")
+            entries = []
+        with self.lock:
+            if entries:
+                self.by_source[file_path] = entries
+            else:
+                self.by_source.pop(file_path, None)
+            self._reindex()
+
+    def remove_file(self, file_path: str):
+        with self.lock:
+            if self.by_source.pop(file_path, None) is not None:
+                self._reindex()
+
+    def lookup(self, question: str) -> Optional[str]:
+        hit = self.answers.get(question_hash(question))
+        return hit[0] if hit else None
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+
+faq_index = FAQIndex()
@@ -0,0 +1,276 @@
+# app/services/index_factory.py
+
+import os
+import math
+import time
+import faiss
+import numpy as np
+from typing import List, Optional
+
+# -----------------------------
+# Index modes & tuning knobs
+# -----------------------------
+#   flat       exact brute-force scan (default, best for small corpora)
+#   flat_fp16  brute-force scan over float16 codes     → 2x smaller, near-exact
+#   flat_int8  brute-force scan over int8 codes        → 4x smaller
+#   flat_pq    brute-force scan over PQ codes          → ~30x smaller (FAISS_PQ_M bytes / vector)
+#   ivf_flat   inverted lists over full vectors        → tune FAISS_NPROBE
+#   hnsw       graph search over full vectors          → tune FAISS_EF_SEARCH
+#   ivf_pq     inverted lists over PQ-coded vectors    → tune FAISS_NPROBE, ~10-30x smaller
+# Quantized modes can re-score their top candidates exactly (FAISS_RESCORE=1).
+INDEX_TYPES = ("flat", "flat_fp16", "flat_int8", "flat_pq", "ivf_flat", "hnsw", "ivf_pq")
+
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_ANN_MIN_VECTORS = int(os.getenv("FAISS_ANN_MIN_VECTORS", "10000"))  # stay flat below this
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0"))            # 0 → ~4*sqrt(n)
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "200"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "48"))             # sub-quantizers, must divide dim
+FAISS_PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))
+FAISS_RESCORE = os.getenv("FAISS_RESCORE", "0") == "1"
+FAISS_RESCORE_FACTOR = int(os.getenv("FAISS_RESCORE_FACTOR", "4"))  # candidates fetched per result
+
+# Usable from the first vector; every other mode waits for FAISS_ANN_MIN_VECTORS
+UNTRAINED_TYPES = ("flat", "flat_fp16")
+
+
+# -----------------------------
+# Build an empty index
+# -----------------------------
+def _nlist_for(n_vectors: int) -> int:
+    if FAISS_NLIST:
+        return FAISS_NLIST
+    # ~4*sqrt(n) lists, but keep >= 39 training points per list
+    return max(1, min(int(4 * math.sqrt(max(n_vectors, 1))), n_vectors // 39))
+
+
+def _pq_nbits(n_vectors: int) -> int:
+    # Fewer centroids per sub-quantizer on small corpora (>= 39 training points each)
+    nbits = FAISS_PQ_NBITS
+    while nbits > 4 and n_vectors < (1 << nbits) * 39:
+        nbits -= 1
+    return nbits
+
+
+def build_index(index_type: str, dim: int, n_vectors: int = 0):
+    """
+    Returns an empty (possibly untrained) index that accepts add_with_ids().
+    n_vectors is the expected corpus size, used to size IVF lists / PQ codebooks.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type: {index_type} (expected one of {INDEX_TYPES})")
+
+    if index_type == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+
+    if index_type == "flat_fp16":
+        return faiss.IndexIDMap2(faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16))
+
+    if index_type == "flat_int8":
+        return faiss.IndexIDMap2(faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit))
+
+    if index_type == "flat_pq":
+        return faiss.IndexIDMap2(faiss.IndexPQ(dim, FAISS_PQ_M, _pq_nbits(n_vectors)))
+
+    if index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dim, FAISS_HNSW_M)
+        hnsw.hnsw.efConstruction = FAISS_EF_CONSTRUCTION
+        hnsw.hnsw.efSearch = FAISS_EF_SEARCH
+        return faiss.IndexIDMap2(hnsw)
+
+    # IVF indexes store ids natively (and support remove_ids), so no IDMap wrapper
+    nlist = _nlist_for(n_vectors)
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, FAISS_PQ_M, _pq_nbits(n_vectors))
+    # Hashtable direct map → reconstruct() and remove_ids() both work
+    index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    index.nprobe = min(FAISS_NPROBE, nlist)
+    return index
+
+
+# -----------------------------
+# Inspect an existing index
+# -----------------------------
+def _base(index):
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def index_kind(index) -> str:
+    base = _base(index)
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(base, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(base, faiss.IndexIVF):
+        return "ivf_flat"
+    if isinstance(base, faiss.IndexScalarQuantizer):
+        return "flat_fp16" if base.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "flat_int8"
+    if isinstance(base, faiss.IndexPQ):
+        return "flat_pq"
+    return "flat"
+
+
+def supports_remove(index) -> bool:
+    # HNSW graphs cannot delete nodes; removed ids become tombstones until a rebuild
+    return index_kind(index) != "hnsw"
+
+
+def is_lossy(index) -> bool:
+    # int8 / PQ codes cannot give back the original vectors → rebuild from exact copies
+    return index_kind(index) in ("ivf_pq", "flat_pq", "flat_int8")
+
+
+def is_quantized(index) -> bool:
+    # Distances are approximate → worth re-scoring against exact vectors
+    return index_kind(index) in ("flat_fp16", "flat_int8", "flat_pq", "ivf_pq")
+
+
+def needs_corpus(index_type: str) -> bool:
+    return index_type not in UNTRAINED_TYPES
+
+
+def choose_index_type(index_type: str, n_vectors: int) -> str:
+    """`index_type`, or flat while a partition is too small to train / benefit from it."""
+    return index_type if not needs_corpus(index_type) or n_vectors >= FAISS_ANN_MIN_VECTORS else "flat"
+
+
+def index_ids(index) -> np.ndarray:
+    """
+    All ids stored in the index (IDMap-wrapped indexes only; IVF ids
+    always match the metadata since removals are real).
+    """
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.vector_to_array(index.id_map)
+    return np.empty(0, dtype=np.int64)
+
+
+def index_nbytes(index) -> int:
+    return int(faiss.serialize_index(index).nbytes)
+
+
+# -----------------------------
+# Training & search-time params
+# -----------------------------
+def train_index(index, vectors: np.ndarray):
+    if not index.is_trained:
+        index.train(vectors)
+
+
+def set_search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    base = _base(index)
+    kind = index_kind(index)
+    if kind in ("ivf_flat", "ivf_pq"):
+        ivf = faiss.extract_index_ivf(base)
+        ivf.nprobe = min(nprobe or FAISS_NPROBE, ivf.nlist)
+    elif kind == "hnsw":
+        base.hnsw.efSearch = ef_search or FAISS_EF_SEARCH
+
+
+def rescore(query: np.ndarray, ids: np.ndarray, vectors: np.ndarray, k: int):
+    """
+    Exact L2 re-ranking of candidate `ids` (with their float32 `vectors`).
+    Returns (ids, distances) of the best k, closest first.
+    """
+    distances = ((vectors - query.reshape(1, -1)) ** 2).sum(axis=1)
+    order = np.argsort(distances, kind="stable")[:k]
+    return ids[order], distances[order]
+
+
+# -----------------------------
+# Recall-vs-latency report
+# -----------------------------
+def measure_index(
+    index,
+    queries: np.ndarray,
+    k: int,
+    truth: Optional[np.ndarray],
+    exact_vectors: Optional[np.ndarray] = None,
+    rescore_factor: int = 0,
+) -> dict:
+    """
+    Recall@k against `truth` (ids from an exact search), per-query latency
+    and serialized size. With exact_vectors (row = id) and rescore_factor,
+    k * rescore_factor candidates are re-ranked exactly, as VectorStore does.
+    """
+    latencies = []
+    found = []
+    for q in queries:
+        t0 = time.perf_counter()
+        if exact_vectors is not None and rescore_factor:
+            _, I = index.search(q.reshape(1, -1), k * rescore_factor)
+            candidates = I[0][I[0] >= 0]
+            ids, _ = rescore(q, candidates, exact_vectors[candidates], k)
+        else:
+            _, I = index.search(q.reshape(1, -1), k)
+            ids = I[0]
+        latencies.append((time.perf_counter() - t0) * 1000)
+        found.append(np.pad(ids, (0, k - len(ids)), constant_values=-1))
+    found = np.vstack(found)
+    recall = 1.0
+    if truth is not None:
+        hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+        recall = hits / float(truth.size)
+    latencies.sort()
+    return {
+        "recall_at_k": round(recall, 4),
+        "avg_ms": round(sum(latencies) / len(latencies), 4),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 4),
+        "memory_mb": round(index_nbytes(index) / (1 << 20), 2),
+    }
+
+
+def compare_index_modes(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    modes: List[str] = INDEX_TYPES,
+    nprobes: List[int] = (4, 16, 64),
+    ef_searches: List[int] = (32, 64, 128),
+) -> List[dict]:
+    """
+    Builds every mode over `vectors` and reports recall@k against the flat
+    (exact) baseline, per-query latency and serialized index size for each
+    nprobe / efSearch setting. Quantized modes get an extra row with exact
+    re-scoring of FAISS_RESCORE_FACTOR x k candidates.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    ids = np.arange(len(vectors), dtype=np.int64)
+    dim = vectors.shape[1]
+
+    flat = build_index("flat", dim, len(vectors))
+    flat.add_with_ids(vectors, ids)
+    _, truth = flat.search(queries, k)
+
+    report = []
+    for mode in modes:
+        t0 = time.perf_counter()
+        index = build_index(mode, dim, len(vectors))
+        train_index(index, vectors)
+        index.add_with_ids(vectors, ids)
+        build_seconds = round(time.perf_counter() - t0, 3)
+
+        if mode in ("ivf_flat", "ivf_pq"):
+            settings = [{"nprobe": n} for n in nprobes]
+        elif mode == "hnsw":
+            settings = [{"ef_search": ef} for ef in ef_searches]
+        else:
+            settings = [{}]
+
+        for params in settings:
+            set_search_params(index, **params)
+            row = {"mode": mode, **params, "build_seconds": build_seconds}
+            row.update(measure_index(index, queries, k, truth))
+            report.append(row)
+            if is_quantized(index):
+                row = {**row, "rescore_factor": FAISS_RESCORE_FACTOR}
+                row.update(measure_index(index, queries, k, truth, vectors, FAISS_RESCORE_FACTOR))
+                report.append(row)
+    return report
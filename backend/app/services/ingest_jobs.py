@@ -0,0 +1,130 @@
+# app/services/ingest_jobs.py
+
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+# -----------------------------
+# Settings
+# -----------------------------
+INGEST_MAX_QUEUED = int(os.getenv("INGEST_MAX_QUEUED", "8"))      # jobs waiting behind the running one
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "100"))  # finished jobs kept for /jobs
+
+
+class IngestQueueFull(Exception):
+    pass
+
+
+# -----------------------------
+# ✅ Background ingestion jobs
+# -----------------------------
+class IngestJobQueue:
+    """
+    Runs ingest_documents() as background jobs with an id and live progress.
+
+    One worker thread: ingestion mutates the shared index, chunk store and
+    manifest, so runs must not overlap. Embedding releases the GIL and
+    extraction runs in worker processes, so chat requests keep being served.
+    Uploads that arrive while a job is still queued join that job (it
+    re-scans the whole folder anyway) instead of queueing another run.
+    """
+
+    def __init__(self, max_queued: int = INGEST_MAX_QUEUED, history: int = INGEST_JOB_HISTORY):
+        self.max_queued = max_queued
+        self.history = history
+        self.lock = threading.Lock()
+        self.jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _queued(self) -> List[dict]:
+        return [job for job in self.jobs.values() if job["status"] == "queued"]
+
+    def submit(self, files: List[str], upload_folder: str) -> dict:
+        """
+        Queues an ingestion run for `files` (already on disk) and returns its job.
+        Raises IngestQueueFull when max_queued jobs are already waiting.
+        """
+        with self.lock:
+            for job in self._queued():
+                if job["upload_folder"] == upload_folder:
+                    job["files"].extend(files)
+                    return dict(job)
+
+            if len(self._queued()) >= self.max_queued:
+                raise IngestQueueFull(f"{self.max_queued} ingestion jobs already queued")
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "status": "queued",
+                "files": list(files),
+                "upload_folder": upload_folder,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "progress": {},
+                "stats": None,
+                "error": None,
+            }
+            self.jobs[job["id"]] = job
+            self._trim()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+            self._executor.submit(self._run, job["id"])
+            return dict(job)
+
+    def _trim(self):
+        finished = [jid for jid, job in self.jobs.items() if job["status"] in ("done", "failed")]
+        for jid in finished[: max(0, len(finished) - self.history)]:
+            del self.jobs[jid]
+
+    def _run(self, job_id: str):
+        from app.services.knowledge_service import ingest_documents
+
+        with self.lock:
+            job = self.jobs[job_id]
+            job["status"] = "running"
+            job["started_at"] = time.time()
+
+        def on_progress(update: dict):
+            with self.lock:
+                job["progress"] = {**job["progress"], **update}
+
+        try:
+            stats = ingest_documents(job["upload_folder"], on_progress=on_progress)
+            with self.lock:
+                job["stats"] = stats
+                job["status"] = "done"
+        except Exception as e:
+            print(f"❌ Ingestion job {job_id} failed: {e}")
+            with self.lock:
+                job["error"] = str(e)
+                job["status"] = "failed"
+        finally:
+            with self.lock:
+                job["finished_at"] = time.time()
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self) -> List[dict]:
+        with self.lock:
+            return [dict(job) for job in reversed(self.jobs.values())]
+
+    def stats(self) -> dict:
+        with self.lock:
+            statuses = [job["status"] for job in self.jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "done", "failed")}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+ingest_jobs = IngestJobQueue()
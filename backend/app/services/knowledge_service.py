@@ -2,26 +2,24 @@
 
 import os
 import json
-import faiss
+import hashlib
+from typing import Callable, List, Optional, Tuple
 import numpy as np
-from typing import List, Tuple
-from sentence_transformers import SentenceTransformer
 import PyPDF2
 import docx
 
-from app.services.vector_service import add_to_faiss  # your FAISS ingestion function
+# Embedding model, FAISS index and chunk store all live in the shared vector store
+from app.services.vector_service import add_files_to_faiss, remove_from_faiss, get_vector_store, loaded_vector_store
+from app.services.snapshots import ingest_lock
+from app.services.partitions import DATA_FOLDER
+from app.services.answer_cache import answer_cache
+from app.services.faq_index import faq_index
 import shutil
-# -------------------------------
-# Model for embeddings
-# -------------------------------
-EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
-embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
 
 # -------------------------------
-# FAISS index setup
+# Ingestion state
 # -------------------------------
-INDEX_FILE = "faiss_index.index"
-METADATA_FILE = "faiss_metadata.json"
+MANIFEST_FILE = "ingest_manifest.json"  # path → size, mtime, sha256, chunk id range
 
 # Allowed file types per category
 FILE_CATEGORIES = {
@@ -31,26 +29,16 @@ FILE_CATEGORIES = {
     "excel": [".xlsx", ".xls"]
 }
 
-BASE_FOLDER = "college_data"
-
-if os.path.exists(INDEX_FILE):
-    index = faiss.read_index(INDEX_FILE)
-    with open(METADATA_FILE, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-else:
-    index = faiss.IndexFlatL2(384)  # dimension of MiniLM embeddings
-    metadata = []
+BASE_FOLDER = DATA_FOLDER  # each category folder is its own index partition
 
 # -------------------------------
 # Helper functions to read files
 # -------------------------------
 def read_pdf(file_path: str) -> str:
-    text = ""
     with open(file_path, "rb") as f:
         reader = PyPDF2.PdfReader(f)
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-    return text
+        # extract_text() is None for image-only pages
+        return "".join((page.extract_text() or "") + "\n" for page in reader.pages)
 
 def read_docx(file_path: str) -> str:
     doc = docx.Document(file_path)
@@ -73,16 +61,69 @@ def read_file(file_path: str) -> str:
         return ""  # skip unsupported
 
 
+# -------------------------------
+# Ingestion manifest (incremental ingestion)
+# -------------------------------
+def load_manifest() -> dict:
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def save_manifest(manifest: dict):
+    tmp_path = MANIFEST_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+def file_sha256(file_path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _is_unchanged(file_path: str, entry: dict, pending: dict) -> bool:
+    """
+    Cheap check on size + mtime first; only hash the file when those differ.
+    A touched-but-identical file just gets its stat fields refreshed.
+    A changed file's new size / mtime / hash go to `pending`, and reach the
+    manifest only once its chunks are persisted (see record() below), so a
+    crashed run leaves it looking changed to the next one.
+    """
+    stat = os.stat(file_path)
+    if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+        return True
+    digest = file_sha256(file_path)
+    if entry and entry["sha256"] == digest:
+        entry["size"], entry["mtime"] = stat.st_size, stat.st_mtime
+        return True
+    pending[file_path] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": digest}
+    return False
+
+
 # -------------------------------
 # Ingest documents and build embeddings
 # -------------------------------
-def ingest_documents(upload_folder: str = BASE_FOLDER):
+def ingest_documents(upload_folder: str = BASE_FOLDER, on_progress: Optional[Callable[[dict], None]] = None):
     """
     Processes files in upload_folder:
     1. Sorts files into subfolders based on type
-    2. Updates FAISS embeddings for RAG
+    2. Updates FAISS embeddings for RAG, only for new or changed files
+    3. Removes vectors of files that were deleted
+    `on_progress` (optional) receives {"stage", ...counters} as the run advances.
+    Holds the inter-process ingest lock and starts from the newest snapshot,
+    so several uvicorn workers can accept uploads safely.
     """
+    with ingest_lock():
+        refresh_knowledge_base()
+        return _ingest_documents(upload_folder, on_progress)
+
+
+def _ingest_documents(upload_folder: str, on_progress: Optional[Callable[[dict], None]]):
     print("📥 Starting document ingestion...")
+    report = on_progress or (lambda update: None)
+    report({"stage": "sorting"})
 
     # 1️⃣ Ensure subfolders exist
     for category in FILE_CATEGORIES:
@@ -106,17 +147,75 @@ def ingest_documents(upload_folder: str = BASE_FOLDER):
             if not moved:
                 print(f"⚠️ Unsupported file type: {file_name}, skipping.")
 
-    # 3️⃣ Ingest all documents in subfolders into FAISS
+    # 3️⃣ Find new / changed documents in subfolders
+    report({"stage": "scanning"})
+    manifest = load_manifest()
+    pending = {}  # changed file → its new stat + hash, until its chunks are persisted
+    seen = set()
+    changed = []
+    faq_changed = []
+    skipped = 0
     for category, extensions in FILE_CATEGORIES.items():
         folder_path = os.path.join(BASE_FOLDER, category)
         for root, _, files in os.walk(folder_path):
             for f in files:
-                if os.path.splitext(f)[1].lower() in extensions:
-                    file_path = os.path.join(root, f)
-                    add_to_faiss(file_path)
-                    print(f"✅ Ingested: {file_path}")
+                if os.path.splitext(f)[1].lower() not in extensions:
+                    continue
+                file_path = os.path.join(root, f)
+                seen.add(file_path)
+                entry = manifest.get(file_path)
+                if _is_unchanged(file_path, entry, pending):
+                    skipped += 1
+                    if category == "faq" and file_path not in faq_index.by_source:
+                        faq_changed.append(file_path)  # ingested before the FAQ index existed
+                    continue
+                if category == "faq":
+                    faq_changed.append(file_path)
+
+                # Changed file → drop its old vectors before re-embedding
+                if entry:
+                    remove_from_faiss(*entry["chunk_ids"], save=False)
+                changed.append(file_path)
+
+    # 4️⃣ Remove vectors of files that no longer exist
+    removed = 0
+    for file_path in [p for p in manifest if p not in seen]:
+        remove_from_faiss(*manifest.pop(file_path)["chunk_ids"], save=False)
+        faq_index.remove_file(file_path)
+        removed += 1
+        print(f"🗑️ Removed: {file_path}")
 
-    print("📌 Document ingestion completed!")
+    # 5️⃣ Exact-question FAQ answers (written before the snapshot below is published)
+    for file_path in faq_changed:
+        faq_index.update_file(file_path)
+    if faq_changed or removed:
+        faq_index.save()
+
+    # 6️⃣ Embed all changed files in one batched run (index saved once / per checkpoint)
+    def record(ranges):
+        # Only files whose chunks are saved in the index; the rest keep their old entry
+        for file_path, chunk_range in ranges.items():
+            if file_path in pending:
+                manifest[file_path] = {**pending.pop(file_path), "chunk_ids": list(chunk_range) if chunk_range else [0, 0]}
+        save_manifest(manifest)
+
+    report({"stage": "embedding", "files_total": len(changed), "files_unchanged": skipped, "files_removed": removed})
+    ranges, stats = add_files_to_faiss(
+        changed, on_checkpoint=record, on_progress=lambda s: report({"stage": "embedding", **s})
+    )
+    record(ranges)
+    added = len(changed) - stats["files_failed"]
+
+    # 7️⃣ Cached answers were built on the old knowledge base
+    if added or removed:
+        answer_cache.invalidate()
+
+    print(
+        f"📌 Document ingestion completed! ({added} ingested, {stats['files_failed']} failed, {skipped} unchanged, "
+        f"{removed} removed, {stats['chunks_per_sec']} chunks/sec)"
+    )
+    report({"stage": "done", **stats})
+    return stats
 
     
 # -------------------------------
@@ -137,11 +236,61 @@ def split_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]
 # -------------------------------
 # Search for relevant chunks
 # -------------------------------
-def retrieve(query: str, top_k: int = 5) -> List[Tuple[str, float]]:
-    query_emb = embedding_model.encode([query])
-    D, I = index.search(np.array(query_emb, dtype=np.float32), top_k)
-    results = []
-    for idx, score in zip(I[0], D[0]):
-        if idx < len(metadata):
-            results.append((metadata[idx]["text"], float(score)))
-    return results
+def retrieve(
+    query: str,
+    top_k: int = 5,
+    query_embedding: Optional[np.ndarray] = None,
+    dense_k: Optional[int] = None,
+    lexical_k: Optional[int] = None,
+    filters: Optional[dict] = None,
+) -> List[Tuple[str, Optional[float]]]:
+    """
+    Returns (chunk_text, distance) pairs from the shared vector store,
+    i.e. exactly the chunks written by ingest_documents().
+    Hybrid (FAISS + BM25) by default; distance is None for lexical-only hits.
+    `filters`, e.g. {"category": "circulars", "since": "2024-06-01"}, limits
+    the search to matching chunks (see VectorStore.search).
+    """
+    chunks = get_vector_store().search(
+        query, top_k, query_embedding=query_embedding, dense_k=dense_k, lexical_k=lexical_k, filters=filters
+    )
+    return [(c["text"], c["score"]) for c in chunks]
+
+
+def retrieve_passages(
+    query: str,
+    top_k: int = 5,
+    query_embedding: Optional[np.ndarray] = None,
+    filters: Optional[dict] = None,
+) -> Tuple[List[dict], Optional[np.ndarray]]:
+    """
+    Like retrieve(), but returns the full chunk dicts ({"id", "text",
+    "source", "score", ...}) plus their exact embeddings (same order; None
+    if not on disk), which the prompt builder uses to drop near-duplicates.
+    """
+    store = get_vector_store()
+    chunks = store.search(query, top_k, query_embedding=query_embedding, filters=filters)
+    ids = np.array([c["id"] for c in chunks], dtype=np.int64)
+    vectors = store.vectors.read(ids) if len(ids) and store.vectors.covers(ids) else None
+    return chunks, vectors
+
+
+def embed_query(query: str) -> np.ndarray:
+    return get_vector_store().embed_query(query)
+
+
+def refresh_knowledge_base() -> bool:
+    """
+    Picks up a snapshot published by another worker (index, BM25, FAQ
+    answers). Does nothing until this process has loaded the vector store.
+    """
+    store = loaded_vector_store()
+    if store is None or not store.maybe_reload():
+        return False
+    faq_index.reload()
+    answer_cache.invalidate()
+    return True
+
+
+def knowledge_base_version() -> int:
+    return get_vector_store().version
@@ -0,0 +1,353 @@
+# app/services/lexical_index.py
+
+import os
+import re
+import math
+import pickle
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# -----------------------------
+# Settings
+# -----------------------------
+LEXICAL_INDEX_PATH = "bm25_index.pkl"
+BM25_K1 = 1.2
+BM25_B = 0.75
+# A query term scores at most this many chunks, its highest-scoring ones (0 = all).
+# Only very common terms are cut, and they carry the least weight per chunk.
+BM25_MAX_POSTINGS = int(os.getenv("BM25_MAX_POSTINGS", "50000"))
+BM25_CACHE_MB = int(os.getenv("BM25_CACHE_MB", "64"))  # scored postings kept between queries
+BM25_HEAD = 256  # best postings per term totalled first, to bound which others can make the top-k
+BM25_PRUNE_MAX_TERMS = 4  # longer queries sum every posting; pruning lookups grow with terms²
+
+# Words, plus codes / dates / amounts kept whole: "cs-101", "12/03/2024", "50,000", "3.5".
+# \w misses combining marks, which would split Indic words at every vowel sign and
+# virama ("छात्रावास" → "छ", "त", ...), so the Indic blocks are word characters
+# too, except the danda sentence marks (U+0964-0965).
+WORD = r"[\w\u0300-\u036f\u0900-\u0963\u0966-\u0dff]"
+TOKEN_PATTERN = re.compile(rf"{WORD}+(?:[-/.,]{WORD}+)*")
+TOKENIZER_VERSION = 2  # saved with the index; an index tokenized differently is rebuilt
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its me my "
+    "of on or our should the their there this to was we what when where which who why "
+    "will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased terms for BM25. A compound token ("CS-101", "₹50,000") is
+    indexed whole AND as its parts, so "cs 101" and "50000" still match.
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        parts = re.split(r"[-/.,]", token)
+        if len(parts) > 1:
+            terms.append(token)
+            if token.replace(",", "").isdigit():
+                terms.append(token.replace(",", ""))
+            terms.extend(p for p in parts if p and p not in STOPWORDS)
+        elif token not in STOPWORDS:
+            terms.append(token)
+    return terms
+
+
+# -----------------------------
+# ✅ In-process BM25 inverted index
+# -----------------------------
+class BM25Index:
+    """
+    Term → postings (chunk ids ascending, their term frequencies) plus
+    per-chunk lengths and terms. Kept in step with the FAISS index by
+    VectorStore (add on ingest, delete on remove), so a query only touches
+    the postings of its own terms and a delete only those of the deleted
+    chunks' terms.
+
+    A term's postings are scored once (numpy, best first, cut to
+    BM25_MAX_POSTINGS) and cached. A query reads each term's best postings
+    until no chunk further down can reach its top-k, so it touches a few
+    hundred postings per term, not every chunk that contains the term.
+
+    Not locked: VectorStore never changes an index searches can see. It
+    updates a copy() and swaps it in, so searches and save() only read.
+    Postings arrays are never changed in place, only replaced, so a copy
+    shares them all and an update rebuilds just the terms it touches.
+    """
+
+    def __init__(self, path: str = LEXICAL_INDEX_PATH, k1: float = BM25_K1, b: float = BM25_B, load: bool = True):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # term → (chunk ids, tfs)
+        self.doc_len: Dict[int, int] = {}
+        self.doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self.total_len = 0
+        self.max_postings = BM25_MAX_POSTINGS
+        # term → (ids, scores) best first, plus the same in chunk id order for lookups
+        self._scored: "OrderedDict[str, Tuple[np.ndarray, ...]]" = OrderedDict()
+        self._scored_bytes = 0
+        self._scored_lock = threading.Lock()
+        if load and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("tokenizer", 1) != TOKENIZER_VERSION:
+            return  # older index, or another tokenizer: left empty, so VectorStore rebuilds it
+        # Flat arrays, one run per term; each term's run is a view
+        cut = np.cumsum(state["sizes"])[:-1]
+        self.postings = dict(zip(state["terms"], zip(np.split(state["ids"], cut), np.split(state["tfs"], cut))))
+        self.doc_len = state["doc_len"]
+        self.doc_terms = state["doc_terms"]
+        self.total_len = sum(self.doc_len.values())
+
+    def save(self, path: Optional[str] = None):
+        """Writes the index atomically (to `path`, which then becomes its path)."""
+        path = path or self.path
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            postings = list(self.postings.values())
+            state = {
+                "terms": list(self.postings),
+                "sizes": np.array([len(ids) for ids, _ in postings], dtype=np.int64),
+                "ids": np.concatenate([ids for ids, _ in postings]) if postings else np.empty(0, dtype=np.int64),
+                "tfs": np.concatenate([tfs for _, tfs in postings]) if postings else np.empty(0, dtype=np.int32),
+                "doc_len": self.doc_len,
+                "doc_terms": self.doc_terms,
+                "tokenizer": TOKENIZER_VERSION,
+            }
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self.path = path
+
+    def copy(self) -> "BM25Index":
+        """An independent copy to update while searches keep using this one."""
+        other = BM25Index(self.path, self.k1, self.b, load=False)
+        other.postings = dict(self.postings)  # arrays shared; updates replace them
+        other.doc_len = dict(self.doc_len)
+        other.doc_terms = dict(self.doc_terms)
+        other.total_len = self.total_len
+        other.max_postings = self.max_postings
+        return other
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def __contains__(self, chunk_id) -> bool:
+        return chunk_id in self.doc_len
+
+    # -----------------------------
+    # Updates
+    # -----------------------------
+    def add_many(self, records: Iterable[Tuple[int, str]]):
+        self._forget_scores()
+        added: Dict[str, Tuple[List[int], List[int]]] = {}  # term → new (chunk ids, tfs)
+        for chunk_id, text in records:
+            chunk_id = int(chunk_id)
+            if chunk_id in self.doc_len:
+                self._append(added)
+                added = {}
+                self.delete([chunk_id])
+            counts = Counter(tokenize(text))
+            for term, tf in counts.items():
+                ids, tfs = added.setdefault(term, ([], []))
+                ids.append(chunk_id)
+                tfs.append(tf)
+            length = sum(counts.values())
+            self.doc_len[chunk_id] = length
+            self.doc_terms[chunk_id] = tuple(counts)
+            self.total_len += length
+        self._append(added)
+
+    def _append(self, added: Dict[str, Tuple[List[int], List[int]]]):
+        for term, (ids, tfs) in added.items():
+            ids, tfs = np.array(ids, dtype=np.int64), np.array(tfs, dtype=np.int32)
+            if term in self.postings:
+                old_ids, old_tfs = self.postings[term]
+                ids, tfs = np.concatenate([old_ids, ids]), np.concatenate([old_tfs, tfs])
+            if len(ids) > 1 and not (ids[1:] > ids[:-1]).all():
+                # New chunks get the highest ids, so this only happens for out-of-order adds
+                order = np.argsort(ids, kind="stable")
+                ids, tfs = ids[order], tfs[order]
+            self.postings[term] = (ids, tfs)
+
+    def delete(self, chunk_ids: Iterable[int]):
+        doomed = {int(i) for i in chunk_ids if int(i) in self.doc_len}
+        if not doomed:
+            return
+        self._forget_scores()
+        removed: Dict[str, List[int]] = {}
+        for chunk_id in doomed:
+            for term in self.doc_terms.pop(chunk_id, ()):
+                removed.setdefault(term, []).append(chunk_id)
+            self.total_len -= self.doc_len.pop(chunk_id)
+        for term, gone in removed.items():
+            ids, tfs = self.postings[term]
+            if len(gone) == len(ids):
+                del self.postings[term]
+                continue
+            keep = np.ones(len(ids), dtype=bool)
+            keep[np.searchsorted(ids, gone)] = False
+            self.postings[term] = (ids[keep], tfs[keep])
+
+    def clear(self):
+        self._forget_scores()
+        self.postings = {}
+        self.doc_len.clear()
+        self.doc_terms.clear()
+        self.total_len = 0
+
+    def _forget_scores(self):
+        # Every score depends on the chunk count and average length
+        with self._scored_lock:
+            self._scored.clear()
+            self._scored_bytes = 0
+
+    # -----------------------------
+    # Search
+    # -----------------------------
+    def search(
+        self, query: str, top_k: int = 5, accept: Optional[Callable[[np.ndarray], np.ndarray]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Returns up to top_k (chunk_id, bm25 score) pairs, best first.
+        `accept` (chunk ids → boolean mask) keeps only the chunks a search filter allows.
+        """
+        terms = set(tokenize(query))
+        if not self.doc_len or not terms or top_k <= 0:
+            return []
+        scored = [s for s in (self._term_scores(term) for term in terms) if s is not None]
+        if not scored:
+            return []
+
+        ranked = _pruned_top(scored, top_k, accept)
+        if ranked is None:
+            ids, scores = _sum_postings(scored)
+            if accept is not None:
+                mask = accept(ids)
+                ids, scores = ids[mask], scores[mask]
+        else:
+            ids, scores = ranked
+        if len(ids) > top_k:
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            ids, scores = ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(i), float(s)) for i, s in zip(ids[order], scores[order])]
+
+    def _term_scores(self, term: str) -> Optional[Tuple[np.ndarray, ...]]:
+        """
+        (chunk ids, BM25 scores) of one term's postings, at most max_postings
+        of the best, best first; then the same pair sorted by chunk id.
+        """
+        with self._scored_lock:
+            cached = self._scored.get(term)
+            if cached is not None:
+                self._scored.move_to_end(term)
+                return cached
+        postings = self.postings.get(term)
+        if postings is None:
+            return None
+        ids, tf = postings
+        n, df = len(self.doc_len), len(ids)
+        idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        lengths = np.fromiter(map(self.doc_len.__getitem__, ids.tolist()), dtype=np.float64, count=df)
+        norm = self.k1 * (1 - self.b + self.b * lengths / (self.total_len / n))
+        scores = idf * tf * (self.k1 + 1) / (tf + norm)
+        best = np.argsort(-scores, kind="stable")
+        if self.max_postings and df > self.max_postings:
+            best = best[: self.max_postings]
+            kept = np.sort(best)
+            entry = (ids[best], scores[best], ids[kept], scores[kept])
+        else:
+            entry = (ids[best], scores[best], ids, scores)
+
+        size = sum(a.nbytes for a in entry)
+        with self._scored_lock:
+            if term not in self._scored:
+                self._scored[term] = entry
+                self._scored_bytes += size
+                while self._scored_bytes > BM25_CACHE_MB * (1 << 20) and len(self._scored) > 1:
+                    self._scored_bytes -= sum(a.nbytes for a in self._scored.popitem(last=False)[1])
+        return entry
+
+
+def _pruned_top(scored: List[Tuple[np.ndarray, ...]], top_k: int, accept) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Exact totals of a few chunks that surely include the top-k, or None when
+    pruning won't beat summing every posting.
+
+    The chunks in each term's head (its best `depth` postings) are totalled in
+    full; a chunk in no head scores at most Σ each term's next score past its
+    head. Once the k-th best head total beats that, the heads hold the whole
+    top-k; otherwise they grow 4x. How far each list would still have to be
+    read (a chunk reaching the floor needs floor − Σ the other terms' next
+    scores from every term) says when to give up (flat score lists).
+    """
+    if len(scored) > BM25_PRUNE_MAX_TERMS:
+        return None
+    total = sum(len(term_ids) for term_ids, *_ in scored)
+    depth = max(BM25_HEAD, 4 * top_k)
+    while depth * len(scored) * 2 < total:
+        ids = _distinct(np.concatenate([term_ids[:depth] for term_ids, *_ in scored]))
+        if accept is not None:
+            ids = ids[accept(ids)]
+        if len(ids) >= top_k:
+            totals = _totals(scored, ids)
+            floor = np.partition(totals, len(ids) - top_k)[len(ids) - top_k]
+            rest = [term_scores[depth] if depth < len(term_scores) else 0.0 for _, term_scores, *_ in scored]
+            if floor > sum(rest):
+                return ids, totals
+            unread = sum(
+                len(term_scores) - np.searchsorted(term_scores[::-1], floor - (sum(rest) - next_score))
+                for (_, term_scores, *_), next_score in zip(scored, rest)
+            )
+            if unread * 2 >= total:
+                return None
+        depth *= 4
+    return None
+
+
+def _distinct(ids: np.ndarray) -> np.ndarray:
+    # Sort-based; np.unique hashes, which is several times slower on int64 ids
+    ids = np.sort(ids)
+    return ids[np.concatenate(([True], ids[1:] != ids[:-1]))]
+
+
+def _totals(scored: List[Tuple[np.ndarray, ...]], ids: np.ndarray) -> np.ndarray:
+    """Each of `ids`' BM25 total over the query terms."""
+    totals = np.zeros(len(ids))
+    for _, _, sorted_ids, sorted_scores in scored:
+        pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        totals += np.where(sorted_ids[pos] == ids, sorted_scores[pos], 0.0)
+    return totals
+
+
+def _sum_postings(scored: List[Tuple[np.ndarray, ...]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Each chunk's total over all the query terms' postings, as (ids, scores)."""
+    if len(scored) == 1:
+        return scored[0][0], scored[0][1]
+    ids = np.concatenate([term_ids for term_ids, *_ in scored])
+    scores = np.concatenate([term_scores for _, term_scores, *_ in scored])
+    high = max(int(by_id[-1]) for _, _, by_id, _ in scored) + 1
+    if len(ids) * 8 >= high:
+        # Dense: a scan of an array this size costs about as much as the postings themselves
+        totals = np.bincount(ids, weights=scores, minlength=high)
+        ids = np.flatnonzero(totals > 0)  # every BM25 score is > 0
+        return ids, totals[ids]
+    ids, slot = np.unique(ids, return_inverse=True)
+    return ids, np.bincount(slot, weights=scores)
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuses several best-first id lists: score(id) = Σ 1 / (k + rank).
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
@@ -1,15 +1,117 @@
 # app/services/llm_service.py
 
 import os
-import requests
+import json
+import random
 import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
 
 HF_TOKEN = os.getenv("HF_TOKEN")
 HF_MODEL = os.getenv("HF_MODEL", "google/flan-t5-small")  # default lightweight model
 HF_API_URL = f"https://api-inference.huggingface.co/models/{HF_MODEL}"
+# Point this at scripts/stub_llm_server.py for local tests / benchmarks
+LLM_API_URL = os.getenv("LLM_API_URL", HF_API_URL)
 
 HEADERS = {"Authorization": f"Bearer {HF_TOKEN}"}
 
+# -----------------------------------------------------------
+# ✅ Client tuning
+# -----------------------------------------------------------
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))   # in-flight LLM calls per worker
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))        # seconds, doubled per retry
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+FALLBACK_REPLY = "I'm having trouble responding right now. Please try again later."
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_waiting = 0    # calls queued for a slot
+_in_flight = 0  # calls holding a slot
+
+
+class LLMError(Exception):
+    pass
+
+
+@asynccontextmanager
+async def _llm_slot():
+    """
+    The concurrency semaphore, counting callers waiting for it (queue depth).
+    """
+    global _waiting, _in_flight
+    _waiting += 1
+    try:
+        await _semaphore.acquire()
+    finally:
+        _waiting -= 1
+    _in_flight += 1
+    try:
+        yield
+    finally:
+        _in_flight -= 1
+        _semaphore.release()
+
+
+def llm_stats() -> dict:
+    return {"in_flight": _in_flight, "waiting": _waiting, "max_concurrency": LLM_MAX_CONCURRENCY}
+
+
+# -----------------------------------------------------------
+# ✅ Shared async HTTP client (keep-alive connection pool)
+# -----------------------------------------------------------
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                keepalive_expiry=30.0,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _backoff(attempt: int) -> float:
+    # Exponential backoff with jitter: 0.5s, 1s, 2s ... (+0-25%)
+    delay = LLM_BACKOFF_BASE * (2 ** attempt)
+    return delay + random.uniform(0, delay / 4)
+
+
+def _payload(prompt: str, stream: bool = False) -> dict:
+    payload = {
+        "inputs": prompt,
+        "options": {"wait_for_model": True}  # ensures the model is loaded if cold
+    }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+def _parse_generated_text(data) -> str:
+    # HF Inference API returns a list of dicts with 'generated_text'
+    if isinstance(data, list) and data and "generated_text" in data[0]:
+        return data[0]["generated_text"]
+    if isinstance(data, dict) and "generated_text" in data:
+        return data["generated_text"]
+    # fallback
+    return str(data)
+
 
 # -----------------------------------------------------------
 # ✅ Generate AI Response
@@ -19,35 +121,78 @@ async def generate_response(prompt: str) -> str:
     Sends prompt to Hugging Face Inference API and returns model response.
     """
     try:
-        response = await asyncio.to_thread(_call_hf_api, prompt)
+        async with _llm_slot():
+            response = await _call_hf_api(prompt)
         return response.strip()
     except Exception as e:
         print(f"❌ Hugging Face API error: {e}")
-        return "I'm having trouble responding right now. Please try again later."
+        return FALLBACK_REPLY
 
 
-# -----------------------------------------------------------
-# 🔹 Private helper function (sync call wrapped in async)
-# -----------------------------------------------------------
-def _call_hf_api(prompt: str) -> str:
+async def _call_hf_api(prompt: str) -> str:
     """
-    Makes a synchronous HTTP request to HF API (called inside async wrapper)
+    POSTs to the LLM endpoint, retrying 429/5xx and transport errors with backoff.
     """
-    payload = {
-        "inputs": prompt,
-        "options": {"wait_for_model": True}  # ensures the model is loaded if cold
-    }
+    client = get_client()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            response = await client.post(LLM_API_URL, json=_payload(prompt))
+        except httpx.TransportError as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise LLMError(f"HF API unreachable: {e}") from e
+        else:
+            if response.status_code == 200:
+                return _parse_generated_text(response.json())
+            if response.status_code not in RETRY_STATUS_CODES or attempt == LLM_MAX_RETRIES:
+                raise LLMError(f"HF API failed ({response.status_code}): {response.text}")
+        await asyncio.sleep(_backoff(attempt))
+    raise LLMError("HF API failed after retries")
 
-    response = requests.post(HF_API_URL, headers=HEADERS, json=payload, timeout=60)
 
-    if response.status_code != 200:
-        raise Exception(f"HF API failed ({response.status_code}): {response.text}")
-
-    data = response.json()
+# -----------------------------------------------------------
+# ✅ Stream AI Response (token by token)
+# -----------------------------------------------------------
+async def stream_response(prompt: str) -> AsyncIterator[str]:
+    """
+    Yields generated text incrementally.
+    Uses server-sent events when the endpoint supports `stream: true`
+    (text-generation-inference); otherwise yields the whole reply at once.
+    Only the initial connection is retried — never a half-streamed reply.
+    """
+    client = get_client()
+    yielded = False  # once any text went out, a retry would stream a second answer after it
+    async with _llm_slot():
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                async with client.stream("POST", LLM_API_URL, json=_payload(prompt, stream=True)) as response:
+                    if response.status_code != 200:
+                        body = (await response.aread()).decode("utf-8", "replace")
+                        if response.status_code in RETRY_STATUS_CODES and attempt < LLM_MAX_RETRIES:
+                            await asyncio.sleep(_backoff(attempt))
+                            continue
+                        raise LLMError(f"HF API failed ({response.status_code}): {body}")
 
-    # HF Inference API returns a list of dicts with 'generated_text'
-    if isinstance(data, list) and "generated_text" in data[0]:
-        return data[0]["generated_text"]
+                    if "text/event-stream" not in response.headers.get("content-type", ""):
+                        text = _parse_generated_text(json.loads(await response.aread())).strip()
+                        yielded = True
+                        yield text
+                        return
 
-    # fallback
-    return str(data)
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            return
+                        event = json.loads(data)
+                        token = (event.get("token") or {}).get("text", "")
+                        if token and not (event.get("token") or {}).get("special"):
+                            yielded = True
+                            yield token
+                    return
+            except httpx.TransportError as e:
+                if yielded:
+                    raise LLMError(f"HF API stream broke off mid-reply: {e}") from e
+                if attempt == LLM_MAX_RETRIES:
+                    raise LLMError(f"HF API unreachable: {e}") from e
+                await asyncio.sleep(_backoff(attempt))
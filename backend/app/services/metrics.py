@@ -0,0 +1,226 @@
+# app/services/metrics.py
+
+import os
+import json
+import time
+import queue
+import random
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# -----------------------------
+# Settings
+# -----------------------------
+METRICS_LOG_SAMPLE = float(os.getenv("METRICS_LOG_SAMPLE", "0.01"))  # share of requests whose timings are logged
+METRICS_LOG_QUEUE = int(os.getenv("METRICS_LOG_QUEUE", "1000"))      # log lines buffered; extra are dropped
+
+# Seconds; covers a ~1 ms FAISS search up to a slow 60 s LLM call
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (32, 64, 128, 256, 384, 512, 768, 1024, 2048, 4096)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# -----------------------------
+# ✅ Labelled histogram (Prometheus text format)
+# -----------------------------
+class Histogram:
+    """
+    Fixed-bucket histogram per label set. observe() is a bisect plus three
+    additions under a lock, so it is cheap enough for every request.
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels → [bucket counts, sum, count]
+
+    def observe(self, seconds: float, *labels: str):
+        slot = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in sorted(self._series.items())]
+        for labels, counts, total, count in snapshot:
+            base = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {count}')
+            suffix = f"{{{base}}}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total:.6f}")
+            lines.append(f"{self.name}_count{suffix} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("chat_stage_seconds", "Time spent in each chat pipeline stage.", ("stage",))
+REQUEST_SECONDS = Histogram("chat_request_seconds", "End-to-end chat request time.", ("endpoint", "outcome"))
+PROMPT_TOKENS = Histogram("chat_prompt_tokens", "Tokens in the LLM prompt, by part.", ("part",), TOKEN_BUCKETS)
+
+
+# -----------------------------
+# ✅ Per-request trace (timing spans)
+# -----------------------------
+class Trace:
+    """
+    Stage → seconds for one chat request. The pipeline sets `outcome`
+    ("faq", "cached", "generated"); finish() records the total and, for a
+    sampled request, queues one log line.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.outcome = "error"
+        self.total = 0.0
+        self.prompt_tokens: Optional[int] = None
+        self.sampled = random.random() < METRICS_LOG_SAMPLE
+        self.finished = False
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def finish(self, outcome: Optional[str] = None):
+        if self.finished:
+            return
+        self.finished = True
+        if outcome is not None:
+            self.outcome = outcome
+        total = self.total = self.elapsed()
+        REQUEST_SECONDS.observe(total, self.endpoint, self.outcome)
+        if self.sampled:
+            _log_async({
+                "endpoint": self.endpoint,
+                "outcome": self.outcome,
+                "total_ms": round(total * 1000, 2),
+                "stages_ms": {k: round(v * 1000, 2) for k, v in self.stages.items()},
+                "prompt_tokens": self.prompt_tokens,
+            })
+
+
+# Set per request; asyncio.to_thread copies it, so spans in worker threads attach too
+_current: ContextVar[Optional[Trace]] = ContextVar("chat_trace", default=None)
+
+
+def begin_trace(endpoint: str) -> Trace:
+    trace = Trace(endpoint)
+    _current.set(trace)
+    return trace
+
+
+def use_trace(trace: Trace):
+    """Re-attaches a trace in another task (e.g. the SSE body generator)."""
+    _current.set(trace)
+
+
+def set_outcome(outcome: str):
+    trace = _current.get()
+    if trace is not None:
+        trace.outcome = outcome
+
+
+def record(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage)
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def record_prompt(stats: dict):
+    """Token counts of one built prompt (see rag_service.build_prompt)."""
+    for part in ("prompt", "context", "history"):
+        PROMPT_TOKENS.observe(stats[f"{part}_tokens"], part)
+    trace = _current.get()
+    if trace is not None:
+        trace.prompt_tokens = stats["prompt_tokens"]
+
+
+@contextmanager
+def span(stage: str):
+    """
+    with span("retrieval"): ...  → chat_stage_seconds{stage="retrieval"}
+    (and the current request's trace).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+# -----------------------------
+# ✅ Sampled timing log, written off the request path
+# -----------------------------
+_log_queue: "queue.Queue[dict]" = queue.Queue(maxsize=METRICS_LOG_QUEUE)
+_log_thread: Optional[threading.Thread] = None
+_log_thread_lock = threading.Lock()
+
+
+def _log_writer():
+    while True:
+        entry = _log_queue.get()
+        print(f"⏱️ {json.dumps(entry, ensure_ascii=False)}", flush=True)
+
+
+def _log_async(entry: dict):
+    global _log_thread
+    if _log_thread is None:
+        with _log_thread_lock:
+            if _log_thread is None:
+                _log_thread = threading.Thread(target=_log_writer, name="metrics-log", daemon=True)
+                _log_thread.start()
+    try:
+        _log_queue.put_nowait(entry)
+    except queue.Full:
+        pass  # never block a request on logging
+
+
+# -----------------------------
+# ✅ /metrics exposition
+# -----------------------------
+def _metric_name(*parts: str) -> str:
+    return "_".join(p.replace("-", "_").replace(".", "_") for p in parts)
+
+
+def render_metrics(stats: Dict[str, dict], counters: Optional[Dict[str, Iterable[str]]] = None) -> str:
+    """
+    Histograms plus one series per numeric value of each stats dict. Keys
+    listed in `counters` (group → keys) only ever grow and are exported as
+    counters with a _total suffix; everything else is a gauge, e.g.
+    {"answer_cache": {"hits": 12, "hit_rate": 0.4}}, {"answer_cache": ["hits"]}
+    → answer_cache_hits_total 12, answer_cache_hit_rate 0.4
+    """
+    counters = counters or {}
+    lines = STAGE_SECONDS.render() + REQUEST_SECONDS.render() + PROMPT_TOKENS.render()
+    for group, values in stats.items():
+        counter_keys = set(counters.get(group, ()))
+        for key, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            if key in counter_keys:
+                name, kind = _metric_name(group, key, "total"), "counter"
+            else:
+                name, kind = _metric_name(group, key), "gauge"
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,327 @@
+# app/services/partitions.py
+
+import os
+import re
+import json
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# -----------------------------
+# Settings
+# -----------------------------
+#   category    one FAISS index per FILE_CATEGORIES bucket (circulars, faq, messages, excel)
+#   department  one per category sub-folder as well: college_data/circulars/cse/… → "circulars/cse"
+#   none        a single index over everything (the layout before partitioning)
+PARTITION_SCHEMES = ("category", "department", "none")
+INDEX_PARTITION_BY = os.getenv("INDEX_PARTITION_BY", "category")
+DATA_FOLDER = "college_data"             # <DATA_FOLDER>/<category>/[<department>/]<file>
+OTHER_CATEGORY = "other"                 # files outside DATA_FOLDER
+CHUNK_META_PATH = "chunk_meta.bin"       # row i = (label code, date) of chunk id i
+CHUNK_LABELS_PATH = "chunk_labels.json"  # label code → [category, department]
+FILTER_EXACT_MAX = int(os.getenv("FILTER_EXACT_MAX", "10000"))  # filtered sets up to this size are scanned exactly
+
+FILTER_KEYS = ("category", "department", "since", "until")
+NO_LABEL = -1
+NO_DATE = -1
+
+# Circulars and notices are usually named by issue date: 2024-03-15, 20240315, 15-03-2024
+_YEAR_FIRST = re.compile(r"(?<!\d)(\d{4})[-_.]?(\d{2})[-_.]?(\d{2})(?!\d)")
+_DAY_FIRST = re.compile(r"(?<!\d)(\d{2})[-_.](\d{2})[-_.](\d{4})(?!\d)")
+
+
+# -----------------------------
+# ✅ What a file is: category, department, date
+# -----------------------------
+def _date_in_name(name: str) -> Optional[date]:
+    for pattern, year_first in ((_YEAR_FIRST, True), (_DAY_FIRST, False)):
+        for match in pattern.finditer(name):
+            a, b, c = (int(g) for g in match.groups())
+            try:
+                return date(a, b, c) if year_first else date(c, b, a)
+            except ValueError:
+                continue
+    return None
+
+
+def describe_source(file_path: str) -> dict:
+    """
+    {"category", "department", "date"} of an ingested file: category and
+    department from its folders under DATA_FOLDER, date from the file name
+    or else the file's modification time (None if neither is known).
+    """
+    rel = os.path.relpath(os.path.normpath(file_path), DATA_FOLDER)
+    parts = rel.split(os.sep)
+    if parts[0] == os.pardir or len(parts) < 2:
+        category, department = OTHER_CATEGORY, ""
+    else:
+        category, department = parts[0].lower(), parts[1].lower() if len(parts) > 2 else ""
+
+    day = _date_in_name(os.path.basename(file_path))
+    if day is None and os.path.exists(file_path):
+        day = date.fromtimestamp(os.path.getmtime(file_path))
+    return {"category": category, "department": department, "date": day}
+
+
+def partition_name(category: str, department: str, by: str = INDEX_PARTITION_BY) -> str:
+    """The index partition a chunk with this label lives in."""
+    if by not in PARTITION_SCHEMES:
+        raise ValueError(f"Unknown INDEX_PARTITION_BY: {by} (expected one of {PARTITION_SCHEMES})")
+    if by == "none":
+        return "all"
+    if by == "department" and department:
+        return f"{category}/{department}"
+    return category
+
+
+def partition_file(base: str, name: str) -> str:
+    """faiss_index.index + "circulars/cse" → faiss_index.circulars__cse.index"""
+    root, ext = os.path.splitext(base)
+    slug = re.sub(r"[^\w.-]", "_", name.replace("/", "__"))
+    return f"{root}.{slug}{ext}"
+
+
+# -----------------------------
+# ✅ Search filters
+# -----------------------------
+def _names(value) -> Optional[Set[str]]:
+    if value is None or value == "":
+        return None
+    values = value.split(",") if isinstance(value, str) else value
+    names = {str(v).strip().lower() for v in values if str(v).strip()}
+    return names or None
+
+
+def _day(value, key: str) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return date.fromisoformat(str(value)).toordinal()
+    except ValueError:
+        raise ValueError(f"Search filter {key!r} must be a date (YYYY-MM-DD), got {value!r}")
+
+
+def normalize_filters(filters: Optional[dict]) -> Optional[dict]:
+    """
+    Validates {"category", "department", "since", "until"} (all optional):
+    category / department are a name, a list or a comma-separated string,
+    since / until are dates (inclusive). None when nothing is filtered.
+    Raises ValueError on unknown keys or bad dates.
+    """
+    if not filters:
+        return None
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown search filter(s) {sorted(unknown)} (expected {FILTER_KEYS})")
+    normalized = {
+        "category": _names(filters.get("category")),
+        "department": _names(filters.get("department")),
+        "since": _day(filters.get("since"), "since"),
+        "until": _day(filters.get("until"), "until"),
+    }
+    return normalized if any(v is not None for v in normalized.values()) else None
+
+
+def _label_matches(label: Tuple[str, str], filters: dict) -> bool:
+    category, department = label
+    return (
+        (filters["category"] is None or category in filters["category"])
+        and (filters["department"] is None or department in filters["department"])
+    )
+
+
+def plan_partitions(labels: List[Tuple[str, str]], filters: dict, by: str = INDEX_PARTITION_BY) -> Tuple[Set[str], bool]:
+    """
+    (partitions that can hold matching chunks, whether every chunk in them
+    matches). When the second is False, hits must still be checked per chunk
+    (a date range, or a department inside a category-wide partition).
+    """
+    matching = {label for label in labels if _label_matches(label, filters)}
+    names = {partition_name(*label, by=by) for label in matching}
+    whole = filters["since"] is None and filters["until"] is None and all(
+        label in matching for label in labels if partition_name(*label, by=by) in names
+    )
+    return names, whole
+
+
+# -----------------------------
+# ✅ Per-chunk label + date (memory-mapped, row = chunk id)
+# -----------------------------
+_ROW = np.dtype([("label", "<i4"), ("date", "<i4")])
+
+
+class ChunkMeta:
+    """
+    Category / department label and date of every chunk, so a filtered
+    search picks its candidates without reading any chunk text. Labels are
+    codes into a small JSON table; dates are day ordinals (NO_DATE unknown).
+    Like chunks.idx, the file is memory-mapped and shared by all workers.
+    """
+
+    def __init__(self, path: str = CHUNK_META_PATH, labels_path: str = CHUNK_LABELS_PATH):
+        self.path = path
+        self.labels_path = labels_path
+        self.lock = threading.RLock()
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        self._file = open(path, "r+b")
+        self._rows = np.empty(0, dtype=_ROW)
+        self.labels: List[Tuple[str, str]] = []
+        self._codes: Dict[Tuple[str, str], int] = {}
+        self._load_labels()
+        self._remap()
+
+    def _load_labels(self):
+        try:
+            with open(self.labels_path, "r", encoding="utf-8") as f:
+                self.labels = [tuple(label) for label in json.load(f)]
+        except FileNotFoundError:
+            self.labels = []
+        self._codes = {label: code for code, label in enumerate(self.labels)}
+
+    def _save_labels(self):
+        tmp_path = self.labels_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.labels, f)
+        os.replace(tmp_path, self.labels_path)
+
+    def _remap(self):
+        if isinstance(self._rows, np.memmap):
+            self._rows.flush()
+        rows = os.fstat(self._file.fileno()).st_size // _ROW.itemsize
+        self._rows = np.memmap(self._file, dtype=_ROW, mode="r+", shape=(rows,)) if rows else np.empty(0, dtype=_ROW)
+
+    def reload(self):
+        """Picks up labels and rows written by another process."""
+        with self.lock:
+            self._load_labels()
+            self._remap()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+    def code(self, category: str, department: str) -> int:
+        label = (category, department)
+        with self.lock:
+            if label not in self._codes:
+                self._load_labels()  # another worker may have added it
+            if label not in self._codes:
+                self._codes[label] = len(self.labels)
+                self.labels.append(label)
+                self._save_labels()
+            return self._codes[label]
+
+    def write(self, ids: np.ndarray, codes, days):
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        with self.lock:
+            needed = int(ids.max()) + 1
+            if needed > len(self._rows):
+                self._remap()  # flushes, and sees rows another process appended
+                gap = np.empty(max(0, needed - len(self._rows)), dtype=_ROW)
+                gap["label"], gap["date"] = NO_LABEL, NO_DATE
+                self._file.seek(0, os.SEEK_END)
+                self._file.write(gap.tobytes())
+                self._file.flush()
+                self._remap()
+            self._rows["label"][ids] = codes
+            self._rows["date"][ids] = days
+
+    def flush(self):
+        with self.lock:
+            if isinstance(self._rows, np.memmap):
+                self._rows.flush()
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        self.flush()
+        self._rows = np.empty(0, dtype=_ROW)
+        self._file.close()
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+    def read(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(label codes, day ordinals) of `ids`; NO_LABEL / NO_DATE where unknown."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) and int(ids.max()) >= len(self._rows):
+            self.reload()  # another process appended since we mapped the file
+        labels = np.full(len(ids), NO_LABEL, dtype=np.int32)
+        days = np.full(len(ids), NO_DATE, dtype=np.int32)
+        inside = ids < len(self._rows)
+        rows = self._rows[ids[inside]]
+        labels[inside] = rows["label"]
+        days[inside] = rows["date"]
+        return labels, days
+
+    def label(self, code: int) -> Optional[Tuple[str, str]]:
+        if code >= len(self.labels):
+            self.reload()
+        return self.labels[code] if 0 <= code < len(self.labels) else None
+
+    def describe(self, chunk_id: int) -> dict:
+        labels, days = self.read(np.array([chunk_id]))
+        category, department = self.label(int(labels[0])) or (None, None)
+        day = int(days[0])
+        return {
+            "category": category,
+            "department": department or None,
+            "date": date.fromordinal(day).isoformat() if day != NO_DATE else None,
+        }
+
+    def matches(self, ids: np.ndarray, filters: dict) -> np.ndarray:
+        """Boolean mask of the `ids` whose label and date pass `filters`."""
+        labels, days = self.read(ids)
+        mask = np.ones(len(labels), dtype=bool)
+        if filters["category"] is not None or filters["department"] is not None:
+            codes = [code for code, label in enumerate(self.labels) if _label_matches(label, filters)]
+            mask &= np.isin(labels, codes)
+        if filters["since"] is not None:
+            mask &= days >= filters["since"]  # NO_DATE never passes a bound
+        if filters["until"] is not None:
+            mask &= (days <= filters["until"]) & (days != NO_DATE)
+        return mask
+
+    def select(self, ids: np.ndarray, filters: dict) -> np.ndarray:
+        ids = np.asarray(ids, dtype=np.int64)
+        return ids[self.matches(ids, filters)]
+
+    def unlabelled(self, ids: np.ndarray) -> np.ndarray:
+        labels, _ = self.read(ids)
+        return np.asarray(ids, dtype=np.int64)[labels == NO_LABEL]
+
+    def partitions_of(self, ids: np.ndarray, by: str = INDEX_PARTITION_BY) -> Dict[str, np.ndarray]:
+        """Groups `ids` by index partition (unlabelled ids under None)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        labels, _ = self.read(ids)
+        groups: Dict[str, List[np.ndarray]] = {}
+        for code in np.unique(labels):
+            label = self.label(int(code)) if code != NO_LABEL else None
+            name = partition_name(*label, by=by) if label else None
+            groups.setdefault(name, []).append(ids[labels == code])
+        return {name: np.concatenate(parts) for name, parts in groups.items()}
+
+
+def day_of(value: Optional[date]) -> int:
+    return value.toordinal() if value else NO_DATE
+
+
+def label_sources(meta: ChunkMeta, sources: Iterable[Tuple[int, str]]) -> int:
+    """Labels (chunk_id, source path) pairs from their paths; returns how many."""
+    by_source: Dict[str, List[int]] = {}
+    for chunk_id, source in sources:
+        by_source.setdefault(source, []).append(chunk_id)
+    for source, ids in by_source.items():
+        info = describe_source(source)
+        meta.write(np.asarray(ids, dtype=np.int64), meta.code(info["category"], info["department"]), day_of(info["date"]))
+    return sum(len(ids) for ids in by_source.values())
@@ -0,0 +1,210 @@
+# app/services/rag_service.py
+
+import os
+import re
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.services.extraction_service import CHUNK_OVERLAP
+from app.services.lexical_index import tokenize
+from app.services.llm_service import HF_MODEL
+
+# -----------------------------
+# Settings
+# -----------------------------
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))                            # chunks retrieved per question
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "512"))          # flan-t5-small's input limit
+PROMPT_HISTORY_TURNS = int(os.getenv("PROMPT_HISTORY_TURNS", "3"))      # earlier Q/A pairs offered to the model
+PROMPT_HISTORY_TOKENS = int(os.getenv("PROMPT_HISTORY_TOKENS", "128"))  # at most this much of the budget
+PROMPT_DEDUP_SIMILARITY = float(os.getenv("PROMPT_DEDUP_SIMILARITY", "0.95"))  # cosine; 0 = no dedup
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", HF_MODEL)              # "chars" = ~4 characters per token
+
+SENTENCE_END = re.compile(r"(?<=[.!?।])\s+|\n+")
+
+
+# -----------------------------
+# ✅ Token counting (the LLM's own tokenizer when available)
+# -----------------------------
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def _load_tokenizer():
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is not None:
+            return _tokenizer
+        _tokenizer = False
+        if PROMPT_TOKENIZER != "chars":
+            try:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(PROMPT_TOKENIZER)
+            except Exception as e:
+                print(f"⚠️ Tokenizer {PROMPT_TOKENIZER} unavailable, estimating tokens from length: {e}")
+        return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    tokenizer = _tokenizer if _tokenizer is not None else _load_tokenizer()
+    if tokenizer:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return len(text) // 4 + 1
+
+
+# -----------------------------
+# ✅ Context clean-up: near-duplicates, then adjacent chunks
+# -----------------------------
+def drop_near_duplicates(chunks: List[dict], vectors: Optional[np.ndarray],
+                         threshold: float = PROMPT_DEDUP_SIMILARITY) -> Tuple[List[dict], int]:
+    """
+    Keeps chunks in rank order, skipping any whose embedding has cosine
+    similarity ≥ threshold with a chunk already kept (the same FAQ answer
+    or notice uploaded twice, boilerplate repeated across circulars).
+    """
+    if vectors is None or threshold <= 0 or len(chunks) < 2:
+        return chunks, 0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.maximum(norms, 1e-12)
+    kept: List[int] = []
+    for i in range(len(chunks)):
+        if kept and float(np.max(unit[kept] @ unit[i])) >= threshold:
+            continue
+        kept.append(i)
+    return [chunks[i] for i in kept], len(chunks) - len(kept)
+
+
+def _join_overlapping(left: str, right: str) -> str:
+    # The splitter repeats up to CHUNK_OVERLAP characters at chunk borders
+    for size in range(min(len(left), len(right), 2 * CHUNK_OVERLAP), 9, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return f"{left} {right}"
+
+
+def merge_adjacent(chunks: List[dict]) -> List[dict]:
+    """
+    Merges chunks of the same source with consecutive ids (ids are assigned
+    in reading order) into one passage, removing the repeated overlap.
+    A passage ranks where its best chunk ranked.
+    """
+    by_id = {c["id"]: c for c in chunks}
+    rank = {c["id"]: n for n, c in enumerate(chunks)}
+    passages, seen = [], set()
+    for chunk in chunks:
+        if chunk["id"] in seen:
+            continue
+        start = chunk["id"]
+        while start - 1 in by_id and by_id[start - 1]["source"] == chunk["source"] and start - 1 not in seen:
+            start -= 1
+        text, members, current = by_id[start]["text"], [start], start
+        while current + 1 in by_id and by_id[current + 1]["source"] == chunk["source"] and current + 1 not in seen:
+            current += 1
+            text = _join_overlapping(text, by_id[current]["text"])
+            members.append(current)
+        seen.update(members)
+        passages.append({
+            "text": text,
+            "source": chunk["source"],
+            "ids": members,
+            "rank": min(rank[i] for i in members),
+        })
+    return sorted(passages, key=lambda p: p["rank"])
+
+
+# -----------------------------
+# ✅ Packing into the token budget
+# -----------------------------
+def pack_context(passages: List[dict], question: str, budget: int) -> Tuple[List[str], int, bool]:
+    """
+    Returns (passage texts, tokens used, truncated). Whole passages when they
+    all fit; otherwise the highest-value sentences — the passage's rank plus
+    how many question terms the sentence contains — kept in reading order.
+    """
+    if budget <= 0 or not passages:
+        return [], 0, bool(passages)
+    counts = [count_tokens(p["text"]) for p in passages]
+    if sum(counts) <= budget:
+        return [p["text"] for p in passages], sum(counts), False
+
+    terms = set(tokenize(question))
+    candidates = []
+    for p_index, passage in enumerate(passages):
+        prior = 1.0 / (1 + passage["rank"])
+        for s_index, sentence in enumerate(s for s in SENTENCE_END.split(passage["text"]) if s.strip()):
+            overlap = len(terms.intersection(tokenize(sentence))) / len(terms) if terms else 0.0
+            candidates.append((prior + overlap, p_index, s_index, sentence, count_tokens(sentence)))
+
+    chosen, used = [], 0
+    for candidate in sorted(candidates, key=lambda c: -c[0]):
+        if used + candidate[4] <= budget:
+            chosen.append(candidate)
+            used += candidate[4]
+
+    texts = []
+    for p_index in range(len(passages)):
+        sentences = sorted((c for c in chosen if c[1] == p_index), key=lambda c: c[2])
+        if sentences:
+            texts.append(" ".join(c[3] for c in sentences))
+    return texts, used, True
+
+
+def _history_block(history: List[Tuple[str, str]], budget: int) -> Tuple[str, int]:
+    # Newest turns first until the history budget is spent, then back in order
+    lines, used = [], 0
+    for question, answer in reversed(history[-PROMPT_HISTORY_TURNS:] if PROMPT_HISTORY_TURNS else []):
+        turn = f"User: {question}\nAssistant: {answer}"
+        tokens = count_tokens(turn)
+        if used + tokens > budget:
+            break
+        lines.append(turn)
+        used += tokens
+    return "\n".join(reversed(lines)), used
+
+
+# -----------------------------
+# ✅ Prompt assembly
+# -----------------------------
+def build_prompt(
+    question: str,
+    chunks: List[dict],
+    history: Optional[List[Tuple[str, str]]] = None,
+    vectors: Optional[np.ndarray] = None,
+    max_tokens: int = PROMPT_MAX_TOKENS,
+) -> Tuple[str, dict]:
+    """
+    Builds the LLM prompt from retrieved chunks (VectorStore.search results,
+    best first) within `max_tokens`:
+      1. drops near-duplicate chunks (`vectors`: their embeddings, same order)
+      2. merges adjacent / overlapping chunks of the same source
+      3. packs the best passages (or sentences) into what the question and
+         bounded conversation history leave of the budget
+    Returns (prompt, stats) where stats has the token counts.
+    """
+    chunks, duplicates = drop_near_duplicates(chunks, vectors)
+    passages = merge_adjacent(chunks)
+
+    history_text, history_tokens = _history_block(history or [], PROMPT_HISTORY_TOKENS)
+    skeleton = f"Context: \nQuestion: {question}"
+    if history_text:
+        skeleton = f"Conversation:\n{history_text}\n{skeleton}"
+    fixed_tokens = count_tokens(skeleton)
+
+    texts, context_tokens, truncated = pack_context(passages, question, max_tokens - fixed_tokens)
+    context_text = "\n".join(texts)
+    final_prompt = f"Context: {context_text}\nQuestion: {question}"
+    if history_text:
+        final_prompt = f"Conversation:\n{history_text}\n{final_prompt}"
+
+    return final_prompt, {
+        "prompt_tokens": fixed_tokens + context_tokens,
+        "context_tokens": context_tokens,
+        "history_tokens": history_tokens,
+        "chunks": len(chunks) + duplicates,
+        "duplicates": duplicates,
+        "passages": len(texts),
+        "truncated": truncated,
+    }
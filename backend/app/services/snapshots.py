@@ -0,0 +1,106 @@
+# app/services/snapshots.py
+
+import os
+import json
+import glob
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# -----------------------------
+# Settings
+# -----------------------------
+GENERATION_FILE = "index_generation.json"  # points at the current snapshot's files
+INGEST_LOCK_FILE = "ingest.lock"
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "3"))           # generations kept on disk
+INDEX_RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", "2"))  # seconds between checks; 0 = off
+
+
+# -----------------------------
+# ✅ Versioned snapshots
+# -----------------------------
+# A snapshot is a set of files named "<base>.g<generation>" (FAISS index,
+# BM25 index, ...). They are fully written and fsynced first; then
+# GENERATION_FILE is atomically replaced to point at them. Readers only ever
+# follow GENERATION_FILE, so they see the old snapshot or the new one,
+# never a half-written file.
+def snapshot_path(base: str, generation: int) -> str:
+    return f"{base}.g{generation}"
+
+
+def read_generation() -> Optional[dict]:
+    """
+    {"generation": int, "files": {component: path}, "published_at": float},
+    or None before the first snapshot.
+    """
+    try:
+        with open(GENERATION_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def current_generation() -> int:
+    info = read_generation()
+    return info["generation"] if info else 0
+
+
+def _fsync_file(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def publish(generation: int, files: Dict[str, str]):
+    """
+    Makes `files` (already written) the current snapshot, then prunes
+    snapshot files more than SNAPSHOT_KEEP generations old.
+    """
+    for path in files.values():
+        _fsync_file(path)
+    tmp_path = GENERATION_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"generation": generation, "files": files, "published_at": time.time()}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, GENERATION_FILE)
+    _prune(generation, files)
+
+
+def _prune(generation: int, current: Dict[str, str]):
+    # Workers still mapping an unlinked snapshot keep reading it (POSIX),
+    # so old files can go as soon as they fall out of the window
+    keep = set(current.values())
+    for path in current.values():
+        base = path.rsplit(".g", 1)[0]
+        for old in glob.glob(f"{glob.escape(base)}.g*"):
+            suffix = old.rsplit(".g", 1)[-1]
+            if old not in keep and suffix.isdigit() and int(suffix) <= generation - SNAPSHOT_KEEP:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+
+# -----------------------------
+# ✅ One writer across worker processes
+# -----------------------------
+@contextmanager
+def ingest_lock(path: str = INGEST_LOCK_FILE):
+    """
+    Exclusive inter-process lock around ingestion, so two uvicorn workers
+    never mutate the index, chunk store or manifest at the same time.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Windows: single-worker only
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -1,22 +1,272 @@
 # app/services/translation_service.py
 
-from deep_translator import GoogleTranslator
+import os
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 
 # -----------------------------------------------------------
-# ✅ Translation Utility using GoogleTranslator
+# ✅ Settings
 # -----------------------------------------------------------
-async def translate_text(text: str, src_lang: str, dest_lang: str) -> str:
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "google")        # google | stub
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "10000"))
+TRANSLATION_CACHE_TTL = int(os.getenv("TRANSLATION_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+TRANSLATION_CACHE_MONGO = os.getenv("TRANSLATION_CACHE_MONGO", "0") == "1"  # persistent tier
+TRANSLATION_COLLECTION = "translation_cache"
+GOOGLE_MAX_CHARS = 4500  # Google rejects requests over 5000 characters
+
+CacheKey = Tuple[str, str, str]
+
+
+# -----------------------------------------------------------
+# ✅ Pluggable translation backends (sync; always run off the event loop)
+# -----------------------------------------------------------
+class GoogleBackend:
     """
-    Translates text from src_lang to dest_lang using Google Translator.
-    Supported languages: English, Hindi, Telugu, Bengali, Tamil
+    deep-translator's GoogleTranslator. Several segments are joined with
+    newlines and sent as ONE request, then split back apart.
+    """
+
+    def translate_batch(self, texts: List[str], src_lang: str, dest_lang: str) -> List[str]:
+        from deep_translator import GoogleTranslator
+
+        translator = GoogleTranslator(source=src_lang, target=dest_lang)
+        joined = "\n".join(texts)
+        if len(texts) > 1 and len(joined) <= GOOGLE_MAX_CHARS and not any("\n" in t for t in texts):
+            parts = (translator.translate(joined) or "").split("\n")
+            if len(parts) == len(texts):
+                return [p.strip() for p in parts]
+        # Segments too long / contain newlines / came back re-split → one call each
+        return [translator.translate(t) for t in texts]
+
+
+class StubBackend:
+    """
+    Offline stand-in for tests and benchmarks: returns text unchanged,
+    optionally after a fixed delay to mimic network latency.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.calls = 0
+
+    def translate_batch(self, texts: List[str], src_lang: str, dest_lang: str) -> List[str]:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return list(texts)
+
+
+def _default_backend():
+    if TRANSLATION_BACKEND == "stub":
+        return StubBackend(float(os.getenv("TRANSLATION_STUB_LATENCY_MS", "0")))
+    return GoogleBackend()
+
+
+_backend = _default_backend()
+
+
+def set_translation_backend(backend):
     """
+    Swap the backend (any object with translate_batch(texts, src, dest)).
+    Clears the in-process cache so results from the old backend are not reused.
+    """
+    global _backend
+    _backend = backend
+    _cache.clear()
+
+
+# -----------------------------------------------------------
+# ✅ In-process LRU + TTL cache
+# -----------------------------------------------------------
+class TranslationCache:
+    def __init__(self, max_size: int = TRANSLATION_CACHE_SIZE, ttl: int = TRANSLATION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: "OrderedDict[CacheKey, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        item = self._items.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._items[key]
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key: CacheKey, value: str):
+        self._items[key] = (time.monotonic() + self.ttl, value)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+_cache = TranslationCache()
+
+# key → future of an in-flight backend call, so concurrent identical requests share it
+_in_flight: Dict[CacheKey, asyncio.Future] = {}
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split()).lower()
+
+
+def _cache_key(text: str, src_lang: str, dest_lang: str) -> CacheKey:
+    return (src_lang, dest_lang, normalize_text(text))
+
+
+def translation_cache_stats() -> dict:
+    return _cache.stats()
+
+
+# -----------------------------------------------------------
+# ✅ Optional persistent tier (MongoDB)
+# -----------------------------------------------------------
+def _doc_id(key: CacheKey) -> str:
+    return hashlib.sha1("\x1f".join(key).encode("utf-8")).hexdigest()
+
+
+def _mongo_collection():
+    from app.db.connection import get_collection
+
     try:
-        if src_lang == dest_lang:
-            return text  # No translation needed
+        return get_collection(TRANSLATION_COLLECTION)
+    except Exception:
+        return None  # DB not connected → memory cache only
 
-        translated = GoogleTranslator(source=src_lang, target=dest_lang).translate(text)
-        return translated
 
-    except Exception as e:
-        print(f"❌ Translation failed: {e}")
-        return text  # Fallback to original text if translation fails
+async def ensure_cache_indexes():
+    """
+    TTL index so MongoDB expires cached translations on its own.
+    Called at startup when TRANSLATION_CACHE_MONGO=1.
+    """
+    collection = _mongo_collection()
+    if collection is not None:
+        await collection.create_index("created_at", expireAfterSeconds=TRANSLATION_CACHE_TTL)
+
+
+async def _mongo_lookup(keys: List[CacheKey]) -> Dict[CacheKey, str]:
+    collection = _mongo_collection()
+    if collection is None or not keys:
+        return {}
+    by_id = {_doc_id(k): k for k in keys}
+    found = {}
+    async for doc in collection.find({"_id": {"$in": list(by_id)}}, {"translated": 1}):
+        found[by_id[doc["_id"]]] = doc["translated"]
+    return found
+
+
+async def _mongo_store(items: Dict[CacheKey, str]):
+    collection = _mongo_collection()
+    if collection is None or not items:
+        return
+    from pymongo import UpdateOne
+    from datetime import datetime, timezone
+
+    now = datetime.now(timezone.utc)
+    await collection.bulk_write([
+        UpdateOne(
+            {"_id": _doc_id(k)},
+            {"$set": {"src": k[0], "dest": k[1], "text": k[2], "translated": v, "created_at": now}},
+            upsert=True,
+        )
+        for k, v in items.items()
+    ], ordered=False)
+
+
+# -----------------------------------------------------------
+# ✅ Batched translation
+# -----------------------------------------------------------
+async def translate_batch(texts: List[str], src_lang: str, dest_lang: str) -> List[str]:
+    """
+    Translates several segments at once:
+    memory cache → (optional) MongoDB cache → one backend call for the rest.
+    Falls back to the original text for any segment that fails.
+    """
+    if src_lang == dest_lang or not texts:
+        return list(texts)
+
+    results: List[Optional[str]] = [None] * len(texts)
+    missing: Dict[CacheKey, List[int]] = {}
+    waiting: List[Tuple[int, asyncio.Future]] = []
+
+    for i, text in enumerate(texts):
+        if not text.strip():
+            results[i] = text
+            continue
+        key = _cache_key(text, src_lang, dest_lang)
+        cached = _cache.get(key)
+        if cached is not None:
+            results[i] = cached
+        elif key in _in_flight:
+            waiting.append((i, _in_flight[key]))
+        else:
+            missing.setdefault(key, []).append(i)
+
+    if missing:
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in missing}
+        _in_flight.update(futures)
+        translated: Dict[CacheKey, str] = {}
+        try:
+            if TRANSLATION_CACHE_MONGO:
+                translated.update(await _mongo_lookup(list(missing)))
+
+            todo = [key for key in missing if key not in translated]
+            if todo:
+                originals = [texts[missing[key][0]] for key in todo]
+                outputs = await asyncio.to_thread(_backend.translate_batch, originals, src_lang, dest_lang)
+                fresh = {key: out for key, out in zip(todo, outputs) if out}
+                translated.update(fresh)
+                if TRANSLATION_CACHE_MONGO and fresh:
+                    await _mongo_store(fresh)
+        except Exception as e:
+            print(f"❌ Translation failed: {e}")
+        finally:
+            for key, future in futures.items():
+                value = translated.get(key)
+                if value is not None:
+                    _cache.put(key, value)
+                future.set_result(value)
+                _in_flight.pop(key, None)
+
+        for key, indexes in missing.items():
+            for i in indexes:
+                results[i] = translated.get(key)
+
+    for i, future in waiting:
+        results[i] = await future
+
+    # Fallback to original text if translation failed
+    return [r if r is not None else t for r, t in zip(results, texts)]
+
+
+# -----------------------------------------------------------
+# ✅ Translation Utility
+# -----------------------------------------------------------
+async def translate_text(text: str, src_lang: str, dest_lang: str) -> str:
+    """
+    Translates text from src_lang to dest_lang (cached, off the event loop).
+    Supported languages: English, Hindi, Telugu, Bengali, Tamil
+    """
+    if src_lang == dest_lang:
+        return text  # No translation needed
+    return (await translate_batch([text], src_lang, dest_lang))[0]
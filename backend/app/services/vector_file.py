@@ -0,0 +1,82 @@
+# app/services/vector_file.py
+
+import os
+import threading
+
+import numpy as np
+
+# -----------------------------
+# Settings
+# -----------------------------
+EXACT_VECTORS_PATH = "faiss_vectors.f32"  # row i = float32 embedding of chunk id i
+
+
+# -----------------------------
+# ✅ Exact float32 vectors on disk (memory-mapped)
+# -----------------------------
+class VectorFile:
+    """
+    Flat file of float32 rows indexed by chunk id, read through np.memmap.
+
+    Lets a quantized FAISS index re-score its candidates exactly and be
+    rebuilt without re-embedding, while only the rows actually read are
+    paged in — and the OS page cache is shared by every uvicorn worker.
+    Rows of deleted chunks are left in place (ids are never reused).
+    """
+
+    def __init__(self, path: str = EXACT_VECTORS_PATH, dim: int = 384):
+        self.path = path
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self.lock = threading.Lock()
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        self._file = open(path, "r+b")
+        self._map = None
+        self._remap()
+
+    def _remap(self):
+        self.rows = os.fstat(self._file.fileno()).st_size // self.row_bytes
+        self._map = np.memmap(self._file, dtype=np.float32, mode="r+", shape=(self.rows, self.dim)) if self.rows else None
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def covers(self, ids: np.ndarray) -> bool:
+        return not len(ids) or int(np.max(ids)) < self.rows
+
+    def write(self, ids: np.ndarray, vectors: np.ndarray):
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return
+        with self.lock:
+            needed = int(ids.max()) + 1
+            if needed > self.rows:
+                if self._map is not None:
+                    self._map.flush()
+                self._file.truncate(needed * self.row_bytes)
+                self._remap()
+            self._map[ids] = np.asarray(vectors, dtype=np.float32)
+
+    def read(self, ids: np.ndarray) -> np.ndarray:
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return np.empty((0, self.dim), dtype=np.float32)
+        if int(ids.max()) >= self.rows:
+            self.reload()  # another process appended since we mapped the file
+        return np.array(self._map[ids])
+
+    def reload(self):
+        with self.lock:
+            self._remap()
+
+    def flush(self):
+        with self.lock:
+            if self._map is not None:
+                self._map.flush()
+                os.fsync(self._file.fileno())
+
+    def close(self):
+        self.flush()
+        self._map = None
+        self._file.close()
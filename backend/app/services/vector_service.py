@@ -1,107 +1,942 @@
 # app/services/vector_service.py
 
 import os
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
-import faiss
+import time
+import heapq
 import pickle
-from typing import Union
+import tempfile
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import faiss
+import numpy as np
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.extraction_service import (
+    EXTRACT_MEMORY_MB, EXTRACT_TIMEOUT_SECONDS, extract_chunks, limit_worker_memory, read_spool
+)
+from app.services.chunk_store import ChunkStore, CHUNK_DATA_PATH, CHUNK_INDEX_PATH
+from app.services.lexical_index import BM25Index, LEXICAL_INDEX_PATH, reciprocal_rank_fusion
+from app.services.index_factory import (
+    FAISS_INDEX_TYPE,
+    FAISS_RESCORE, FAISS_RESCORE_FACTOR,
+    build_index, choose_index_type, index_kind, index_ids, is_lossy, is_quantized, needs_corpus, supports_remove,
+    train_index, set_search_params, rescore,
+)
+from app.services.vector_file import VectorFile, EXACT_VECTORS_PATH
+from app.services.snapshots import snapshot_path, read_generation, current_generation, publish
+from app.services.partitions import (
+    ChunkMeta, CHUNK_META_PATH, CHUNK_LABELS_PATH, FILTER_EXACT_MAX, INDEX_PARTITION_BY,
+    day_of, describe_source, label_sources, normalize_filters, partition_file, partition_name, plan_partitions,
+)
+from app.services.embedding_cache import (
+    EmbeddingCache, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_META_PATH, EMBEDDING_CACHE_MAX_MB,
+)
+from app.services.metrics import span
 
 # -----------------------------
 # FAISS & Embedding Setup
 # -----------------------------
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Lightweight, multilingual
-VECTOR_STORE_PATH = "faiss_index.index"
-DOC_METADATA_PATH = "doc_metadata.pkl"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+VECTOR_STORE_PATH = "faiss_index.index"  # partitions: faiss_index.<partition>.index.g<generation>
+PARTITION_KEY = "faiss:"                 # snapshot component of a partition index: "faiss:<partition>"
+DOC_METADATA_PATH = "doc_metadata.pkl"  # legacy pickle, migrated into the chunk store on load
+
+# Bulk ingestion knobs
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))          # chunks per model.encode call
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))  # extraction processes
+INGEST_CHECKPOINT_CHUNKS = int(os.getenv("INGEST_CHECKPOINT_CHUNKS", "0"))  # 0 → persist once per run
+INGEST_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR") or None  # extracted chunks on their way to the encoder; None → system temp
+TOMBSTONE_REBUILD_RATIO = 0.1  # rebuild non-removable (HNSW) indexes past 10% deleted vectors
+
+# Hybrid retrieval: dense (FAISS) + lexical (BM25) candidates fused with RRF
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") == "1"
+HYBRID_DENSE_K = int(os.getenv("HYBRID_DENSE_K", "20"))      # candidates taken from FAISS
+HYBRID_LEXICAL_K = int(os.getenv("HYBRID_LEXICAL_K", "20"))  # candidates taken from BM25
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Read snapshots through mmap (flat / fp16 / PQ codes stay in the shared page cache)
+INDEX_MMAP = os.getenv("INDEX_MMAP", "1") == "1"
+
+
+def _with_ids(idx):
+    """
+    Wraps a plain FAISS index in an IndexIDMap2 so chunk ids stay stable
+    and vectors of a single file can be removed later.
+    Older indexes used positional ids 0..n-1, which we keep as-is.
+    IVF indexes store ids themselves and are returned unchanged.
+    """
+    if isinstance(idx, (faiss.IndexIDMap, faiss.IndexIVF)):
+        return idx
+    id_map = faiss.IndexIDMap2(faiss.IndexFlatL2(idx.d))
+    if idx.ntotal:
+        vectors = idx.reconstruct_n(0, idx.ntotal)
+        id_map.add_with_ids(vectors, np.arange(idx.ntotal, dtype=np.int64))
+    return id_map
+
+
+def _load_index(path: str) -> Tuple["faiss.Index", bool]:
+    """
+    Reads an index, memory-mapped when possible. Returns (index, mmapped);
+    a memory-mapped index must be copied (IndexPartition.copy) before it is mutated.
+    """
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) if INDEX_MMAP else 0
+    raw = faiss.read_index(path, flags)
+    index = _with_ids(raw)
+    return index, bool(flags) and index is raw
+
 
-# Load or create FAISS index
-if os.path.exists(VECTOR_STORE_PATH):
-    index = faiss.read_index(VECTOR_STORE_PATH)
+def _partition_files(files: Dict[str, str]) -> Dict[str, str]:
+    """Partition name → index file, from a snapshot's files."""
+    return {key[len(PARTITION_KEY):]: path for key, path in files.items() if key.startswith(PARTITION_KEY)}
+
+
+def _iter_chunks(
+    file_paths: List[str],
+    workers: int,
+    timeout: int = EXTRACT_TIMEOUT_SECONDS,
+    memory_mb: int = EXTRACT_MEMORY_MB,
+) -> Iterator[Tuple[str, int, Iterator[str], Optional[str]]]:
+    """
+    Yields (file_path, number of chunks, chunks, error) in input order; read
+    a file's chunks before moving on to the next file. error is None unless
+    the file failed to extract.
+    Extraction runs in a process pool (per-document timeout + memory cap)
+    unless workers=0. Workers spool chunks to disk as they split them and
+    the chunks are streamed back from there, so neither side ever holds a
+    whole document's chunks. At most 2 × workers documents are extracted
+    ahead of the encoder.
+    """
+    with tempfile.TemporaryDirectory(prefix="ingest-", dir=INGEST_SPOOL_DIR) as spool_dir:
+        spools = [os.path.join(spool_dir, f"{n}.jsonl") for n in range(len(file_paths))]
+        if workers <= 0 or not file_paths:
+            for file_path, spool_path in zip(file_paths, spools):
+                yield _spooled(extract_chunks(file_path, spool_path, timeout), spool_path)
+            return
+
+        # spawn → workers only import the light extraction module, not torch/FAISS
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(file_paths)),
+            mp_context=ctx,
+            initializer=limit_worker_memory,
+            initargs=(memory_mb,),
+        ) as pool:
+            in_flight = deque()
+            for file_path, spool_path in zip(file_paths, spools):
+                in_flight.append((file_path, spool_path, pool.submit(extract_chunks, file_path, spool_path, timeout)))
+                if len(in_flight) >= 2 * workers:
+                    yield _chunk_result(*in_flight.popleft())
+            while in_flight:
+                yield _chunk_result(*in_flight.popleft())
+
+
+def _chunk_result(file_path: str, spool_path: str, future) -> Tuple[str, int, Iterator[str], Optional[str]]:
+    try:
+        result = future.result()
+    except BrokenProcessPool as e:
+        # The worker was killed outright (e.g. by the OOM killer)
+        print(f"❌ Extraction worker failed on {file_path}: {e}")
+        result = (file_path, 0, f"worker died: {e}")
+    return _spooled(result, spool_path)
+
+
+def _spooled(result: Tuple[str, int, Optional[str]], spool_path: str) -> Tuple[str, int, Iterator[str], Optional[str]]:
+    file_path, count, error = result
+    return file_path, count, read_spool(spool_path) if count else iter(()), error
+
+
+def _migrate_pickle_metadata(chunks: ChunkStore):
+    """
+    One-off import of the old doc_metadata.pkl dict into the chunk store.
+    """
     with open(DOC_METADATA_PATH, "rb") as f:
         metadata = pickle.load(f)
-else:
-    index = faiss.IndexFlatL2(384)  # 384 for MiniLM embeddings
-    metadata = {}
-
-# Load embedding model
-model = SentenceTransformer(EMBEDDING_MODEL)
+    chunks.add_many((chunk_id, m["text"], m["source"]) for chunk_id, m in sorted(metadata.items()))
+    chunks.flush()
+    os.replace(DOC_METADATA_PATH, DOC_METADATA_PATH + ".migrated")
+    print(f"📦 Migrated {len(metadata)} chunks from {DOC_METADATA_PATH} to the chunk store")
 
 
 # -----------------------------
-# Helper: Extract text from file
+# ✅ One index partition
 # -----------------------------
-def extract_text(file_path: str) -> str:
-    ext = os.path.splitext(file_path)[1].lower()
+class IndexPartition:
+    """
+    The FAISS index over one partition's chunks (a category by default, see
+    app/services/partitions.py), the snapshot file it came from, and the
+    ids deleted from it that a non-removable (HNSW) index still holds.
+    """
 
-    if ext == ".pdf":
-        from PyPDF2 import PdfReader
-        reader = PdfReader(file_path)
-        return "\n".join([page.extract_text() for page in reader.pages])
+    def __init__(self, name: str, index, file: Optional[str] = None, mmapped: bool = False):
+        self.name = name
+        self.index = index
+        self.file = file  # None until saved; only dirty partitions are written again
+        self.mmapped = mmapped
+        self.dirty = file is None
+        self.tombstones: set = set()
+        set_search_params(index)
 
-    elif ext in [".docx", ".doc"]:
-        from docx import Document
-        doc = Document(file_path)
-        return "\n".join([p.text for p in doc.paragraphs])
+    @classmethod
+    def load(cls, name: str, path: str) -> "IndexPartition":
+        index, mmapped = _load_index(path)
+        return cls(name, index, path, mmapped)
 
-    elif ext == ".txt":
-        with open(file_path, "r", encoding="utf-8") as f:
-            return f.read()
+    def __len__(self) -> int:
+        return self.index.ntotal - len(self.tombstones)
 
-    elif ext == ".json":
-        import json
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return json.dumps(data)
+    def copy(self) -> "IndexPartition":
+        """A private, writable copy to change while searches keep using this one."""
+        # A memory-mapped index is read-only: read it into memory instead
+        index = _with_ids(faiss.read_index(self.file)) if self.mmapped else faiss.clone_index(self.index)
+        partition = IndexPartition(self.name, index, self.file)
+        partition.dirty = self.dirty
+        partition.tombstones = set(self.tombstones)
+        return partition
 
-    elif ext in [".xlsx", ".xls"]:
-        import pandas as pd
-        df = pd.read_excel(file_path)
-        return df.to_csv(index=False)
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        self.index.add_with_ids(vectors, ids)
+        self.dirty = True
 
-    else:
-        return ""  # unsupported
+    def remove(self, ids: np.ndarray):
+        if supports_remove(self.index):
+            self.index.remove_ids(ids)
+        else:
+            # Filtered out at search time, purged by maybe_rebuild()
+            self.tombstones.update(ids.tolist())
+        self.dirty = True
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        k: int,
+        vectors: VectorFile,
+        rescoring: bool = False,
+        accept: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (ids, distances) of the k nearest chunks, closest first. With
+        `rescoring`, a quantized index re-ranks a wider candidate set exactly.
+        `accept` (ids → boolean mask) drops chunks a filter rules out; the
+        search widens until k remain or the whole partition was scanned.
+        """
+        if not self.index.ntotal:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rescoring = rescoring and is_quantized(self.index)
+        wanted = k * FAISS_RESCORE_FACTOR if rescoring else k
+        # Over-fetch a little when deleted vectors may still be in the index
+        fetch = wanted + min(len(self.tombstones), 4 * k)
+        while True:
+            D, I = self.index.search(query_embedding, fetch)
+            keep = [n for n, i in enumerate(I[0]) if i >= 0 and int(i) not in self.tombstones]
+            ids, distances = I[0][keep], D[0][keep]
+            if accept is not None and len(ids):
+                mask = accept(ids)
+                ids, distances = ids[mask], distances[mask]
+            if accept is None or len(ids) >= wanted or fetch >= self.index.ntotal:
+                break
+            fetch *= 4
+        ids, distances = ids[:wanted], distances[:wanted]
+        if rescoring and len(ids):
+            ids, distances = rescore(query_embedding[0], ids, vectors.read(ids), k)
+        return ids[:k], distances[:k]
 
 
 # -----------------------------
-# Add a document to FAISS
+# ✅ Shared vector store
 # -----------------------------
-def add_to_faiss(file_path: str):
-    text = extract_text(file_path)
-    if not text.strip():
-        print(f"⚠️ No text extracted from {file_path}, skipping.")
-        return
+class VectorStore:
+    """
+    The one embedding model + FAISS index partitions + chunk store of this
+    process. Used by ingestion (knowledge_service) and retrieval
+    (chat_controller), so both always see the same chunks. Get it via
+    get_vector_store().
+
+    Chunks are indexed per partition (INDEX_PARTITION_BY, category by
+    default): a search filtered to some categories only scans theirs, and
+    changing or rebuilding one partition leaves the others' files alone.
+
+    Only the index partitions and BM25 are published per generation; the
+    chunk store, vector and metadata files are shared and updated in place.
+    New chunks always get unused ids, so other workers never read the wrong
+    text, but a chunk deleted here drops out of their results straight away,
+    not when they load the generation that removes it (the rest of the
+    ingestion run plus INDEX_RELOAD_INTERVAL).
+    """
+
+    def __init__(
+        self,
+        index_path: str = VECTOR_STORE_PATH,
+        chunk_data_path: str = CHUNK_DATA_PATH,
+        chunk_index_path: str = CHUNK_INDEX_PATH,
+        lexical_index_path: str = LEXICAL_INDEX_PATH,
+        vectors_path: str = EXACT_VECTORS_PATH,
+        meta_path: str = CHUNK_META_PATH,
+        labels_path: str = CHUNK_LABELS_PATH,
+        embedding_cache_path: str = EMBEDDING_CACHE_PATH,
+        embedding_cache_meta_path: str = EMBEDDING_CACHE_META_PATH,
+        model_name: str = EMBEDDING_MODEL,
+        index_type: str = FAISS_INDEX_TYPE,
+    ):
+        self.index_path = index_path
+        self.embedding_cache_paths = (embedding_cache_path, embedding_cache_meta_path)
+        self.ingest_encoded = [0, 0.0]  # chunks sent to the model by ingestion, seconds spent
+        self.lexical_index_path = lexical_index_path
+        self.model_name = model_name
+        self.index_type = index_type
+        # Imported lazily: torch + sentence-transformers take seconds to import
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        # Copy-on-write: searches only hold `lock` to read the current
+        # partitions + BM25; writers (one at a time, `write_lock`) change
+        # private copies and swap them in, so no search waits on a write or save
+        self.lock = threading.Lock()
+        self.write_lock = threading.RLock()
+        self._draft: Optional[Dict[str, IndexPartition]] = None  # the writer's partitions, until committed
+        self._copied: set = set()  # draft partitions already copied (safe to change)
+        self._draft_lexical: Optional[BM25Index] = None
+        # Bumped on every content change; answer caches key on it
+        self.version = 0
+
+        # Chunk text/source by id (memory-mapped, nothing deserialized up front)
+        self.chunks = ChunkStore(chunk_data_path, chunk_index_path)
+        if not self.chunks and os.path.exists(DOC_METADATA_PATH):
+            _migrate_pickle_metadata(self.chunks)
+
+        # Category / department / date by id: partition membership and search filters
+        self.meta = ChunkMeta(meta_path, labels_path)
+
+        # Load the current snapshot's partitions (or the single pre-partitioning index)
+        snapshot = read_generation()
+        self.generation = snapshot["generation"] if snapshot else 0
+        files = snapshot["files"] if snapshot else {"faiss": index_path, "bm25": lexical_index_path}
+        self.partitions: Dict[str, IndexPartition] = {
+            name: IndexPartition.load(name, path) for name, path in _partition_files(files).items()
+        }
+        legacy = None
+        if not self.partitions and os.path.exists(files.get("faiss", "")):
+            legacy, _ = _load_index(files["faiss"])
+
+        # Exact float32 copy of every vector (memory-mapped) for re-scoring and rebuilds
+        self.vectors = VectorFile(vectors_path, self.dim)
+        self.rescore = FAISS_RESCORE
+        live = self.chunks.ids()
+        if legacy is not None and not len(self.vectors) and len(live):
+            self._backfill_vectors(legacy)
+
+        # Ids still in a non-removable index whose chunks were deleted
+        for partition in self.partitions.values():
+            partition.tombstones = set(np.setdiff1d(index_ids(partition.index), live).tolist())
+
+        # BM25 over the same chunk ids; rebuilt from the chunk store if missing or out of step
+        self.lexical = BM25Index(files.get("bm25", lexical_index_path))
+        if len(self.lexical) != len(self.chunks):
+            self.rebuild_lexical()
+
+        # Index from before partitioning, or INDEX_PARTITION_BY changed → regroup once
+        if set(self.partitions) != set(self._members()):
+            self.rebuild()
+            self.save()
+            print(f"🧩 Split the FAISS index into {len(self.partitions)} partitions by {INDEX_PARTITION_BY}")
+
+    # -----------------------------
+    # Embeddings
+    # -----------------------------
+    def encode(self, texts: List[str], batch_size: int = EMBED_BATCH_SIZE) -> np.ndarray:
+        embeddings = self.model.encode(texts, batch_size=batch_size)
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def open_embedding_cache(self) -> Optional[EmbeddingCache]:
+        if EMBEDDING_CACHE_MAX_MB <= 0:
+            return None
+        path, meta_path = self.embedding_cache_paths
+        return EmbeddingCache(self.model_name, self.dim, path, meta_path)
+
+    def encode_cached(
+        self, texts: List[str], cache: Optional[EmbeddingCache], batch_size: int = EMBED_BATCH_SIZE
+    ) -> Tuple[np.ndarray, int, int]:
+        """
+        Embeddings of `texts`, taking cached ones from `cache` and encoding only
+        the misses (identical texts in the batch once).
+        Returns (embeddings, n encoded, n cache hits); the rest were in-batch duplicates.
+        """
+        if cache is None:
+            return self._encode_timed(texts, batch_size), len(texts), 0
+        keys = cache.keys(texts)
+        embeddings, hit = cache.get(keys)
+        hits = int(np.count_nonzero(hit))
+        if hits == len(texts):
+            return embeddings, 0, hits
+        miss = np.flatnonzero(~hit)
+        unique_keys, first, inverse = np.unique(keys[miss], return_index=True, return_inverse=True)
+        encoded = self._encode_timed([texts[miss[i]] for i in first], batch_size)
+        embeddings[miss] = encoded[inverse.reshape(-1)]
+        cache.put(unique_keys, encoded)
+        return embeddings, len(first), hits
+
+    def _encode_timed(self, texts: List[str], batch_size: int) -> np.ndarray:
+        started = time.perf_counter()
+        embeddings = self.encode(texts, batch_size=batch_size)
+        self.ingest_encoded[0] += len(texts)
+        self.ingest_encoded[1] += time.perf_counter() - started
+        return embeddings
+
+    def encode_seconds_per_chunk(self) -> float:
+        """Average model time per ingested chunk so far (prices the cache's savings)."""
+        chunks, seconds = self.ingest_encoded
+        return seconds / chunks if chunks else 0.0
+
+    # -----------------------------
+    # Persist index & chunks
+    # -----------------------------
+    def save(self):
+        """
+        Writes the changed partitions + BM25 as a new snapshot generation and
+        publishes it atomically (unchanged partitions keep their files);
+        other workers pick it up in maybe_reload(). Searches go on meanwhile:
+        the committed indexes are only read from here on.
+        """
+        with self.write_lock:
+            self._commit()
+            self.chunks.flush()
+            self.vectors.flush()
+            self.meta.flush()
+            generation = max(self.generation, current_generation()) + 1
+            files = {}
+            for name, partition in sorted(self.partitions.items()):
+                if partition.dirty:
+                    path = snapshot_path(partition_file(self.index_path, name), generation)
+                    faiss.write_index(partition.index, path)
+                    partition.file, partition.dirty = path, False
+                files[PARTITION_KEY + name] = partition.file
+            self.lexical.save(snapshot_path(self.lexical_index_path, generation))
+            files["bm25"] = self.lexical.path
+            publish(generation, files)
+            self.generation = generation
+
+    # -----------------------------
+    # Copy-on-write for writers
+    # -----------------------------
+    def _working(self) -> Dict[str, IndexPartition]:
+        """The partitions as the current writer sees them (the committed ones until it changes any)."""
+        if self._draft is None:
+            self._draft, self._copied = dict(self.partitions), set()
+        return self._draft
+
+    def _writable(self, name: str) -> IndexPartition:
+        """The writer's own copy of a partition, created on first use."""
+        partitions = self._working()
+        partition = partitions.get(name)
+        if partition is None:
+            # Starts exact (or fp16); trained types wait until the partition is big enough
+            index = build_index("flat" if needs_corpus(self.index_type) else self.index_type, self.dim)
+            partition = partitions[name] = IndexPartition(name, index)
+        elif name not in self._copied:
+            partition = partitions[name] = partition.copy()
+        self._copied.add(name)
+        return partition
+
+    def _writable_lexical(self) -> BM25Index:
+        if self._draft_lexical is None:
+            self._draft_lexical = self.lexical.copy()
+        return self._draft_lexical
+
+    def _commit(self):
+        """Swaps the writer's copies in: searches see its changes from here on."""
+        if self._draft is None and self._draft_lexical is None:
+            return
+        with self.lock:
+            if self._draft is not None:
+                self.partitions = self._draft
+            if self._draft_lexical is not None:
+                self.lexical = self._draft_lexical
+            self.version += 1
+        self._draft, self._copied, self._draft_lexical = None, set(), None
 
-    # Split text into chunks
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50
-    )
-    chunks = splitter.split_text(text)
+    # -----------------------------
+    # Hot reload of newer snapshots
+    # -----------------------------
+    def maybe_reload(self) -> bool:
+        """
+        Swaps in a newer snapshot published by another worker, reading only
+        the partitions whose file changed. Loading happens before the swap;
+        searches in flight finish on the old indexes first. Skipped while
+        this process is writing (it publishes a newer generation itself).
+        """
+        snapshot = read_generation()
+        if not snapshot or snapshot["generation"] <= self.generation:
+            return False
+        if not self.write_lock.acquire(blocking=False):
+            return False
+        try:
+            if snapshot["generation"] <= self.generation or self._draft is not None or self._draft_lexical is not None:
+                return False
+            started = time.perf_counter()
+            files = snapshot["files"]
+            current = self.partitions
+            partitions, changed = {}, []
+            for name, path in _partition_files(files).items():
+                partition = current.get(name)
+                if partition is None or partition.file != path or partition.dirty:
+                    partition = IndexPartition.load(name, path)
+                    changed.append(partition)
+                partitions[name] = partition
+            lexical = BM25Index(files.get("bm25", self.lexical_index_path))
 
-    # Create embeddings and add to FAISS
-    embeddings = model.encode(chunks)
-    index.add(embeddings)
+            self.chunks.reload()
+            self.vectors.reload()
+            self.meta.reload()
+            live = self.chunks.ids()
+            for partition in changed:
+                partition.tombstones = set(np.setdiff1d(index_ids(partition.index), live).tolist())
+            with self.lock:
+                self.partitions = partitions
+                self.lexical = lexical
+                self.generation = snapshot["generation"]
+                self.version += 1
+        finally:
+            self.write_lock.release()
+        print(
+            f"🔄 Loaded index generation {self.generation} "
+            f"({len(changed)}/{len(partitions)} partitions changed, {time.perf_counter() - started:.2f}s)"
+        )
+        return True
 
-    # Save metadata
-    for i, chunk in enumerate(chunks):
-        metadata[len(metadata)] = {"text": chunk, "source": file_path}
+    def _backfill_vectors(self, index):
+        # Index written before exact vectors were kept: recover them once
+        ids = self.chunks.ids()
+        if is_lossy(index):
+            print("⏳ Re-embedding chunks to recover exact vectors for the quantized index...")
+            vectors = self.encode([self.chunks[i]["text"] for i in ids])
+        else:
+            vectors = index.reconstruct_batch(ids)
+        self.vectors.write(ids, vectors)
+        self.vectors.flush()
+        print(f"📦 Saved exact vectors for {len(ids)} chunks to {self.vectors.path}")
 
-    # Save FAISS index & metadata
-    faiss.write_index(index, VECTOR_STORE_PATH)
-    with open(DOC_METADATA_PATH, "wb") as f:
-        pickle.dump(metadata, f)
+    def next_chunk_id(self) -> int:
+        """
+        High-water mark of allocated ids, never the highest live id: a deleted
+        file's ids may still be in another worker's index generation (and the
+        chunk / vector files are shared), so they must never name new text.
+        """
+        used = max(self.chunks.next_id(), len(self.vectors), len(self.meta)) - 1
+        for partition in (self._draft or self.partitions).values():
+            if partition.tombstones:
+                used = max(used, max(partition.tombstones))
+        return used + 1
 
-    print(f"✅ Added {file_path} to FAISS with {len(chunks)} chunks.")
+    # -----------------------------
+    # Partitions
+    # -----------------------------
+    def _members(self) -> Dict[str, np.ndarray]:
+        """Live chunk ids per partition."""
+        live = self.chunks.ids()
+        unlabelled = self.meta.unlabelled(live)
+        if len(unlabelled):
+            # Chunks stored before partitioning: labelled from their source paths, once
+            count = label_sources(self.meta, ((int(i), self.chunks[int(i)]["source"]) for i in unlabelled))
+            self.meta.flush()
+            print(f"🏷️ Labelled {count} chunks by category / department / date")
+        groups = self.meta.partitions_of(live)
+        groups.pop(None, None)
+        return groups
+
+    # -----------------------------
+    # ANN index (re)build
+    # -----------------------------
+    def rebuild(self, index_type: Optional[str] = None, partitions: Optional[Iterable[str]] = None):
+        """
+        Rebuilds (and trains, if needed) every partition's index as
+        `index_type` — or only the named partitions, leaving the others as
+        they are — keeping chunk ids. Partitions too small for the type stay
+        flat (see choose_index_type). Also drops tombstones left by HNSW
+        deletions, and regroups the chunks if INDEX_PARTITION_BY changed.
+        """
+        index_type = index_type or self.index_type
+        started = time.perf_counter()
+        with self.write_lock:
+            # New indexes are built aside, so searches keep using the old ones until the swap
+            members = self._members()
+            names = list(members) if partitions is None else [n for n in partitions if n in members]
+            working = self._working()
+            built: Dict[str, IndexPartition] = {}
+            for name in names:
+                ids, vectors = members[name], None
+                current = working.get(name)
+                if self.vectors.covers(ids):
+                    # Exact copies, so quantizing never compounds across rebuilds
+                    vectors = self.vectors.read(ids)
+                elif current is not None and not is_lossy(current.index) and len(current) == len(ids):
+                    vectors = current.index.reconstruct_batch(ids)
+                if vectors is None:
+                    # int8 / PQ codes are approximate (or the partition was regrouped) → re-embed the text
+                    vectors = self.encode([self.chunks[i]["text"] for i in ids])
+                    self.vectors.write(ids, vectors)
+                index = build_index(choose_index_type(index_type, len(ids)), self.dim, len(ids))
+                train_index(index, vectors)
+                index.add_with_ids(vectors, ids)
+                built[name] = IndexPartition(name, index)
+
+            if partitions is None:
+                self._draft = built
+            else:
+                working.update(built)
+            self._copied.update(built)
+            self._commit()
+        kinds = ", ".join(f"{name}: {index_kind(p.index)} ({p.index.ntotal})" for name, p in sorted(built.items()))
+        print(f"🔁 Rebuilt FAISS partitions [{kinds}] in {time.perf_counter() - started:.2f}s")
+
+    def rebuild_lexical(self):
+        """Re-tokenizes every stored chunk into a fresh BM25 index."""
+        started = time.perf_counter()
+        with self.write_lock:
+            lexical = BM25Index(self.lexical.path, self.lexical.k1, self.lexical.b, load=False)
+            lexical.add_many((i, self.chunks[i]["text"]) for i in self.chunks)
+            lexical.save()
+            self._draft_lexical = lexical
+            self._commit()
+        print(f"🔤 Built BM25 index ({len(self.lexical)} chunks, {time.perf_counter() - started:.2f}s)")
+
+    def maybe_rebuild(self):
+        """
+        Per partition: switches to the configured ANN type once it has enough
+        vectors to train it, and compacts HNSW indexes with too many tombstones.
+        """
+        upgrade, compact = [], {}
+        for name, partition in self._working().items():
+            kind = index_kind(partition.index)
+            if kind != self.index_type and choose_index_type(self.index_type, len(partition)) == self.index_type:
+                upgrade.append(name)
+            elif partition.tombstones and len(partition.tombstones) > TOMBSTONE_REBUILD_RATIO * partition.index.ntotal:
+                compact.setdefault(kind, []).append(name)
+        if upgrade:
+            self.rebuild(self.index_type, upgrade)
+        for kind, names in compact.items():
+            self.rebuild(kind, names)
+
+    # -----------------------------
+    # Bulk-add many documents
+    # -----------------------------
+    def add_files(
+        self,
+        file_paths: List[str],
+        batch_size: int = EMBED_BATCH_SIZE,
+        workers: int = INGEST_WORKERS,
+        checkpoint_chunks: int = INGEST_CHECKPOINT_CHUNKS,
+        on_checkpoint: Optional[Callable[[Dict[str, Tuple[int, int]]], None]] = None,
+        on_progress: Optional[Callable[[dict], None]] = None,
+    ) -> Tuple[Dict[str, Optional[Tuple[int, int]]], dict]:
+        """
+        Embeds many files in fixed-size encode batches.
+
+        Chunks from all files are streamed into one buffer, encoded `batch_size`
+        at a time, and the index + chunks are written once at the end (or every
+        `checkpoint_chunks` chunks). `on_checkpoint` receives the files whose
+        chunks are fully persisted, so callers can keep their own state in sync.
+        `on_progress` receives the running stats after every extracted file.
+        Each file's chunks go to its partition (see describe_source).
+        Chunk texts embedded before (by this model) come from the embedding
+        cache; stats report how many were reused and the encode time saved.
+
+        Returns ({file_path: (start, end) or None}, stats).
+        """
+        with self.write_lock:
+            started = time.perf_counter()
+            ranges: Dict[str, Optional[Tuple[int, int]]] = {}
+            labels: Dict[str, Tuple[int, int, str]] = {}  # file → (label code, day, partition)
+            next_id = self.next_chunk_id()
+            pending: List[Tuple[int, str, str]] = []  # (chunk_id, text, source)
+            stats = {
+                "files": 0, "files_failed": 0, "failed": {}, "chunks": 0, "batches": 0,
+                "encode_seconds": 0.0, "chunks_encoded": 0, "chunks_cached": 0,
+            }
+            since_checkpoint = 0
+            cache = self.open_embedding_cache()
+
+            def flush(limit: int):
+                nonlocal since_checkpoint
+                while pending and len(pending) >= limit:
+                    batch = pending[:batch_size]
+                    del pending[:batch_size]
+
+                    t0 = time.perf_counter()
+                    embeddings, encoded, cached = self.encode_cached([text for _, text, _ in batch], cache, batch_size)
+                    stats["encode_seconds"] += time.perf_counter() - t0
+                    stats["chunks_encoded"] += encoded
+                    stats["chunks_cached"] += cached
+                    # Into the writer's copies; searches see them from the next checkpoint
+                    ids = np.asarray([chunk_id for chunk_id, _, _ in batch], dtype=np.int64)
+                    codes, days, names = zip(*(labels[source] for _, _, source in batch))
+                    for name in set(names):
+                        mask = np.fromiter((n == name for n in names), dtype=bool, count=len(names))
+                        self._writable(name).add(embeddings[mask], ids[mask])
+                    self.meta.write(ids, codes, days)
+                    self.vectors.write(ids, embeddings)
+                    self.chunks.add_many(batch)
+                    self._writable_lexical().add_many((chunk_id, text) for chunk_id, text, _ in batch)
+                    stats["batches"] += 1
+                    since_checkpoint += len(batch)
+
+                    if checkpoint_chunks and since_checkpoint >= checkpoint_chunks:
+                        checkpoint()
+
+            def checkpoint():
+                nonlocal since_checkpoint
+                self.save()
+                if cache is not None:
+                    cache.flush()
+                since_checkpoint = 0
+                if on_checkpoint:
+                    # Every id below the first pending one is already in the index
+                    persisted_below = pending[0][0] if pending else next_id
+                    on_checkpoint({p: r for p, r in ranges.items() if r and r[1] <= persisted_below})
+
+            try:
+                for file_path, count, chunks, error in _iter_chunks(file_paths, workers):
+                    stats["files"] += 1
+                    if error:
+                        stats["files_failed"] += 1
+                        stats["failed"][file_path] = error
+                    if not count:
+                        if not error:
+                            print(f"⚠️ No text extracted from {file_path}, skipping.")
+                        ranges[file_path] = None
+                        if on_progress:
+                            on_progress({**stats, "failed": dict(stats["failed"])})
+                        continue
+
+                    info = describe_source(file_path)
+                    labels[file_path] = (
+                        self.meta.code(info["category"], info["department"]),
+                        day_of(info["date"]),
+                        partition_name(info["category"], info["department"]),
+                    )
+                    # Streamed in; the file's range is only reported (checkpoint) once all of it was read
+                    start_id = next_id
+                    for chunk in chunks:
+                        pending.append((next_id, chunk, file_path))
+                        next_id += 1
+                        if len(pending) >= batch_size:
+                            flush(batch_size)
+                    ranges[file_path] = (start_id, next_id)
+                    stats["chunks"] += next_id - start_id
+                    if on_progress:
+                        on_progress({**stats, "failed": dict(stats["failed"])})
+
+                flush(1)
+                self.maybe_rebuild()
+                checkpoint()
+            finally:
+                if cache is not None:
+                    cache.close()
+
+            elapsed = time.perf_counter() - started
+            stats["seconds"] = round(elapsed, 3)
+            stats["chunks_per_sec"] = round(stats["chunks"] / elapsed, 1) if elapsed > 0 else 0.0
+            # Repeats of a text within one batch are encoded once but were never cached;
+            # only real cache hits count as re-encoding saved by the cache
+            stats["chunks_deduplicated"] = stats["chunks"] - stats["chunks_encoded"] - stats["chunks_cached"]
+            stats["encode_seconds_saved"] = round(stats["chunks_cached"] * self.encode_seconds_per_chunk(), 3)
+            stats["encode_seconds"] = round(stats["encode_seconds"], 3)
+            if cache is not None:
+                stats["embedding_cache"] = cache.stats()
+            print(
+                f"✅ Bulk ingest: {stats['files']} files, {stats['chunks']} chunks in "
+                f"{stats['seconds']}s ({stats['chunks_per_sec']} chunks/sec)"
+            )
+            if stats["files_failed"]:
+                print(f"⚠️ {stats['files_failed']} files failed to extract: {', '.join(stats['failed'])}")
+            if stats["chunks_cached"]:
+                print(
+                    f"♻️ Embedding cache: {stats['chunks_cached']}/{stats['chunks']} chunks cached, "
+                    f"~{stats['encode_seconds_saved']}s of encoding saved"
+                )
+            return ranges, stats
+
+    # -----------------------------
+    # Remove a document's chunks
+    # -----------------------------
+    def remove(self, start_id: int, end_id: int, save: bool = True):
+        """
+        Removes the chunk id range [start_id, end_id) from its partition and
+        the chunk store. Used when a file is changed or deleted. With
+        save=False the index change waits for the caller's next save().
+        """
+        if end_id <= start_id:
+            return
+        with self.write_lock:
+            ids = np.arange(start_id, end_id, dtype=np.int64)
+            partitions = self._working()
+            for name, group in self.meta.partitions_of(ids).items():
+                if name is None:
+                    # Not labelled (never indexed by this version): look in every partition
+                    for other, partition in list(partitions.items()):
+                        held = np.intersect1d(group, index_ids(partition.index)) if isinstance(partition.index, faiss.IndexIDMap) else group
+                        if len(held):
+                            self._writable(other).remove(held)
+                elif name in partitions:
+                    self._writable(name).remove(group)
+            for name in [name for name, partition in partitions.items() if not len(partition)]:
+                del partitions[name]
+            self.chunks.delete(ids)
+            self._writable_lexical().delete(ids.tolist())
+            if save:
+                self.save()
+
+    # -----------------------------
+    # Search top-K similar chunks
+    # -----------------------------
+    def embed_query(self, query: str) -> np.ndarray:
+        return self.encode([query])[0]
+
+    def _dense_search(
+        self, partitions: Dict[str, IndexPartition], query_embedding: np.ndarray, k: int, filters: Optional[dict] = None
+    ) -> List[Tuple[int, float]]:
+        scanned = list(partitions.values())
+        accept = None
+        if filters is not None:
+            names, whole = plan_partitions(self.meta.labels, filters)
+            scanned = [p for name, p in partitions.items() if name in names]
+            if not whole:
+                candidates = self.meta.select(self.chunks.ids(), filters)
+                if len(candidates) <= FILTER_EXACT_MAX and self.vectors.covers(candidates):
+                    # Few matches (a date range, one department): score just their exact vectors
+                    ids, distances = rescore(query_embedding[0], candidates, self.vectors.read(candidates), k)
+                    return [(int(i), float(d)) for i, d in zip(ids, distances)]
+                accept = lambda ids: self.meta.matches(ids, filters)  # noqa: E731
+
+        hits = []
+        for partition in scanned:
+            ids, distances = partition.search(query_embedding, k, self.vectors, self.rescore, accept)
+            hits.extend((int(i), float(d)) for i, d in zip(ids, distances))
+        return heapq.nsmallest(k, hits, key=lambda hit: hit[1])
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        query_embedding: Optional[np.ndarray] = None,
+        dense_k: Optional[int] = None,
+        lexical_k: Optional[int] = None,
+        filters: Optional[dict] = None,
+    ) -> List[dict]:
+        """
+        Returns the top_k chunks for a query as dicts:
+        {"id", "text", "source", "score", "category", "department", "date"}
+        (score = L2 distance, lower is closer; None for chunks only found lexically).
+
+        With HYBRID_SEARCH, `dense_k` FAISS hits and `lexical_k` BM25 hits are
+        fused by reciprocal rank (each result then also carries "rrf").
+        lexical_k=0 gives plain vector search.
+        `filters` ({"category", "department", "since", "until"}, see
+        normalize_filters) restricts the search to matching chunks; only the
+        partitions that can hold them are scanned. Raises ValueError on bad filters.
+        Pass query_embedding to reuse an embedding the caller already has.
+        """
+        filters = normalize_filters(filters)
+        if lexical_k is None:
+            lexical_k = HYBRID_LEXICAL_K if HYBRID_SEARCH else 0
+        if dense_k is None:
+            dense_k = max(top_k, HYBRID_DENSE_K) if lexical_k else top_k
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).reshape(1, -1)
+        accept = (lambda ids: self.meta.matches(ids, filters)) if filters else None
+
+        with self.lock:
+            # Both from the same commit; writers never change them in place
+            partitions, bm25 = self.partitions, self.lexical
+
+        # Sub-stages of "retrieval" in chat_stage_seconds
+        with span("faiss_search"):
+            dense = self._dense_search(partitions, query_embedding, dense_k, filters) if dense_k else []
+        with span("bm25_search"):
+            lexical = bm25.search(query, lexical_k, accept) if lexical_k else []
+        distances = dict(dense)
+
+        if lexical:
+            ranked = reciprocal_rank_fusion([[i for i, _ in dense], [i for i, _ in lexical]], k=RRF_K)
+        else:
+            ranked = [(i, None) for i, _ in dense]
+
+        results = []
+        for chunk_id, rrf in ranked[:top_k]:
+            chunk = self.chunks.get(chunk_id)
+            if chunk is None:
+                continue
+            result = {"id": chunk_id, "score": distances.get(chunk_id), **chunk, **self.meta.describe(chunk_id)}
+            if rrf is not None:
+                result["rrf"] = rrf
+            results.append(result)
+        return results
+
+    def stats(self) -> dict:
+        with self.lock:
+            partitions = {
+                name: {"type": index_kind(p.index), "vectors": len(p), "tombstones": len(p.tombstones)}
+                for name, p in sorted(self.partitions.items())
+            }
+        return {
+            "generation": self.generation,
+            "partitions": len(partitions),
+            "vectors": sum(p["vectors"] for p in partitions.values()),
+            "tombstones": sum(p["tombstones"] for p in partitions.values()),
+            "by_partition": partitions,
+        }
 
 
 # -----------------------------
-# Retrieve top-K similar chunks
+# ✅ Process-wide instance
 # -----------------------------
+_store: Optional[VectorStore] = None
+_store_lock = threading.Lock()
+
+
+def get_vector_store() -> VectorStore:
+    """
+    Returns the process-wide VectorStore, creating it on first use.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VectorStore()
+    return _store
+
+
+def loaded_vector_store() -> Optional[VectorStore]:
+    """The process-wide VectorStore if it has been created, without creating it."""
+    return _store
+
+
+# -----------------------------
+# Module-level helpers (kept for existing callers)
+# -----------------------------
+def save_index():
+    get_vector_store().save()
+
+
+def add_files_to_faiss(file_paths: List[str], **kwargs) -> Tuple[Dict[str, Optional[Tuple[int, int]]], dict]:
+    return get_vector_store().add_files(file_paths, **kwargs)
+
+
+def add_to_faiss(file_path: str) -> Optional[Tuple[int, int]]:
+    """
+    Embeds a file and adds its chunks to FAISS.
+    Returns the (start, end) chunk id range (end exclusive), or None if
+    no text could be extracted.
+    """
+    ranges, _ = add_files_to_faiss([file_path], workers=0)
+    return ranges[file_path]
+
+
+def remove_from_faiss(start_id: int, end_id: int, save: bool = True):
+    get_vector_store().remove(start_id, end_id, save=save)
+
+
 def retrieve(query: str, top_k: int = 5):
-    query_embedding = model.encode([query])
-    D, I = index.search(query_embedding, top_k)
-    results = []
-    for i in I[0]:
-        if i in metadata:
-            results.append((metadata[i]["text"], metadata[i]["source"]))
-    return results
+    return [(c["text"], c["source"]) for c in get_vector_store().search(query, top_k)]
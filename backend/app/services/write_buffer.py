@@ -0,0 +1,124 @@
+# app/services/write_buffer.py
+
+import os
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Optional
+
+# -----------------------------
+# Settings
+# -----------------------------
+MONGO_FLUSH_SIZE = int(os.getenv("MONGO_FLUSH_SIZE", "200"))            # documents that trigger a flush
+MONGO_FLUSH_INTERVAL = float(os.getenv("MONGO_FLUSH_INTERVAL", "1.0"))  # seconds between flushes otherwise
+MONGO_BUFFER_MAX = int(os.getenv("MONGO_BUFFER_MAX", "20000"))          # per collection; oldest dropped beyond
+
+
+# -----------------------------
+# ✅ Buffered bulk writer
+# -----------------------------
+class BufferedWriter:
+    """
+    Fire-and-forget inserts for logging-type documents (chat turns, query logs).
+
+    add() only appends to an in-memory deque, so the request path never waits
+    on MongoDB. A background task writes each collection's pending documents
+    with one insert_many every `interval` seconds, or as soon as `flush_size`
+    documents are waiting. If MongoDB is unreachable, documents stay buffered
+    (up to `max_buffered` per collection, oldest dropped first) and are
+    retried on the next flush.
+    """
+
+    def __init__(
+        self,
+        flush_size: int = MONGO_FLUSH_SIZE,
+        interval: float = MONGO_FLUSH_INTERVAL,
+        max_buffered: int = MONGO_BUFFER_MAX,
+    ):
+        self.flush_size = max(1, flush_size)
+        self.interval = interval
+        self.max_buffered = max_buffered
+        self._pending: Dict[str, Deque[dict]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.written = self.dropped = self.flushes = self.errors = 0
+
+    def start(self):
+        """Starts the flush task on the running loop (app startup)."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    def add(self, collection: str, document: dict):
+        """Queues one document; a no-op until start() (scripts, tests without a DB)."""
+        if self._task is None:
+            return
+        pending = self._pending.get(collection)
+        if pending is None:
+            pending = self._pending[collection] = deque(maxlen=self.max_buffered)
+        if len(pending) == self.max_buffered:
+            self.dropped += 1  # deque drops the oldest
+        pending.append(document)
+        if len(pending) >= self.flush_size and not self._wakeup.is_set():
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        from pymongo.errors import BulkWriteError
+        from app.db.connection import get_collection
+
+        for name, pending in list(self._pending.items()):
+            if not pending:
+                continue
+            batch = list(pending)
+            pending.clear()
+            try:
+                await get_collection(name).insert_many(batch, ordered=False)
+                self.written += len(batch)
+                self.flushes += 1
+            except BulkWriteError as e:
+                # The server processed the batch; retrying would only re-send duplicates
+                self.errors += 1
+                self.written += e.details.get("nInserted", 0)
+                print(f"❌ Buffered insert into {name}: {len(e.details.get('writeErrors', []))} documents rejected")
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Buffered insert into {name} failed ({len(batch)} documents kept): {e}")
+                # Back in front of anything added meanwhile; the deque's maxlen still applies
+                room = self.max_buffered - len(pending)
+                self.dropped += max(0, len(batch) - room)
+                if room > 0:
+                    pending.extendleft(reversed(batch[-room:]))
+                break  # DB is likely down; the rest waits for the next flush
+
+    async def close(self):
+        """Stops the flush task and writes what is left (app shutdown)."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": sum(len(p) for p in self._pending.values()),
+            "written": self.written,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "dropped": self.dropped,
+        }
+
+
+write_buffer = BufferedWriter()
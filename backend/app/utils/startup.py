@@ -0,0 +1,73 @@
+# app/utils/startup.py
+
+import os
+import time
+import asyncio
+from contextlib import contextmanager
+
+# -----------------------------------------------------------
+# ✅ Startup timing & readiness state
+# -----------------------------------------------------------
+# Set PRELOAD_MODELS=0 to skip the warm-up and load models on first use.
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "1") == "1"
+
+# stage → seconds, in the order the stages ran
+STARTUP_TIMINGS: dict = {}
+
+# "starting" → "warming_up" → "ready" (or "failed")
+READINESS = {"status": "starting", "error": None}
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Records how long a startup stage took in STARTUP_TIMINGS.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[stage] = round(time.perf_counter() - started, 3)
+
+
+def is_ready() -> bool:
+    return READINESS["status"] == "ready"
+
+
+# -----------------------------------------------------------
+# ✅ Model warm-up (runs after uvicorn has bound the port)
+# -----------------------------------------------------------
+def _load_models():
+    # Imported here so importing app.main stays cheap
+    from app.services.vector_service import get_vector_store
+    from app.services.rag_service import count_tokens
+
+    with timed("vector_store_load"):
+        store = get_vector_store()
+    with timed("first_encode"):
+        store.encode(["warm up"])
+    with timed("prompt_tokenizer"):
+        count_tokens("warm up")
+
+
+async def warm_up():
+    """
+    Loads the embedding model and FAISS index off the event loop,
+    so health probes and admin routes answer while it runs.
+    """
+    if not PRELOAD_MODELS:
+        READINESS["status"] = "ready"  # models load lazily on first request
+        return
+
+    READINESS["status"] = "warming_up"
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(_load_models)
+        READINESS["status"] = "ready"
+        print(f"✅ Models warmed up in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        READINESS["status"] = "failed"
+        READINESS["error"] = str(e)
+        print(f"❌ Model warm-up failed: {e}")
+    finally:
+        STARTUP_TIMINGS["warm_up_total"] = round(time.perf_counter() - started, 3)
@@ -0,0 +1,20 @@
+# tests/conftest.py
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app.db import connection, queries
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """An empty in-memory database behind get_collection()."""
+    db = AsyncMongoMockClient()["test_db"]
+    monkeypatch.setattr(connection, "db", db)
+    return db
+
+
+@pytest.fixture(autouse=True)
+def fresh_sessions(monkeypatch):
+    """Every test starts without remembered conversation turns."""
+    monkeypatch.setattr(queries, "_recent", type(queries._recent)())
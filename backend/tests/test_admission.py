@@ -0,0 +1,106 @@
+# tests/test_admission.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import admission as admission_module
+from app.services.admission import FAST, FULL, AdmissionController, Gate, Overloaded, RateLimiter, client_id
+
+
+def test_gate_serves_fast_waiters_before_normal_traffic():
+    async def run():
+        gate = Gate("test", limit=1, queue_size=10, timeout=5)
+        await gate.acquire()
+        served = []
+
+        async def wait(name, priority):
+            await gate.acquire(priority)
+            served.append(name)
+
+        tasks = [asyncio.create_task(wait("full-1", FULL)), asyncio.create_task(wait("full-2", FULL))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(wait("fast", FAST)))  # queued last
+        await asyncio.sleep(0)
+        for _ in range(3):
+            gate.release()  # the slot passes straight to the next waiter
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        return served, gate.active
+
+    served, active = asyncio.run(run())
+    assert served == ["fast", "full-1", "full-2"]
+    assert active == 1  # the last waiter still holds its slot
+
+
+def test_gate_sheds_when_the_queue_is_full_or_the_wait_too_long():
+    async def run():
+        gate = Gate("test", limit=1, queue_size=1, timeout=0.05)
+        await gate.acquire()
+        waiting = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await gate.acquire()
+        with pytest.raises(Overloaded) as timed_out:
+            await waiting
+        return gate, full.value, timed_out.value
+
+    gate, full, timed_out = asyncio.run(run())
+    assert (full.status, timed_out.status) == (503, 503)
+    assert "queue full" in full.detail and "queue wait" in timed_out.detail
+    assert full.retry_after >= 1
+    stats = gate.stats()
+    assert (stats["rejected_queue_full"], stats["rejected_timeout"], stats["queued"]) == (1, 1, 0)
+
+
+def test_token_bucket_allows_a_burst_then_refills():
+    limiter = RateLimiter(per_minute=60, burst=3)
+    for _ in range(3):
+        limiter.check("10.0.0.1")
+    with pytest.raises(Overloaded) as limited:
+        limiter.check("10.0.0.1")
+    assert limited.value.status == 429 and limited.value.retry_after == 1
+    limiter.check("10.0.0.2")  # buckets are per client
+
+    limiter._buckets["10.0.0.1"][1] -= 2  # two seconds pass: two tokens at one per second
+    limiter.check("10.0.0.1")
+    limiter.check("10.0.0.1")
+    with pytest.raises(Overloaded):
+        limiter.check("10.0.0.1")
+    assert limiter.rejected == 2
+
+
+def test_rate_limiter_forgets_the_least_recently_seen_clients():
+    limiter = RateLimiter(per_minute=60, burst=1, max_clients=2)
+    for client in ("a", "b", "c"):
+        limiter.check(client)
+    assert len(limiter) == 2
+    limiter.check("a")  # dropped, so it starts over with a full bucket
+
+
+def test_rate_limit_zero_is_off():
+    limiter = RateLimiter(per_minute=0, burst=1)
+    for _ in range(100):
+        limiter.check("a")
+
+
+def test_leave_frees_the_slot_once():
+    async def run():
+        controller = AdmissionController()
+        controller.requests = Gate("admission", limit=1, queue_size=0, timeout=1)
+        leave = await controller.enter("a")
+        with pytest.raises(Overloaded):
+            await controller.enter("b")
+        leave()
+        leave()
+        return controller.requests.active
+
+    assert asyncio.run(run()) == 0
+
+
+def test_client_id(monkeypatch):
+    request = SimpleNamespace(headers={"x-forwarded-for": "203.0.113.7, 10.0.0.1"}, client=SimpleNamespace(host="10.0.0.1"))
+    assert client_id(request) == "10.0.0.1"
+    monkeypatch.setattr(admission_module, "TRUST_FORWARDED_FOR", True)
+    assert client_id(request) == "203.0.113.7"
@@ -0,0 +1,32 @@
+# tests/test_chat_routes.py
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import chat_routes
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(chat_routes, "is_ready", lambda: True)
+    admitted = []
+
+    async def enter(client, priority):
+        admitted.append(client)
+        return lambda: None
+
+    monkeypatch.setattr(chat_routes.admission, "enter", enter)
+    app = FastAPI()
+    app.include_router(chat_routes.router, prefix="/api/chat")
+    client = TestClient(app)
+    client.admitted = admitted
+    return client
+
+
+@pytest.mark.parametrize("path", ["/api/chat/", "/api/chat/stream"])
+def test_unsupported_language_is_a_400_before_admission(client, path):
+    response = client.post(path, json={"user_message": "what is the hostel fee", "language": "fr"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unsupported language code: fr"
+    assert client.admitted == []  # no admission slot was taken
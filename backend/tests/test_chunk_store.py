@@ -0,0 +1,82 @@
+# tests/test_chunk_store.py
+
+import os
+
+import pytest
+
+from app.services.chunk_store import ChunkStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ChunkStore(str(tmp_path / "chunks.dat"), str(tmp_path / "chunks.idx"))
+    yield store
+    store.close()
+
+
+def records(ids) -> list:
+    return [(i, f"छात्रावास notice {i}", f"circulars/{i}.pdf") for i in ids]
+
+
+def test_reads_back_what_was_added(store):
+    store.add_many(records(range(5)))
+    assert len(store) == 5 and store.max_id() == 4
+    assert store[3] == {"text": "छात्रावास notice 3", "source": "circulars/3.pdf"}
+    assert store.get(9) is None and 9 not in store
+    with pytest.raises(KeyError):
+        store[9]
+
+
+def test_re_adding_an_id_replaces_it(store):
+    store.add_many(records(range(3)))
+    store.add_many([(1, "revised", "circulars/1.pdf")])
+    assert len(store) == 3
+    assert store[1]["text"] == "revised"
+
+
+def test_deleted_ids_are_not_handed_out_again(store):
+    store.add_many(records(range(5)))
+    store.delete([3, 4])
+    assert list(store) == [0, 1, 2]
+    assert store.max_id() == 2
+    assert store.next_id() == 5  # rows of deleted chunks stay allocated
+
+
+def test_compaction_keeps_ids_and_drops_deleted_records(store):
+    store.add_many(records(range(10)))
+    size = os.path.getsize(store.data_path)
+    store.delete(range(0, 10, 2))
+    store.compact()
+
+    assert os.path.getsize(store.data_path) < size
+    assert store.ids().tolist() == [1, 3, 5, 7, 9]
+    assert all(store[i] == {"text": f"छात्रावास notice {i}", "source": f"circulars/{i}.pdf"} for i in store)
+    assert 4 not in store and store.next_id() == 10
+
+
+def test_flush_compacts_once_most_of_the_file_is_garbage(store):
+    store.add_many(records(range(10)))
+    size = os.path.getsize(store.data_path)
+    store.delete(range(4))
+    store.flush()
+    assert os.path.getsize(store.data_path) == size  # 40% garbage: left alone
+    store.delete(range(4, 8))
+    store.flush()
+    assert os.path.getsize(store.data_path) < size
+    assert store.ids().tolist() == [8, 9]
+
+
+def test_another_process_sees_appends_and_compaction(store):
+    store.add_many(records(range(4)))
+    store.flush()
+    reader = ChunkStore(store.data_path, store.index_path)
+    try:
+        store.add_many(records([4]))
+        assert reader[4]["text"] == "छात्रावास notice 4"  # remapped on demand
+
+        store.delete([0, 1, 2])
+        store.compact()
+        reader.reload()
+        assert reader.ids().tolist() == [3, 4] and reader[3]["text"] == "छात्रावास notice 3"
+    finally:
+        reader.close()
@@ -0,0 +1,103 @@
+# tests/test_extraction_service.py
+
+import glob
+import json
+import os
+
+import pytest
+from openpyxl import Workbook
+
+from app.services import extraction_service, vector_service
+from app.services.extraction_service import extract_chunks
+from app.services.vector_service import _iter_chunks
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_service, "INGEST_SPOOL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def spools(spool_dir) -> list:
+    return [os.path.basename(p) for p in glob.glob(str(spool_dir / "ingest-*" / "*.jsonl"))]
+
+
+def documents(folder) -> list:
+    """One file per extraction path, plus an empty and a broken one."""
+    paths = {name: str(folder / name) for name in ["notice.txt", "faq.json", "fees.xlsx", "empty.txt", "broken.json"]}
+    with open(paths["notice.txt"], "w", encoding="utf-8") as f:
+        f.write(" ".join(f"Hostel fee notice line {i}." for i in range(600)))
+    with open(paths["faq.json"], "w", encoding="utf-8") as f:
+        json.dump([{"question": f"Question {i}?", "answer": "Answer " * (i * 40 + 1)} for i in range(5)], f)
+    workbook = Workbook()
+    workbook.active.append(["Course", "Fee"])
+    for i in range(20):
+        workbook.active.append([f"Course {i}", 50000.0 + i])
+    workbook.save(paths["fees.xlsx"])
+    open(paths["empty.txt"], "w").close()
+    with open(paths["broken.json"], "w") as f:
+        f.write("{not json")
+    return list(paths.values())
+
+
+def test_a_missing_parser_is_not_taken_for_a_broken_file(tmp_path, monkeypatch):
+    path = tmp_path / "notice.txt"
+    path.write_text("Hostel fee notice")
+
+    def missing(_):
+        raise ModuleNotFoundError("No module named 'PyPDF2'")
+
+    monkeypatch.setattr(extraction_service, "iter_text", missing)
+    with pytest.raises(ModuleNotFoundError):
+        extract_chunks(str(path), str(tmp_path / "0.jsonl"))
+
+
+def test_parallel_and_serial_extraction_give_the_same_chunks(tmp_path, spool_dir):
+    paths = documents(tmp_path)
+    serial = [(f, n, list(chunks), error) for f, n, chunks, error in _iter_chunks(paths, workers=0)]
+    parallel = [(f, n, list(chunks), error) for f, n, chunks, error in _iter_chunks(paths, workers=2)]
+    assert parallel == serial
+
+    counts = {os.path.basename(f): n for f, n, _, _ in serial}
+    assert counts["notice.txt"] > 1 and counts["faq.json"] > 5 and counts["fees.xlsx"] == 20
+    assert counts["empty.txt"] == 0 and counts["broken.json"] == 0
+    errors = {os.path.basename(f): error for f, _, _, error in serial}
+    assert errors["empty.txt"] is None and errors["broken.json"].startswith("JSONDecodeError")
+    assert "Course: Course 0; Fee: 50000" in serial[2][2]
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs a named pipe")
+def test_a_file_over_the_time_limit_is_skipped_in_the_worker(tmp_path, spool_dir):
+    stuck = str(tmp_path / "stuck.txt")
+    os.mkfifo(stuck)  # opening it blocks until a writer shows up, which never happens
+    fine = str(tmp_path / "fine.txt")
+    with open(fine, "w") as f:
+        f.write("Hostel fee notice")
+
+    results = []
+    for file_path, count, chunks, error in _iter_chunks([stuck, fine], workers=1, timeout=1):
+        results.append((file_path, count, list(chunks), error))
+        if file_path == stuck:
+            assert "0.jsonl" not in spools(spool_dir)
+    assert results[0][1:] == (0, [], "exceeded 1s")
+    assert results[1][1:] == (1, ["Hostel fee notice"], None)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="RLIMIT_AS is POSIX only")
+def test_a_file_over_the_memory_cap_is_skipped_in_the_worker(tmp_path, spool_dir):
+    # ~50 MB of JSON that parses to ~10M int objects, far past a 256 MB cap
+    huge = str(tmp_path / "huge.json")
+    with open(huge, "w") as f:
+        f.write("[" + "1000," * 10_000_000 + "1000]")
+    fine = str(tmp_path / "fine.txt")
+    with open(fine, "w") as f:
+        f.write("Hostel fee notice")
+
+    results = []
+    for file_path, count, chunks, error in _iter_chunks([huge, fine], workers=1, memory_mb=256):
+        results.append((file_path, count, list(chunks), error))
+        if file_path == huge:
+            assert "0.jsonl" not in spools(spool_dir)
+    assert results[0][1] == 0 and "memory" in results[0][3]
+    # The same worker goes on with the next file
+    assert results[1][1:] == (1, ["Hostel fee notice"], None)
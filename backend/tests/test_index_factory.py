@@ -0,0 +1,72 @@
+# tests/test_index_factory.py
+
+import faiss
+import numpy as np
+import pytest
+
+from app.services import index_factory
+from app.services.index_factory import (
+    INDEX_TYPES, build_index, choose_index_type, index_ids, index_kind, is_lossy, is_quantized, rescore,
+    set_search_params, supports_remove, train_index,
+)
+
+DIM = 16
+
+
+@pytest.fixture(autouse=True)
+def small_codes(monkeypatch):
+    monkeypatch.setattr(index_factory, "FAISS_PQ_M", 4)  # must divide DIM
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).standard_normal((2000, DIM)).astype(np.float32)
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_every_mode_builds_searches_and_reports_its_kind(index_type, vectors):
+    ids = np.arange(len(vectors), dtype=np.int64) + 1000
+    index = build_index(index_type, DIM, len(vectors))
+    train_index(index, vectors)
+    index.add_with_ids(vectors, ids)
+
+    assert index_kind(index) == index_type
+    assert index.ntotal == len(vectors)
+    set_search_params(index, nprobe=10_000, ef_search=128)  # nprobe is clamped to the list count
+    _, found = index.search(vectors[:20], 10)
+    # Approximate modes may miss a few; every mode finds most vectors as their own neighbour
+    assert np.mean([own in row for own, row in zip(ids[:20], found)]) >= 0.7
+
+
+def test_mode_flags():
+    assert [t for t in INDEX_TYPES if not supports_remove(build_index(t, DIM, 2000))] == ["hnsw"]
+    assert [t for t in INDEX_TYPES if is_lossy(build_index(t, DIM, 2000))] == ["flat_int8", "flat_pq", "ivf_pq"]
+    assert [t for t in INDEX_TYPES if is_quantized(build_index(t, DIM, 2000))] == [
+        "flat_fp16", "flat_int8", "flat_pq", "ivf_pq",
+    ]
+    with pytest.raises(ValueError, match="Unknown FAISS index type"):
+        build_index("annoy", DIM)
+
+
+def test_small_corpora_stay_flat(monkeypatch):
+    monkeypatch.setattr(index_factory, "FAISS_ANN_MIN_VECTORS", 10_000)
+    assert choose_index_type("hnsw", 9_999) == "flat"
+    assert choose_index_type("hnsw", 10_000) == "hnsw"
+    assert choose_index_type("flat_fp16", 10) == "flat_fp16"  # needs no training
+
+
+def test_ivf_lists_keep_enough_training_points():
+    index = build_index("ivf_flat", DIM, 2000)
+    assert 2000 / faiss.extract_index_ivf(index).nlist >= 39
+
+
+def test_index_ids_and_exact_rescore(vectors):
+    index = build_index("flat", DIM)
+    ids = np.array([7, 3, 42], dtype=np.int64)
+    index.add_with_ids(vectors[:3], ids)
+    assert sorted(index_ids(index).tolist()) == [3, 7, 42]
+
+    query = vectors[1] + 0.01
+    best, distances = rescore(query, ids, vectors[:3], 2)
+    assert best[0] == 3 and distances[0] <= distances[1]
+    assert len(best) == 2
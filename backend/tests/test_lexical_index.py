@@ -0,0 +1,156 @@
+# tests/test_lexical_index.py
+
+import math
+import random
+import time
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from app.services import lexical_index
+from app.services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+WORDS = "admission fee hostel library semester exam scholarship course timetable canteen transport result".split()
+
+
+@pytest.mark.parametrize("text, terms", [
+    ("Hostel fee for CS-101?", ["hostel", "fee", "cs-101", "cs", "101"]),
+    ("₹50,000 by 12/03/2024", ["50,000", "50000", "50", "000", "12/03/2024", "12", "03", "2024"]),
+    # Vowel signs and viramas stay inside the word; the danda ends it
+    ("छात्रावास शुल्क क्या है।", ["छात्रावास", "शुल्क", "क्या", "है"]),
+    ("விடுதி கட்டணம்", ["விடுதி", "கட்டணம்"]),
+])
+def test_tokenize(text, terms):
+    assert tokenize(text) == terms
+
+
+def corpus(size: int = 4000, seed: int = 0) -> list:
+    """Random short chunks; every 7th one is a short hostel-fee notice, so those two terms have a clear top."""
+    rng = random.Random(seed)
+    docs = []
+    for i in range(size):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 30))]
+        if i % 7 == 0:
+            words = ["hostel", "fee", "hostel"] + words[:3]
+        docs.append((i, " ".join(words)))
+    return docs
+
+
+def full_scan(index: BM25Index, query: str, top_k: int, accept=None) -> list:
+    """Reference BM25: every posting of every query term, summed in Python."""
+    n = len(index.doc_len)
+    average = index.total_len / n
+    totals = defaultdict(float)
+    for term in set(tokenize(query)):
+        if term not in index.postings:
+            continue
+        ids, tfs = index.postings[term]
+        idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+        for chunk_id, tf in zip(ids.tolist(), tfs.tolist()):
+            norm = index.k1 * (1 - index.b + index.b * index.doc_len[chunk_id] / average)
+            totals[chunk_id] += idf * tf * (index.k1 + 1) / (tf + norm)
+    if accept is not None:
+        totals = {i: s for i, s in totals.items() if accept(np.array([i]))[0]}
+    return sorted(totals.values(), reverse=True)[:top_k]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25.pkl"), load=False)
+    index.max_postings = 0  # exact scores; the cap is tested on its own
+    index.add_many(corpus())
+    return index
+
+
+def scores(results: list) -> list:
+    return [round(score, 9) for _, score in results]
+
+
+@pytest.mark.parametrize("top_k", [1, 5, 20, 100])
+def test_search_matches_a_full_scan(index, monkeypatch, top_k):
+    pruned = []
+    original = lexical_index._pruned_top
+    monkeypatch.setattr(lexical_index, "_pruned_top", lambda *a: pruned.append(original(*a)) or pruned[-1])
+    for query in ["hostel fee", "What is the hostel fee?", "library", "exam result canteen", "fee library course transport"]:
+        assert scores(index.search(query, top_k)) == [round(s, 9) for s in full_scan(index, query, top_k)], query
+    # The hostel-fee notices settle the top-k from the heads of the two lists
+    assert any(result is not None for result in pruned)
+
+
+def test_filter_is_applied_before_the_top_k(index):
+    odd = lambda ids: ids % 2 == 1  # every hostel-fee notice (i % 7 == 0) with an even id is excluded
+    results = index.search("hostel fee", 10, odd)
+    assert all(chunk_id % 2 == 1 for chunk_id, _ in results)
+    assert scores(results) == [round(s, 9) for s in full_scan(index, "hostel fee", 10, odd)]
+
+
+def test_cost_does_not_depend_on_the_highest_chunk_id(tmp_path):
+    # A dense per-id array would need terabytes here
+    index = BM25Index(str(tmp_path / "bm25.pkl"), load=False)
+    base = 10**12
+    index.add_many((base + i * 1000, text) for i, text in corpus(300))
+    results = index.search("hostel fee library", 5)
+    assert len(results) == 5 and all(chunk_id >= base for chunk_id, _ in results)
+    assert scores(results) == [round(s, 9) for s in full_scan(index, "hostel fee library", 5)]
+
+
+def test_copy_shares_postings_until_a_term_changes(index):
+    before = index.search("hostel fee", 5)
+    copy = index.copy()
+    copy.add_many([(10_000, "hostel fee waiver notice")])
+    copy.delete([0, 7])
+
+    touched = set(index.doc_terms[0]) | set(index.doc_terms[7]) | {"hostel", "fee", "waiver", "notice"}
+    untouched = next(term for term in index.postings if term not in touched)
+    assert copy.postings[untouched] is index.postings[untouched]  # shared, not copied
+    assert copy.postings["hostel"] is not index.postings["hostel"]
+    assert 10_000 in copy and 0 not in copy
+    # The original, which searches may still hold, is unchanged
+    assert 10_000 not in index and 0 in index
+    assert index.search("hostel fee", 5) == before
+    assert 10_000 not in index.postings["hostel"][0].tolist()
+    assert {0, 7} <= set(index.postings["hostel"][0].tolist())
+
+
+def test_postings_stay_sorted_when_an_old_chunk_is_re_added(index):
+    index.add_many([(3, "hostel fee revised")])
+    ids, _ = index.postings["hostel"]
+    assert (np.diff(ids) > 0).all() and 3 in ids.tolist()
+    assert index.doc_terms[3] == ("hostel", "fee", "revised")
+
+
+def test_cached_short_query_is_well_under_a_millisecond(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25.pkl"), load=False)
+    index.add_many(corpus(50_000, seed=1))
+    index.search("hostel fee", 5)  # fills the per-term score cache
+    timings = []
+    for _ in range(50):
+        started = time.perf_counter()
+        index.search("hostel fee", 5)
+        timings.append(time.perf_counter() - started)
+    assert sorted(timings)[len(timings) // 2] < 0.001
+
+
+def test_delete_drops_emptied_postings(index):
+    index.add_many([(10_000, "hostel waiver notice")])
+    index.delete([10_000])
+    assert "waiver" not in index.postings and "notice" not in index.postings
+    assert 10_000 not in index.postings["hostel"][0].tolist()
+    assert index.total_len == sum(index.doc_len.values())
+
+
+def test_save_round_trips_and_a_stale_tokenizer_is_left_to_rebuild(index, tmp_path, monkeypatch):
+    index.save()
+    loaded = BM25Index(index.path)
+    assert len(loaded) == len(index)
+    assert loaded.search("hostel fee", 5) == index.search("hostel fee", 5)
+
+    monkeypatch.setattr(lexical_index, "TOKENIZER_VERSION", lexical_index.TOKENIZER_VERSION + 1)
+    assert len(BM25Index(index.path)) == 0  # VectorStore rebuilds it from the chunk store
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]])
+    assert [chunk_id for chunk_id, _ in fused][:2] == [1, 3]
+    assert {chunk_id for chunk_id, _ in fused} == {1, 2, 3, 4}
@@ -0,0 +1,137 @@
+# tests/test_llm_service.py
+
+import json
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import llm_service
+from app.services.llm_service import FALLBACK_REPLY, LLM_MAX_RETRIES, LLMError
+
+
+def sse(*tokens: str) -> bytes:
+    events = [f"data: {json.dumps({'token': {'text': t, 'special': False}})}\n\n" for t in tokens]
+    return ("".join(events) + "data: [DONE]\n\n").encode("utf-8")
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """Sends `chunks`, then the connection drops."""
+
+    def __init__(self, *chunks: bytes):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+        raise httpx.ReadError("connection reset by peer")
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """
+    Routes the shared client to `llm.replies` (one per request, the last one
+    repeated) and records the backoff attempts instead of sleeping.
+    """
+
+    class Fake:
+        replies = []
+        requests = 0
+        backoffs = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        reply = Fake.replies[min(Fake.requests, len(Fake.replies) - 1)]
+        Fake.requests += 1
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def backoff(attempt: int) -> float:
+        Fake.backoffs.append(attempt)
+        return 0.0
+
+    monkeypatch.setattr(llm_service, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(llm_service, "_backoff", backoff)
+    return Fake
+
+
+def generated(text: str) -> httpx.Response:
+    return httpx.Response(200, json=[{"generated_text": text}])
+
+
+def stream(prompt: str = "q") -> list:
+    async def run():
+        return [token async for token in llm_service.stream_response(prompt)]
+
+    return asyncio.run(run())
+
+
+def test_backoff_doubles_with_jitter(monkeypatch):
+    monkeypatch.setattr(llm_service, "LLM_BACKOFF_BASE", 0.5)
+    for attempt, base in enumerate([0.5, 1.0, 2.0]):
+        for _ in range(20):
+            assert base <= llm_service._backoff(attempt) <= base * 1.25
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retryable_status_is_retried(llm, status):
+    llm.replies = [httpx.Response(status, text="busy"), generated(" Fees are due in June. ")]
+    assert asyncio.run(llm_service.generate_response("q")) == "Fees are due in June."
+    assert llm.requests == 2 and llm.backoffs == [0]
+
+
+def test_transport_error_is_retried(llm):
+    llm.replies = [httpx.ConnectError("refused"), httpx.ConnectError("refused"), generated("ok")]
+    assert asyncio.run(llm_service.generate_response("q")) == "ok"
+    assert llm.backoffs == [0, 1]
+
+
+def test_client_error_is_not_retried(llm):
+    llm.replies = [httpx.Response(400, text="bad input"), generated("never sent")]
+    assert asyncio.run(llm_service.generate_response("q")) == FALLBACK_REPLY
+    assert llm.requests == 1 and llm.backoffs == []
+
+
+def test_gives_up_after_max_retries(llm):
+    llm.replies = [httpx.Response(503, text="overloaded")]
+    with pytest.raises(LLMError, match="503"):
+        asyncio.run(llm_service._call_hf_api("q"))
+    assert llm.requests == LLM_MAX_RETRIES + 1
+    assert llm.backoffs == list(range(LLM_MAX_RETRIES))
+
+
+def test_stream_yields_tokens(llm):
+    llm.replies = [httpx.Response(200, headers={"content-type": "text/event-stream"}, content=sse("The ", "fee"))]
+    assert stream() == ["The ", "fee"]
+
+
+def test_stream_without_sse_yields_the_whole_reply(llm):
+    llm.replies = [generated(" Whole reply ")]
+    assert stream() == ["Whole reply"]
+
+
+def test_stream_retries_before_the_first_token(llm):
+    llm.replies = [
+        httpx.Response(429, text="slow down"),
+        httpx.ConnectError("refused"),
+        httpx.Response(200, headers={"content-type": "text/event-stream"}, content=sse("ok")),
+    ]
+    assert stream() == ["ok"]
+    assert llm.requests == 3 and llm.backoffs == [0, 1]
+
+
+def test_stream_broken_mid_reply_is_not_retried(llm):
+    broken = httpx.Response(200, headers={"content-type": "text/event-stream"},
+                            stream=BrokenStream(sse("Hostel ", "fees ")[:-len("data: [DONE]\n\n")]))
+    llm.replies = [broken, httpx.Response(200, headers={"content-type": "text/event-stream"}, content=sse("again"))]
+    received = []
+
+    async def run():
+        async for token in llm_service.stream_response("q"):
+            received.append(token)
+
+    with pytest.raises(LLMError, match="mid-reply"):
+        asyncio.run(run())
+    # The client already has these; a retry would append a second answer
+    assert received == ["Hostel ", "fees "]
+    assert llm.requests == 1 and llm.backoffs == []
@@ -0,0 +1,27 @@
+# tests/test_metrics.py
+
+from app.services.metrics import render_metrics
+
+
+def series(text: str) -> dict:
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if line and not line.startswith("#"))
+
+
+def test_counters_get_a_total_suffix_and_the_rest_stay_gauges():
+    text = render_metrics(
+        {"answer_cache": {"hits": 12, "misses": 3, "hit_rate": 0.8, "size": 40}},
+        {"answer_cache": ("hits", "misses")},
+    )
+    assert "# TYPE answer_cache_hits_total counter" in text
+    assert "# TYPE answer_cache_misses_total counter" in text
+    assert "# TYPE answer_cache_hit_rate gauge" in text
+    assert "# TYPE answer_cache_size gauge" in text
+    values = series(text)
+    assert values["answer_cache_hits_total"] == "12" and values["answer_cache_size"] == "40"
+    assert "answer_cache_hits" not in values
+
+
+def test_non_numeric_values_are_skipped():
+    text = render_metrics({"vector_index": {"generation": 4, "by_partition": {"general": {}}, "stale": True}})
+    values = {name: v for name, v in series(text).items() if not name.startswith("chat_")}
+    assert values == {"vector_index_generation": "4"}
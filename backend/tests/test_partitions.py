@@ -0,0 +1,97 @@
+# tests/test_partitions.py
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.partitions import (
+    NO_DATE, ChunkMeta, day_of, describe_source, normalize_filters, partition_file, partition_name, plan_partitions,
+)
+
+
+@pytest.fixture
+def meta(tmp_path):
+    meta = ChunkMeta(str(tmp_path / "chunk_meta.bin"), str(tmp_path / "chunk_labels.json"))
+    yield meta
+    meta.close()
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("college_data/circulars/cse/2024-03-15 exam notice.pdf", ("circulars", "cse", date(2024, 3, 15))),
+    ("college_data/circulars/Fee_15-03-2024.pdf", ("circulars", "", date(2024, 3, 15))),
+    ("college_data/faq/hostel.json", ("faq", "", None)),
+    ("/elsewhere/20240230_and_20240229.txt", ("other", "", date(2024, 2, 29))),  # impossible dates are skipped
+])
+def test_describe_source(path, expected, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # none of the files exist, so no date falls back to a modification time
+    info = describe_source(path)
+    assert (info["category"], info["department"], info["date"]) == expected
+
+
+def test_partition_names_follow_the_scheme():
+    assert partition_name("circulars", "cse", by="category") == "circulars"
+    assert partition_name("circulars", "cse", by="department") == "circulars/cse"
+    assert partition_name("circulars", "", by="department") == "circulars"
+    assert partition_name("circulars", "cse", by="none") == "all"
+    with pytest.raises(ValueError):
+        partition_name("circulars", "cse", by="year")
+    assert partition_file("faiss_index.index", "circulars/cse") == "faiss_index.circulars__cse.index"
+
+
+def test_normalize_filters():
+    assert normalize_filters(None) is None
+    assert normalize_filters({"category": "", "since": None}) is None
+    assert normalize_filters({"category": "Circulars, FAQ", "since": "2024-06-01"}) == {
+        "category": {"circulars", "faq"}, "department": None, "since": date(2024, 6, 1).toordinal(), "until": None,
+    }
+    with pytest.raises(ValueError, match="Unknown search filter"):
+        normalize_filters({"year": 2024})
+    with pytest.raises(ValueError, match="must be a date"):
+        normalize_filters({"since": "last week"})
+
+
+def test_plan_partitions_says_when_a_partition_matches_whole():
+    labels = [("circulars", "cse"), ("circulars", "ece"), ("faq", "")]
+    by_category = normalize_filters({"category": "faq"})
+    assert plan_partitions(labels, by_category, by="category") == ({"faq"}, True)
+    # cse chunks share the circulars partition with ece ones → checked per chunk
+    by_department = normalize_filters({"department": "cse"})
+    assert plan_partitions(labels, by_department, by="category") == ({"circulars"}, False)
+    assert plan_partitions(labels, by_department, by="department") == ({"circulars/cse"}, True)
+    dated = normalize_filters({"category": "faq", "since": "2024-01-01"})
+    assert plan_partitions(labels, dated, by="category") == ({"faq"}, False)
+
+
+def test_chunk_meta_filters_by_label_and_date(meta):
+    cse, faq = meta.code("circulars", "cse"), meta.code("faq", "")
+    meta.write(np.arange(0, 4), cse, day_of(date(2024, 3, 15)))
+    meta.write(np.arange(4, 6), faq, day_of(None))
+    meta.write(np.array([9]), cse, day_of(date(2023, 1, 1)))  # rows 6-8 stay unlabelled
+
+    ids = np.arange(10)
+    assert meta.select(ids, normalize_filters({"category": "circulars"})).tolist() == [0, 1, 2, 3, 9]
+    assert meta.select(ids, normalize_filters({"since": "2024-01-01"})).tolist() == [0, 1, 2, 3]
+    # Undated chunks pass no date bound
+    assert meta.select(ids, normalize_filters({"until": "2030-01-01"})).tolist() == [0, 1, 2, 3, 9]
+    assert meta.unlabelled(ids).tolist() == [6, 7, 8]
+    assert meta.describe(4) == {"category": "faq", "department": None, "date": None}
+    assert meta.describe(20) == {"category": None, "department": None, "date": None}
+
+    groups = meta.partitions_of(ids, by="category")
+    assert {name: group.tolist() for name, group in groups.items()} == {
+        "circulars": [0, 1, 2, 3, 9], "faq": [4, 5], None: [6, 7, 8],
+    }
+    assert meta.read(np.array([6]))[1].tolist() == [NO_DATE]
+
+
+def test_chunk_meta_sees_labels_and_rows_from_another_process(meta):
+    other = ChunkMeta(meta.path, meta.labels_path)
+    try:
+        code = other.code("messages", "")
+        other.write(np.array([3]), code, day_of(date(2024, 5, 1)))
+        other.flush()
+        assert meta.code("messages", "") == code  # the same label gets the same code
+        assert meta.describe(3) == {"category": "messages", "department": None, "date": "2024-05-01"}
+    finally:
+        other.close()
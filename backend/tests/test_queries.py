@@ -0,0 +1,80 @@
+# tests/test_queries.py
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.db import connection, queries
+from app.models.message_model import MESSAGES_COLLECTION, chat_turn
+from app.services.write_buffer import BufferedWriter
+
+START = datetime(2025, 1, 6, 9, 0, tzinfo=timezone.utc)
+
+
+async def insert_turns(mongo, session_id, count):
+    await mongo[MESSAGES_COLLECTION].insert_many([
+        chat_turn(session_id, "hi", f"q{n}", f"a{n}", f"q{n} en", f"a{n} en", created_at=START + timedelta(minutes=n))
+        for n in range(count)
+    ])
+
+
+def test_recent_turns_are_the_latest_oldest_first(mongo):
+    async def run():
+        await insert_turns(mongo, "s1", 5)
+        await insert_turns(mongo, "other", 2)
+        return await queries.recent_turns("s1", limit=3)
+
+    turns = asyncio.run(run())
+    assert [t["user_message"] for t in turns] == ["q2", "q3", "q4"]
+    assert all("_id" not in t and "session_id" not in t for t in turns)
+
+
+def test_history_of_an_unseen_session_is_read_from_mongo(mongo):
+    async def run():
+        await insert_turns(mongo, "s1", 4)
+        return await queries.conversation_history("s1", 2)
+
+    # English copies are what the prompt uses
+    assert asyncio.run(run()) == [("q2 en", "a2 en"), ("q3 en", "a3 en")]
+
+
+def test_history_continues_in_memory_after_a_turn(mongo):
+    async def run():
+        await insert_turns(mongo, "s1", 2)
+        await queries.conversation_history("s1", 5)
+        await mongo[MESSAGES_COLLECTION].delete_many({})  # further reads must not hit MongoDB
+        queries.log_chat_turn("s1", "en", "q2", "a2", "q2", "a2")
+        return await queries.conversation_history("s1", 5)
+
+    assert asyncio.run(run()) == [("q0 en", "a0 en"), ("q1 en", "a1 en"), ("q2", "a2")]
+
+
+def test_new_session_has_no_history_without_a_lookup(monkeypatch):
+    monkeypatch.setattr(connection, "db", None)  # any MongoDB read would fail
+
+    async def run():
+        session_id = queries.start_session()
+        return await queries.conversation_history(session_id, 5)
+
+    assert asyncio.run(run()) == []
+
+
+def test_logged_turns_reach_mongo_in_order(mongo, monkeypatch):
+    writer = BufferedWriter(flush_size=100, interval=60)
+    monkeypatch.setattr(queries, "write_buffer", writer)
+
+    async def run():
+        writer.start()
+        for n in range(3):
+            queries.log_chat_turn("s1", "en", f"q{n}", f"a{n}", f"q{n}", f"a{n}")
+            queries.log_query("s1", "chat", "en", f"q{n}", "generated", 12.5, {"llm": 10.0}, 42)
+            await asyncio.sleep(0.002)  # turns are a reply apart; BSON dates keep milliseconds
+        await writer.close()  # app shutdown writes what is buffered
+        queries._recent.clear()  # as seen by another worker
+        return (
+            await queries.conversation_history("s1", 10),
+            await mongo["query_logs"].count_documents({"session_id": "s1"}),
+        )
+
+    history, logged = asyncio.run(run())
+    assert history == [("q0", "a0"), ("q1", "a1"), ("q2", "a2")]
+    assert logged == 3
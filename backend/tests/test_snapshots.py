@@ -0,0 +1,69 @@
+# tests/test_snapshots.py
+
+import os
+
+import pytest
+
+from app.services import snapshots
+from app.services.snapshots import current_generation, ingest_lock, publish, read_generation, snapshot_path
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # GENERATION_FILE is relative to the working directory
+    monkeypatch.setattr(snapshots, "SNAPSHOT_KEEP", 2)
+    return tmp_path
+
+
+def write_generation(generation: int) -> dict:
+    files = {"faiss": snapshot_path("faiss_index", generation), "bm25": snapshot_path("bm25_index.pkl", generation)}
+    for path in files.values():
+        with open(path, "w") as f:
+            f.write(f"generation {generation}")
+    return files
+
+
+def test_nothing_is_published_at_first():
+    assert read_generation() is None
+    assert current_generation() == 0
+
+
+def test_publish_points_readers_at_the_new_files():
+    files = write_generation(1)
+    publish(1, files)
+    info = read_generation()
+    assert info["generation"] == 1 and info["files"] == files
+    assert current_generation() == 1
+    assert not os.path.exists(snapshots.GENERATION_FILE + ".tmp")
+
+
+def test_publish_prunes_generations_outside_the_window():
+    for generation in range(1, 5):
+        publish(generation, write_generation(generation))
+    open("faiss_index.gbackup", "w").close()  # not a generation: never touched
+    publish(5, write_generation(5))
+
+    assert sorted(p for p in os.listdir() if p.startswith("faiss_index")) == [
+        "faiss_index.g4", "faiss_index.g5", "faiss_index.gbackup",
+    ]
+    assert sorted(p for p in os.listdir() if p.startswith("bm25_index")) == ["bm25_index.pkl.g4", "bm25_index.pkl.g5"]
+
+
+def test_publish_keeps_files_the_new_snapshot_still_uses():
+    old = write_generation(1)
+    publish(1, old)
+    # Generation 4 re-publishes the unchanged BM25 file of generation 1
+    publish(4, {"faiss": write_generation(4)["faiss"], "bm25": old["bm25"]})
+    assert os.path.exists(old["bm25"]) and not os.path.exists(old["faiss"])
+
+
+@pytest.mark.skipif(os.name != "posix", reason="fcntl locks are POSIX only")
+def test_ingest_lock_is_exclusive():
+    import fcntl
+
+    with ingest_lock():
+        with open(snapshots.INGEST_LOCK_FILE, "a") as other:  # as another worker would
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    with open(snapshots.INGEST_LOCK_FILE, "a") as other:
+        fcntl.flock(other.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)  # released on exit
@@ -0,0 +1,95 @@
+# tests/test_translation_service.py
+
+import time
+import asyncio
+from typing import List
+
+import pytest
+
+from app.services import translation_service
+from app.services.translation_service import StubBackend, TranslationCache
+
+
+class Recording(StubBackend):
+    """Stub that marks its output and records every batch it was sent."""
+
+    def __init__(self, latency_ms: float = 0.0, fail: bool = False):
+        super().__init__(latency_ms)
+        self.batches: List[List[str]] = []
+        self.fail = fail
+
+    def translate_batch(self, texts, src_lang, dest_lang):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise ConnectionError("translator unreachable")
+        return [f"[{dest_lang}] {t}" for t in super().translate_batch(texts, src_lang, dest_lang)]
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = Recording()
+    monkeypatch.setattr(translation_service, "_backend", backend)
+    monkeypatch.setattr(translation_service, "_cache", TranslationCache())
+    monkeypatch.setattr(translation_service, "TRANSLATION_CACHE_MONGO", False)
+    return backend
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = TranslationCache(max_size=2, ttl=60)
+    cache.put(("hi", "en", "a"), "A")
+    cache.put(("hi", "en", "b"), "B")
+    assert cache.get(("hi", "en", "a")) == "A"  # now b is the oldest
+    cache.put(("hi", "en", "c"), "C")
+    assert cache.get(("hi", "en", "b")) is None
+    assert cache.get(("hi", "en", "a")) == "A" and cache.get(("hi", "en", "c")) == "C"
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TranslationCache(max_size=10, ttl=60)
+    cache.put(("te", "en", "fee"), "fee")
+    now[0] += 59
+    assert cache.get(("te", "en", "fee")) == "fee"
+    now[0] += 2
+    assert cache.get(("te", "en", "fee")) is None
+    assert cache.stats() == {"size": 0, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_batch_sends_each_distinct_segment_once(backend):
+    texts = ["Hostel fee?", "  hostel   FEE? ", "", "Exam date?"]
+    result = asyncio.run(translation_service.translate_batch(texts, "hi", "en"))
+    # Same text up to spacing / case is translated once; blank segments are left alone
+    assert backend.batches == [["Hostel fee?", "Exam date?"]]
+    assert result == ["[en] Hostel fee?", "[en] Hostel fee?", "", "[en] Exam date?"]
+
+
+def test_cached_segments_skip_the_backend(backend):
+    asyncio.run(translation_service.translate_batch(["Hostel fee?"], "hi", "en"))
+    result = asyncio.run(translation_service.translate_batch(["hostel fee?", "Library hours?"], "hi", "en"))
+    assert backend.batches == [["Hostel fee?"], ["Library hours?"]]
+    assert result == ["[en] Hostel fee?", "[en] Library hours?"]
+    assert translation_service.translation_cache_stats()["hits"] == 1
+
+
+def test_same_language_is_not_translated(backend):
+    assert asyncio.run(translation_service.translate_text("Hello", "en", "en")) == "Hello"
+    assert backend.batches == []
+
+
+def test_failure_falls_back_to_the_original_and_is_not_cached(backend):
+    backend.fail = True
+    assert asyncio.run(translation_service.translate_batch(["Fee?", "Exam?"], "ta", "en")) == ["Fee?", "Exam?"]
+    backend.fail = False
+    assert asyncio.run(translation_service.translate_text("Fee?", "ta", "en")) == "[en] Fee?"
+    assert len(backend.batches) == 2
+
+
+def test_concurrent_requests_share_one_backend_call(backend):
+    backend.latency_ms = 50
+
+    async def run():
+        return await asyncio.gather(*(translation_service.translate_text("Scholarship?", "bn", "en") for _ in range(5)))
+
+    assert asyncio.run(run()) == ["[en] Scholarship?"] * 5
+    assert backend.batches == [["Scholarship?"]]
@@ -0,0 +1,31 @@
+# tests/test_vector_service.py
+
+import numpy as np
+
+from app.services.embedding_cache import EmbeddingCache
+from app.services.vector_service import VectorStore
+
+
+def store_with_fake_model() -> VectorStore:
+    """A VectorStore with only what encode_cached() needs; "encoding" a text gives its length."""
+    store = VectorStore.__new__(VectorStore)
+    store.ingest_encoded = [0, 0.0]
+    store.encode = lambda texts, batch_size=None: np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+    return store
+
+
+def test_encode_cached_tells_cache_hits_from_in_batch_repeats(tmp_path):
+    store = store_with_fake_model()
+    cache = EmbeddingCache("fake", 2, str(tmp_path / "cache.bin"), str(tmp_path / "cache.json"))
+
+    first = ["hostel fee", "hostel fee", "exam date", "hostel fee"]
+    embeddings, encoded, cached = store.encode_cached(first, cache)
+    assert (encoded, cached) == (2, 0)  # the two repeats were encoded once, not found in the cache
+    assert embeddings[:, 0].tolist() == [10, 10, 9, 10]
+
+    second = ["hostel fee", "library hours", "library hours"]
+    embeddings, encoded, cached = store.encode_cached(second, cache)
+    assert (encoded, cached) == (1, 1)
+    assert embeddings[:, 0].tolist() == [10, 13, 13]
+    assert store.ingest_encoded[0] == 3
+    cache.close()
@@ -0,0 +1,98 @@
+# tests/test_write_buffer.py
+
+import asyncio
+
+from app.db import connection
+from app.services.write_buffer import BufferedWriter
+
+
+def record_batches(monkeypatch):
+    """Wraps get_collection() so every insert_many call is recorded as (collection, batch size)."""
+    calls = []
+    real = connection.get_collection
+
+    class Recording:
+        def __init__(self, name):
+            self.name = name
+            self.collection = real(name)
+
+        async def insert_many(self, documents, **kwargs):
+            calls.append((self.name, len(documents)))
+            return await self.collection.insert_many(documents, **kwargs)
+
+    monkeypatch.setattr(connection, "get_collection", Recording)
+    return calls
+
+
+def test_add_before_start_is_ignored(mongo):
+    writer = BufferedWriter()
+    writer.add("logs", {"n": 1})
+    assert writer.stats()["buffered"] == 0
+
+
+def test_full_buffer_is_written_with_one_insert_many(mongo, monkeypatch):
+    calls = record_batches(monkeypatch)
+
+    async def run():
+        writer = BufferedWriter(flush_size=3, interval=60)
+        writer.start()
+        for n in range(3):
+            writer.add("logs", {"n": n})
+        await asyncio.sleep(0.05)  # flush_size reached: the task wakes up without waiting for the interval
+        assert calls == [("logs", 3)]
+
+        writer.add("logs", {"n": 3})
+        await asyncio.sleep(0.05)
+        assert calls == [("logs", 3)]  # below flush_size: waits for the interval (or close)
+        await writer.close()
+        return writer.stats()
+
+    stats = asyncio.run(run())
+    assert calls == [("logs", 3), ("logs", 1)]
+    assert stats == {"buffered": 0, "written": 4, "flushes": 2, "errors": 0, "dropped": 0}
+
+
+def test_close_flushes_every_collection(mongo):
+    async def run():
+        writer = BufferedWriter(flush_size=100, interval=60)
+        writer.start()
+        for n in range(5):
+            writer.add("messages", {"n": n})
+        writer.add("query_logs", {"n": 0})
+        await writer.close()
+        writer.add("messages", {"n": 99})  # after shutdown: dropped, not queued
+        return (
+            await mongo["messages"].count_documents({}),
+            await mongo["query_logs"].count_documents({}),
+            writer.stats(),
+        )
+
+    messages, query_logs, stats = asyncio.run(run())
+    assert (messages, query_logs) == (5, 1)
+    assert stats["buffered"] == 0 and stats["written"] == 6
+
+
+def test_failed_flush_keeps_documents_in_order(mongo, monkeypatch):
+    real = connection.get_collection
+
+    def unreachable(name):
+        raise ConnectionError("mongod is down")
+
+    async def run():
+        writer = BufferedWriter(flush_size=100, interval=60, max_buffered=4)
+        writer.start()
+        for n in range(3):
+            writer.add("logs", {"n": n})
+        monkeypatch.setattr(connection, "get_collection", unreachable)
+        await writer.flush()
+        assert writer.stats()["buffered"] == 3 and writer.errors == 1
+
+        for n in range(3, 5):
+            writer.add("logs", {"n": n})  # over max_buffered: the oldest goes
+        monkeypatch.setattr(connection, "get_collection", real)
+        await writer.close()
+        return [doc["n"] async for doc in mongo["logs"].find({}, {"_id": 0})], writer.stats()
+
+    written, stats = asyncio.run(run())
+    assert written == [1, 2, 3, 4]
+    assert stats["dropped"] == 1 and stats["buffered"] == 0
@@ -0,0 +1,614 @@
+# scripts/benchmark.py
+#
+# Reproducible benchmarks for the chatbot backend; every run prints one JSON
+# document (and writes it with --out) so runs can be compared before a deploy.
+#
+#   python scripts/benchmark.py ingest --docs 200                 # docs/sec, chunks/sec
+#   python scripts/benchmark.py retrieve --sizes 10000 100000 1000000
+#   python scripts/benchmark.py chat --concurrency 32 --requests 2000
+#   python scripts/benchmark.py all --out before.json
+#   python scripts/benchmark.py compare before.json after.json
+#
+# Everything runs in a scratch --workdir (the app keeps its index files in the
+# working directory), against a synthetic multilingual corpus with fixed seeds.
+# `chat` starts scripts/stub_llm_server.py and the app (TRANSLATION_BACKEND=stub,
+# in-memory MongoDB unless MONGO_URI is set) unless --url points at a running server.
+# Install backend/requirements-dev.txt for the in-memory MongoDB.
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import platform
+import resource
+import tempfile
+import itertools
+import subprocess
+from collections import Counter
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BACKEND = os.path.join(ROOT, "backend")
+sys.path.insert(0, BACKEND)
+
+# -----------------------------
+# Synthetic multilingual corpus
+# -----------------------------
+VOCABULARY = {
+    "en": ("admission fee hostel library semester exam scholarship course department timetable "
+           "placement canteen transport result deadline application form campus lab attendance").split(),
+    "hi": "प्रवेश शुल्क छात्रावास पुस्तकालय सेमेस्टर परीक्षा छात्रवृत्ति पाठ्यक्रम विभाग समय सारणी परिणाम".split(),
+    "te": "ప్రవేశం రుసుము వసతి గృహం గ్రంథాలయం సెమిస్టర్ పరీక్ష ఉపకార వేతనం కోర్సు విభాగం ఫలితం".split(),
+    "bn": "ভর্তি ফি ছাত্রাবাস গ্রন্থাগার সেমিস্টার পরীক্ষা বৃত্তি কোর্স বিভাগ সময়সূচি ফলাফল".split(),
+    "ta": "சேர்க்கை கட்டணம் விடுதி நூலகம் பருவம் தேர்வு உதவித்தொகை பாடநெறி துறை முடிவு".split(),
+}
+QUESTIONS = {
+    "en": ["What is the hostel fee?", "When is the last date for admission?", "Where is the library?",
+           "How do I apply for a scholarship?", "When are the semester exams?"],
+    "hi": ["छात्रावास शुल्क कितना है?", "प्रवेश की अंतिम तिथि क्या है?", "पुस्तकालय कहाँ है?"],
+    "te": ["వసతి గృహం రుసుము ఎంత?", "ప్రవేశం చివరి తేదీ ఏమిటి?", "గ్రంథాలయం ఎక్కడ ఉంది?"],
+    "bn": ["ছাত্রাবাসের ফি কত?", "ভর্তির শেষ তারিখ কবে?", "গ্রন্থাগার কোথায়?"],
+    "ta": ["விடுதி கட்டணம் எவ்வளவு?", "சேர்க்கை கடைசி தேதி என்ன?", "நூலகம் எங்கே உள்ளது?"],
+}
+
+
+def synthetic_sentence(rng: random.Random, lang: str, words: int = 14) -> str:
+    # Common domain words plus a Zipf-like tail of rarer terms, so BM25
+    # postings have a realistic length mix
+    vocab = VOCABULARY[lang]
+    terms = [
+        rng.choice(vocab) if rng.random() < 0.6 else f"{lang}{int(rng.paretovariate(1.1)) % 50000}"
+        for _ in range(words)
+    ]
+    return f"{' '.join(terms)} {rng.randint(1, 99999)}."
+
+
+def synthetic_paragraph(rng: random.Random, lang: str, sentences: int) -> str:
+    return " ".join(synthetic_sentence(rng, lang) for _ in range(sentences))
+
+
+def write_corpus(folder: str, docs: int, sentences: int, seed: int = 0) -> Dict[str, int]:
+    """
+    Writes `docs` files (mostly .txt in the five languages, plus FAQ .json
+    files) to `folder`. Returns {"docs": n, "bytes": total size}.
+    """
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    languages = list(VOCABULARY)
+    total = 0
+    for n in range(docs):
+        lang = languages[n % len(languages)]
+        if n % 10 == 9:
+            path = os.path.join(folder, f"faq_{n:05d}.json")
+            faqs = [{"question": f"{rng.choice(QUESTIONS['en'])[:-1]} {n}-{i}?",
+                     "answer": synthetic_sentence(rng, "en")} for i in range(20)]
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(faqs, f, ensure_ascii=False)
+        else:
+            path = os.path.join(folder, f"doc_{n:05d}_{lang}.txt")
+            paragraphs = [synthetic_paragraph(rng, lang, 8) for _ in range(max(1, sentences // 8))]
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n\n".join(paragraphs))
+        total += os.path.getsize(path)
+    return {"docs": docs, "bytes": total}
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def percentiles(samples_s: List[float]) -> dict:
+    if not samples_s:
+        return {"count": 0}
+    ms = np.asarray(samples_s) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def fresh_dir(path: str) -> str:
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+
+def run_metadata(args) -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    settings = ("EMBEDDING_MODEL", "FAISS_INDEX_TYPE", "FAISS_RESCORE", "HYBRID_SEARCH", "INGEST_WORKERS",
+                "EMBED_BATCH_SIZE", "SEMANTIC_CACHE_ENABLED", "EMBED_SCHEDULER_ENABLED")
+    return {
+        "command": args.command,
+        "commit": commit,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "env": {k: os.environ[k] for k in settings if k in os.environ},
+    }
+
+
+# -----------------------------
+# ✅ 1. Ingestion throughput
+# -----------------------------
+def bench_ingest(workdir: str, docs: int, sentences: int, seed: int) -> dict:
+    """
+    Ingests a fresh synthetic corpus through ingest_documents() (extraction
+    pool, embedding, FAISS + BM25 + chunk store, snapshot publish), then
+    re-ingests it with every text document slightly edited (embedding cache).
+    """
+    os.chdir(fresh_dir(workdir))
+    corpus = write_corpus("college_data", docs, sentences, seed)
+    log(f"📄 Wrote {corpus['docs']} documents ({corpus['bytes'] / 1e6:.1f} MB) to {workdir}/college_data")
+
+    from app.services.vector_service import get_vector_store
+    from app.services.knowledge_service import ingest_documents
+
+    started = time.perf_counter()
+    store = get_vector_store()
+    load_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    ingest_documents("college_data")
+    elapsed = time.perf_counter() - started
+    chunks = len(store.chunks)
+
+    # Re-issue every text document with a small edit (a footer line): only
+    # its last chunk is new text, the rest should come from the embedding cache
+    reissued = 0
+    for root, _, files in os.walk("college_data"):
+        for name in files:
+            if name.endswith(".txt"):
+                with open(os.path.join(root, name), "a", encoding="utf-8") as f:
+                    f.write("\n\nRevised notice, supersedes the earlier version.")
+                reissued += 1
+    started = time.perf_counter()
+    stats = ingest_documents("college_data")
+    reingest_s = time.perf_counter() - started
+    return {
+        **corpus,
+        "chunks": chunks,
+        "model_load_s": round(load_s, 3),
+        "seconds": round(elapsed, 3),
+        "docs_per_sec": round(docs / elapsed, 2),
+        "chunks_per_sec": round(chunks / elapsed, 2),
+        "mb_per_sec": round(corpus["bytes"] / 1e6 / elapsed, 3),
+        "reingest": {
+            "docs": reissued,
+            "chunks": stats["chunks"],
+            "chunks_cached": stats["chunks_cached"],
+            "chunks_deduplicated": stats["chunks_deduplicated"],
+            "seconds": round(reingest_s, 3),
+            "encode_seconds": stats["encode_seconds"],
+            "encode_seconds_saved": stats["encode_seconds_saved"],
+        },
+        "max_rss_mb": max_rss_mb(),
+    }
+
+
+# -----------------------------
+# ✅ 2. Retrieval latency vs corpus size
+# -----------------------------
+# Share of synthetic files per category (≈ a college's mix); circulars are dated over three years
+SYNTHETIC_CATEGORIES = {"circulars": 0.6, "messages": 0.25, "faq": 0.1, "excel": 0.05}
+SYNTHETIC_START = date(2022, 1, 1)
+SYNTHETIC_DAYS = 3 * 365
+CHUNKS_PER_FILE = 100
+
+
+def build_synthetic_store(workdir: str, size: int, dim: int, index_type: str, seed: int):
+    """
+    Fills a chunk store + exact vector file + chunk labels with `size`
+    synthetic chunks (files of CHUNKS_PER_FILE, spread over the categories)
+    and clustered random vectors (no embedding: 1M chunks would take hours),
+    then loads a VectorStore on them, which builds the partition indexes.
+    Returns (store, vectors sample).
+    """
+    from app.services.chunk_store import ChunkStore
+    from app.services.vector_file import VectorFile
+    from app.services.partitions import ChunkMeta, DATA_FOLDER
+
+    os.chdir(fresh_dir(workdir))
+    rng = np.random.default_rng(seed)
+    text_rng = random.Random(seed)
+    languages = list(VOCABULARY)
+    centers = rng.standard_normal((max(16, size // 1000), dim)).astype(np.float32)
+    n_files = -(-size // CHUNKS_PER_FILE)
+    categories = list(SYNTHETIC_CATEGORIES)
+    file_category = rng.choice(len(categories), size=n_files, p=list(SYNTHETIC_CATEGORIES.values()))
+    file_day = SYNTHETIC_START.toordinal() + rng.integers(0, SYNTHETIC_DAYS, n_files)
+
+    chunks = ChunkStore()
+    vectors = VectorFile(dim=dim)
+    meta = ChunkMeta()
+    codes = np.array([meta.code(category, "") for category in categories])
+    batch = 50_000
+    for start in range(0, size, batch):
+        ids = np.arange(start, min(start + batch, size), dtype=np.int64)
+        files = ids // CHUNKS_PER_FILE
+        chunks.add_many(
+            (int(i), synthetic_paragraph(text_rng, languages[i % len(languages)], 2),
+             os.path.join(DATA_FOLDER, categories[file_category[f]], f"{date.fromordinal(int(file_day[f]))}_synthetic_{f}.txt"))
+            for i, f in zip(ids, files)
+        )
+        meta.write(ids, codes[file_category[files]], file_day[files])
+        block = centers[rng.integers(0, len(centers), len(ids))] + 0.3 * rng.standard_normal((len(ids), dim))
+        vectors.write(ids, block.astype(np.float32))
+    chunks.close()
+    vectors.close()
+    meta.close()
+
+    from app.services.vector_service import VectorStore
+
+    store = VectorStore(index_type=index_type)  # builds the partitions and BM25 from the files above
+    sample_ids = rng.choice(size, size=min(size, 1000), replace=False)
+    return store, store.vectors.read(np.sort(sample_ids))
+
+
+def bench_retrieve(workdir: str, sizes: List[int], queries: int, top_k: int, index_type: Optional[str], seed: int) -> list:
+    """
+    Times VectorStore.search() (what knowledge_service.retrieve() calls) with a
+    precomputed query embedding, hybrid and dense-only, at each corpus size;
+    then dense-only restricted to the FAQ partition and to the last 90 days
+    of circulars, which scan only a fraction of the vectors; then BM25 alone
+    and the BM25 cost of deleting one file's chunks.
+    """
+    from app.services.index_factory import FAISS_INDEX_TYPE, index_nbytes
+    from app.services.vector_service import HYBRID_LEXICAL_K
+
+    index_type = index_type or FAISS_INDEX_TYPE
+    rng = np.random.default_rng(seed + 1)
+    text_rng = random.Random(seed + 1)
+    results = []
+    for size in sizes:
+        log(f"🧱 Building a {size:,}-chunk {index_type} store...")
+        started = time.perf_counter()
+        store, sample = build_synthetic_store(os.path.join(workdir, f"retrieve_{size}"), size, 384, index_type, seed)
+        setup_s = time.perf_counter() - started
+
+        picks = rng.integers(0, len(sample), queries)
+        embeddings = (sample[picks] + 0.05 * rng.standard_normal((queries, sample.shape[1]))).astype(np.float32)
+        texts = [synthetic_sentence(text_rng, list(VOCABULARY)[n % 5], 6) for n in range(queries)]
+
+        partitions = store.stats()["by_partition"]
+        row = {"chunks": size, "index": {name: p["type"] for name, p in partitions.items()},
+               "partitions": {name: p["vectors"] for name, p in partitions.items()},
+               "index_mb": round(sum(index_nbytes(p.index) for p in store.partitions.values()) / 2**20, 1),
+               "setup_s": round(setup_s, 1)}
+        recent = date.fromordinal(SYNTHETIC_START.toordinal() + SYNTHETIC_DAYS - 90).isoformat()
+        modes = (
+            ("hybrid", None, None),
+            ("dense", 0, None),
+            ("dense_faq", 0, {"category": "faq"}),
+            ("dense_recent_circulars", 0, {"category": "circulars", "since": recent}),
+        )
+        for mode, lexical_k, filters in modes:
+            for n in range(min(10, queries)):  # warm caches / page in
+                store.search(texts[n], top_k, query_embedding=embeddings[n], lexical_k=lexical_k, filters=filters)
+            timings = []
+            for text, embedding in zip(texts, embeddings):
+                started = time.perf_counter()
+                store.search(text, top_k, query_embedding=embedding, lexical_k=lexical_k, filters=filters)
+                timings.append(time.perf_counter() - started)
+            row[mode] = percentiles(timings)
+
+        # BM25 alone: a first pass on a fresh copy (nothing cached yet), then the same queries again,
+        # then short chat questions (1-3 terms after stopwords) once their terms are cached too
+        started = time.perf_counter()
+        lexical = store.lexical.copy()  # what every ingest / delete starts from
+        row["bm25_copy_ms"] = round(1000 * (time.perf_counter() - started), 2)
+
+        def time_bm25(batch: List[str]) -> dict:
+            timings = []
+            for text in batch:
+                started = time.perf_counter()
+                lexical.search(text, HYBRID_LEXICAL_K)
+                timings.append(time.perf_counter() - started)
+            return percentiles(timings)
+
+        row["bm25_cold"] = time_bm25(texts)
+        row["bm25"] = time_bm25(texts)
+        questions = [q for lang in QUESTIONS.values() for q in lang]
+        time_bm25(questions)
+        row["bm25_question"] = time_bm25(list(itertools.islice(itertools.cycle(questions), queries)))
+        started = time.perf_counter()
+        lexical.delete(range(CHUNKS_PER_FILE))  # one file's chunks, as on a re-ingest
+        row["bm25_delete_file_ms"] = round(1000 * (time.perf_counter() - started), 2)
+
+        timings = []
+        for text in texts[:50]:
+            started = time.perf_counter()
+            store.embed_query(text)
+            timings.append(time.perf_counter() - started)
+        row["embed_query"] = percentiles(timings)
+        row["max_rss_mb"] = max_rss_mb()
+        results.append(row)
+        log(f"   hybrid p50 {row['hybrid']['p50_ms']} ms, dense p50 {row['dense']['p50_ms']} ms, "
+            f"faq-only p50 {row['dense_faq']['p50_ms']} ms, recent circulars p50 {row['dense_recent_circulars']['p50_ms']} ms, "
+            f"bm25 p50 {row['bm25_cold']['p50_ms']} ms cold / {row['bm25']['p50_ms']} ms cached / "
+            f"{row['bm25_question']['p50_ms']} ms short questions, copy {row['bm25_copy_ms']} ms")
+
+        store.chunks.close()
+        store.vectors.close()
+        store.meta.close()
+        del store
+    return results
+
+
+# -----------------------------
+# ✅ 3. /api/chat/ load test
+# -----------------------------
+def _wait_ready(url: str, timeout_s: float):
+    import httpx
+
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/api/health/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} not ready after {timeout_s:.0f}s")
+
+
+def start_servers(workdir: str, args) -> List[subprocess.Popen]:
+    """
+    Stub LLM server + the app (uvicorn, stub translator) in `workdir`.
+    """
+    llm = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, "scripts", "stub_llm_server.py"),
+        "--port", str(args.llm_port), "--latency-ms", str(args.llm_latency_ms), "--token-ms", str(args.llm_token_ms),
+    ])
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.path.abspath(BACKEND),
+        LLM_API_URL=f"http://127.0.0.1:{args.llm_port}/generate",
+        TRANSLATION_BACKEND="stub",
+        TRANSLATION_STUB_LATENCY_MS=str(args.translate_latency_ms),
+        MONGO_URI=os.environ.get("MONGO_URI", "mongomock://"),
+        # Every load-test request comes from one address; measure the shedding, not the rate limit
+        CHAT_RATE_LIMIT=os.environ.get("CHAT_RATE_LIMIT", "0"),
+    )
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL,
+    )
+    return [llm, app]
+
+
+def scrape_metrics(url: str) -> Dict[str, float]:
+    """chat_* histogram sums/counts from /api/health/metrics, by full series name."""
+    import httpx
+
+    try:
+        text = httpx.get(f"{url}/api/health/metrics", timeout=5).text
+    except httpx.HTTPError:
+        return {}
+    values = {}
+    for line in text.splitlines():
+        if line.startswith("chat_") and ("_sum" in line or "_count" in line):
+            name, value = line.rsplit(" ", 1)
+            values[name] = float(value)
+    return values
+
+
+def stage_breakdown(before: Dict[str, float], after: Dict[str, float]) -> dict:
+    """Mean ms per stage and request count per outcome during the run (one worker's view)."""
+    def label(name: str, key: str) -> str:
+        return name.split(f'{key}="', 1)[1].split('"', 1)[0]
+
+    delta = {k: v - before.get(k, 0.0) for k, v in after.items()}
+    stages: Dict[str, float] = {}
+    outcomes: Counter = Counter()
+    for name, value in delta.items():
+        if not value:
+            continue
+        if name.startswith("chat_stage_seconds_count"):
+            total = delta.get(name.replace("_count", "_sum"), 0.0)
+            stages[label(name, "stage")] = round(total / value * 1000, 3)
+        elif name.startswith("chat_request_seconds_count"):
+            outcomes[label(name, "outcome")] += int(value)
+    return {"stage_mean_ms": stages, "outcomes": dict(outcomes)}
+
+
+async def drive_chat(url: str, concurrency: int, requests: int, timeout: float, seed: int) -> dict:
+    import httpx
+
+    # Language omitted → the app auto-detects it, as for real clients.
+    # Half the questions are repeats (answer-cache hits), half are unique.
+    rng = random.Random(seed)
+    messages = []
+    for n in range(requests):
+        question = rng.choice(QUESTIONS[rng.choice(list(QUESTIONS))])
+        if rng.random() < 0.5:
+            question = f"{question} ({n})"
+        messages.append({"user_message": question})
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+        counter = itertools.count()
+        latencies: List[float] = []
+        statuses: Counter = Counter()
+
+        async def worker():
+            while True:
+                n = next(counter)
+                if n >= requests:
+                    return
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/api/chat/", json=messages[n])
+                    statuses[str(response.status_code)] += 1
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - started)
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "rps": round(statuses.get("200", 0) / elapsed, 2),
+        "statuses": dict(statuses),
+        "latency": percentiles(latencies),
+    }
+
+
+def bench_chat(workdir: str, args) -> dict:
+    servers = []
+    url = args.url
+    if url is None:
+        if not os.path.exists(os.path.join(workdir, "index_generation.json")):
+            log("⚠️  No index in the workdir: run `ingest` (or `all`) first for realistic retrieval")
+        os.makedirs(workdir, exist_ok=True)
+        servers = start_servers(workdir, args)
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        _wait_ready(url, args.ready_timeout)
+        if args.warmup:
+            asyncio.run(drive_chat(url, min(args.concurrency, args.warmup), args.warmup, args.timeout, args.seed + 1))
+        before = scrape_metrics(url)
+        result = asyncio.run(drive_chat(url, args.concurrency, args.requests, args.timeout, args.seed))
+        result.update(stage_breakdown(before, scrape_metrics(url)))
+        result["settings"] = {
+            "workers": args.workers if args.url is None else None,
+            "llm_latency_ms": args.llm_latency_ms if args.url is None else None,
+            "translate_latency_ms": args.translate_latency_ms if args.url is None else None,
+        }
+        return result
+    finally:
+        for process in servers:
+            process.terminate()
+        for process in servers:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+# -----------------------------
+# ✅ Compare two result files
+# -----------------------------
+def _flatten(value, prefix="") -> Dict[str, float]:
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            out.update(_flatten(item, f"{prefix}{key}."))
+        return out
+    if isinstance(value, list):
+        out = {}
+        for item in value:
+            # retrieve rows are keyed by corpus size
+            key = item.get("chunks", "") if isinstance(item, dict) else ""
+            out.update(_flatten(item, f"{prefix}{key}."))
+        return out
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix.rstrip("."): float(value)}
+    return {}
+
+
+def compare(old_path: str, new_path: str) -> dict:
+    with open(old_path, encoding="utf-8") as f:
+        old = _flatten({k: v for k, v in json.load(f).items() if k != "meta"})
+    with open(new_path, encoding="utf-8") as f:
+        new = _flatten({k: v for k, v in json.load(f).items() if k != "meta"})
+    rows = {}
+    for key in sorted(old.keys() & new.keys()):
+        change = (new[key] - old[key]) / old[key] * 100 if old[key] else None
+        rows[key] = {"old": old[key], "new": new[key], "change_pct": None if change is None else round(change, 1)}
+    return rows
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion, retrieval and chat load benchmarks")
+    parser.add_argument("command", choices=["ingest", "retrieve", "chat", "all", "compare"])
+    parser.add_argument("files", nargs="*", help="compare: OLD.json NEW.json")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "sih-benchmark"))
+    parser.add_argument("--out", help="also write the JSON result here")
+    parser.add_argument("--seed", type=int, default=0)
+    # ingest
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--sentences", type=int, default=80, help="sentences per text document")
+    # retrieve
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--index-type", help="default: FAISS_INDEX_TYPE")
+    # chat
+    parser.add_argument("--url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--port", type=int, default=8300)
+    parser.add_argument("--llm-port", type=int, default=8100)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-token-ms", type=float, default=10.0)
+    parser.add_argument("--translate-latency-ms", type=float, default=50.0)
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        if len(args.files) != 2:
+            parser.error("compare needs OLD.json NEW.json")
+        report = compare(*args.files)
+    else:
+        workdir = os.path.abspath(args.workdir)
+        ingest_dir = os.path.join(workdir, "ingest")
+        report = {"meta": run_metadata(args)}
+        if args.command in ("ingest", "all"):
+            report["ingest"] = bench_ingest(ingest_dir, args.docs, args.sentences, args.seed)
+        if args.command in ("retrieve", "all"):
+            report["retrieve"] = bench_retrieve(workdir, args.sizes, args.queries, args.top_k, args.index_type, args.seed)
+        if args.command in ("chat", "all"):
+            # Serves the corpus indexed by `ingest`
+            try:
+                report["chat"] = bench_chat(ingest_dir, args)
+            except Exception as e:
+                log(f"❌ Chat benchmark failed: {e}")
+                report["chat"] = {"error": str(e)}
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# scripts/index_report.py
+#
+# Recall-vs-latency report for the FAISS index modes, and offline rebuilds.
+#
+#   cd backend
+#   python ../scripts/index_report.py                     # report on the ingested corpus
+#   python ../scripts/index_report.py --synthetic 100000  # report on random vectors
+#   python ../scripts/index_report.py --rebuild hnsw      # rebuild every index partition as HNSW
+#   python ../scripts/index_report.py --rebuild hnsw --partition circulars  # just one, others untouched
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from app.services.index_factory import INDEX_TYPES, compare_index_modes  # noqa: E402
+
+
+def load_corpus_vectors() -> np.ndarray:
+    from app.services.vector_service import get_vector_store
+
+    store = get_vector_store()
+    return store.vectors.read(store.chunks.ids())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--synthetic", type=int, default=0, help="use N random vectors instead of the corpus")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    parser.add_argument("--rebuild", choices=INDEX_TYPES, help="rebuild the stored index as this type and exit")
+    parser.add_argument("--partition", action="append", help="with --rebuild: only this partition (repeatable)")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        from app.services.vector_service import get_vector_store
+        from app.services.snapshots import ingest_lock
+
+        store = get_vector_store()
+        # Same lock as ingestion: start from the latest generation, publish before anyone else
+        with ingest_lock():
+            store.maybe_reload()
+            store.rebuild(args.rebuild, args.partition)
+            store.save()
+        print(json.dumps(store.stats()["by_partition"], indent=2))
+        return
+
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        vectors = rng.standard_normal((args.synthetic, args.dim)).astype(np.float32)
+    else:
+        vectors = load_corpus_vectors()
+
+    # Queries: perturbed corpus vectors, close to what real questions look like
+    rng = np.random.default_rng(1)
+    picks = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    queries = vectors[picks] + 0.05 * rng.standard_normal((len(picks), vectors.shape[1])).astype(np.float32)
+
+    report = compare_index_modes(vectors, queries, k=args.k, modes=args.modes)
+    print(json.dumps({"vectors": len(vectors), "k": args.k, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# scripts/quantize_index.py
+#
+# Converts the stored FAISS index partitions to a quantized mode and reports
+# the memory saved and the recall change (with and without exact re-scoring).
+# Works on the files only — the embedding model is not loaded.
+#
+#   cd backend
+#   python ../scripts/quantize_index.py --to flat_fp16 --dry-run              # report only
+#   python ../scripts/quantize_index.py --to flat_pq --workers 4              # publish as a new snapshot generation
+#   python ../scripts/quantize_index.py --to flat_pq --partition circulars    # one partition, others untouched
+#
+# Running workers hot-reload the new generation; the previous one stays on
+# disk for SNAPSHOT_KEEP generations. Afterwards run the app with
+# FAISS_INDEX_TYPE=<mode> (and FAISS_RESCORE=1 to re-score), otherwise the next ingestion rebuilds the index back to the configured type.
+# Partitions smaller than FAISS_ANN_MIN_VECTORS stay flat, as in the app.
+# Run with the app's INDEX_PARTITION_BY.
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import faiss  # noqa: E402
+from app.services.chunk_store import ChunkStore, CHUNK_DATA_PATH, CHUNK_INDEX_PATH  # noqa: E402
+from app.services.vector_file import VectorFile, EXACT_VECTORS_PATH  # noqa: E402
+from app.services.vector_service import VECTOR_STORE_PATH, PARTITION_KEY, _partition_files, _with_ids  # noqa: E402
+from app.services.partitions import ChunkMeta, partition_file  # noqa: E402
+from app.services.snapshots import ingest_lock, publish, read_generation, snapshot_path  # noqa: E402
+from app.services.index_factory import (  # noqa: E402
+    INDEX_TYPES, FAISS_RESCORE_FACTOR,
+    build_index, choose_index_type, index_kind, is_lossy, train_index, set_search_params, measure_index,
+)
+
+
+def load_exact_vectors(indexes: dict, members: dict, vectors_path: str) -> np.ndarray:
+    """
+    Returns an (max_id + 1, dim) array whose row i is chunk i's exact vector,
+    recovering faiss_vectors.f32 rows from the partition indexes first if missing.
+    """
+    dim = next(iter(indexes.values())).d
+    store = VectorFile(vectors_path, dim)
+    all_ids = np.concatenate(list(members.values()))
+    if not store.covers(all_ids):
+        for name, index in indexes.items():
+            if is_lossy(index):
+                sys.exit(f"{name}: {index_kind(index)} index has no exact vectors in {vectors_path}; start the app once to recover them")
+            store.write(members[name], index.reconstruct_batch(members[name]))
+        store.flush()
+        print(f"📦 Wrote exact vectors for {len(all_ids)} chunks to {vectors_path}", file=sys.stderr)
+    exact = np.zeros((int(all_ids.max()) + 1, dim), dtype=np.float32)
+    exact[all_ids] = store.read(all_ids)
+    store.close()
+    return exact
+
+
+def convert_partition(name: str, index, ids: np.ndarray, exact: np.ndarray, args, queries_wanted: int, rng):
+    vectors = exact[ids]
+    # Queries: perturbed corpus vectors, close to what real questions look like
+    picks = rng.choice(len(ids), size=max(1, min(queries_wanted, len(ids))), replace=False)
+    queries = vectors[picks] + 0.05 * rng.standard_normal((len(picks), index.d)).astype(np.float32)
+    k = min(args.k, len(ids))
+
+    truth_index = build_index("flat", index.d)
+    truth_index.add_with_ids(vectors, ids)
+    _, truth = truth_index.search(queries, k)
+
+    mode = choose_index_type(args.to, len(ids))
+    converted = build_index(mode, index.d, len(ids))
+    train_index(converted, vectors)
+    converted.add_with_ids(vectors, ids)
+    set_search_params(converted)
+
+    row = {
+        "vectors": len(ids),
+        "queries": len(picks),
+        "from": {"mode": index_kind(index), **measure_index(index, queries, k, truth)},
+        "to": {"mode": mode, **measure_index(converted, queries, k, truth)},
+        "to_rescored": {"mode": mode, "rescore_factor": args.rescore_factor,
+                        **measure_index(converted, queries, k, truth, exact, args.rescore_factor)},
+    }
+    return converted, row
+
+
+def _total(rows: list, key: str) -> dict:
+    # An unfiltered search scans every partition: latencies and memory add up, recall is per query
+    queries = sum(r["queries"] for r in rows)
+    return {
+        "recall_at_k": round(sum(r[key]["recall_at_k"] * r["queries"] for r in rows) / queries, 4),
+        "avg_ms": round(sum(r[key]["avg_ms"] for r in rows), 4),
+        "p99_ms": round(sum(r[key]["p99_ms"] for r in rows), 4),
+        "memory_mb": round(sum(r[key]["memory_mb"] for r in rows), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the stored FAISS index partitions")
+    parser.add_argument("--to", required=True, choices=INDEX_TYPES, help="target index mode")
+    parser.add_argument("--partition", action="append", help="only this partition (repeatable; default: all)")
+    parser.add_argument("--vectors", default=EXACT_VECTORS_PATH)
+    parser.add_argument("--chunks", nargs=2, default=[CHUNK_DATA_PATH, CHUNK_INDEX_PATH], metavar=("DATA", "IDX"))
+    parser.add_argument("--queries", type=int, default=200, help="spread over the partitions by size")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--rescore-factor", type=int, default=FAISS_RESCORE_FACTOR)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers per box, for the RAM total")
+    parser.add_argument("--dry-run", action="store_true", help="report only, leave the index untouched")
+    args = parser.parse_args()
+
+    snapshot = read_generation()
+    files = _partition_files(snapshot["files"]) if snapshot else {}
+    if not files:
+        sys.exit("No partitioned index snapshot yet; start the app once to create it")
+    names = args.partition or sorted(files)
+    unknown = [name for name in names if name not in files]
+    if unknown:
+        sys.exit(f"Unknown partition(s) {unknown}; the snapshot has {sorted(files)}")
+
+    chunks = ChunkStore(*args.chunks)
+    meta = ChunkMeta()
+    members = meta.partitions_of(chunks.ids())
+    chunks.close()
+    meta.close()
+    if None in members:
+        sys.exit("Some chunks are not labelled by partition yet; start the app once to label them")
+    members = {name: members[name] for name in names if name in members}
+    if not members:
+        sys.exit("No chunks ingested in the selected partitions; nothing to convert")
+
+    indexes = {name: _with_ids(faiss.read_index(files[name])) for name in members}
+    exact = load_exact_vectors(indexes, members, args.vectors)
+
+    rng = np.random.default_rng(1)
+    total = sum(len(ids) for ids in members.values())
+    converted, rows = {}, {}
+    for name, index in indexes.items():
+        wanted = round(args.queries * len(members[name]) / total)
+        converted[name], rows[name] = convert_partition(name, index, members[name], exact, args, wanted, rng)
+
+    before, after, rescored = (_total(list(rows.values()), key) for key in ("from", "to", "to_rescored"))
+    report = {
+        "vectors": total,
+        "k": args.k,
+        "from": before,
+        "to": {"mode": args.to, **after},
+        "to_rescored": {"mode": args.to, "rescore_factor": args.rescore_factor, **rescored},
+        "saved_mb_per_worker": round(before["memory_mb"] - after["memory_mb"], 2),
+        "saved_mb_total": round((before["memory_mb"] - after["memory_mb"]) * args.workers, 2),
+        "recall_change": round(after["recall_at_k"] - before["recall_at_k"], 4),
+        "recall_change_rescored": round(rescored["recall_at_k"] - before["recall_at_k"], 4),
+        "partitions": rows,
+        "written": not args.dry_run,
+    }
+
+    if not args.dry_run:
+        # Same lock as ingestion, so no worker publishes in between
+        with ingest_lock():
+            snapshot = read_generation()
+            generation = snapshot["generation"] + 1
+            published = dict(snapshot["files"])
+            for name, index in converted.items():
+                path = snapshot_path(partition_file(VECTOR_STORE_PATH, name), generation)
+                faiss.write_index(index, path)
+                published[PARTITION_KEY + name] = path
+            publish(generation, published)
+        report["generation"] = generation
+        report["previous_files"] = {name: files[name] for name in converted}
+        report["next"] = f"run with FAISS_INDEX_TYPE={args.to} (FAISS_RESCORE=1 to re-score)"
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
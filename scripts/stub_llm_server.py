@@ -0,0 +1,67 @@
+# scripts/stub_llm_server.py
+#
+# Local stand-in for the Hugging Face Inference API, for tests and benchmarks.
+# Speaks the same request/response format as llm_service, including
+# `stream: true` server-sent events (text-generation-inference style).
+#
+#   python scripts/stub_llm_server.py --port 8100 --latency-ms 300 --token-ms 20
+#   LLM_API_URL=http://127.0.0.1:8100/generate uvicorn app.main:app
+
+import json
+import asyncio
+import argparse
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+app = FastAPI(title="Stub LLM server")
+
+SETTINGS = {"latency_ms": 200.0, "token_ms": 10.0, "fail_every": 0}
+STATE = {"requests": 0}
+
+
+def _reply_for(prompt: str) -> str:
+    # Deterministic reply: echo the question part of the RAG prompt
+    question = prompt.rsplit("Question:", 1)[-1].strip()
+    return f"This is a stub answer to: {question}. Please check the college notice board for details."
+
+
+@app.post("/generate")
+@app.post("/models/{model:path}")
+async def generate(request: Request, model: str = ""):
+    body = await request.json()
+    STATE["requests"] += 1
+    if SETTINGS["fail_every"] and STATE["requests"] % SETTINGS["fail_every"] == 0:
+        return JSONResponse(status_code=503, content={"error": "stub overloaded"})
+
+    reply = _reply_for(body.get("inputs", ""))
+    await asyncio.sleep(SETTINGS["latency_ms"] / 1000)
+
+    if not body.get("stream"):
+        return [{"generated_text": reply}]
+
+    async def events():
+        for word in reply.split(" "):
+            await asyncio.sleep(SETTINGS["token_ms"] / 1000)
+            yield f"data: {json.dumps({'token': {'text': word + ' ', 'special': False}})}\n\n"
+        yield f"data: {json.dumps({'token': {'text': '', 'special': True}, 'generated_text': reply})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def stats():
+    return STATE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="delay before the first token")
+    parser.add_argument("--token-ms", type=float, default=10.0, help="delay between streamed tokens")
+    parser.add_argument("--fail-every", type=int, default=0, help="return 503 on every Nth request")
+    args = parser.parse_args()
+    SETTINGS.update(latency_ms=args.latency_ms, token_ms=args.token_ms, fail_every=args.fail_every)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")